@@ -7,22 +7,61 @@ __license__ = "MIT"
 __copyright__ = "Copyright 2021, @MeganeBoujeant"
 
 
+from array import array
+
+from suffix_array import cyclic_suffix_array, bwt_from_suffix_array
+from step_trace import NullTrace
+from instrumentation import NullInstruments
+from result_cache import NullCache
+
+
 class TransformeeBW:
     """ Class of Burrows-Weeler transformation. """
 
-    def __init__(self, controller):
+    def __init__(self, controller, trace: NullTrace = None,
+                 instruments: NullInstruments = None, cache: NullCache = None):
         self.controller = controller
-        self.list_step_trans_seq = []
-        self.list_el_matrix_final_trans = []
-        self.list_step_recons_seq = []
+        # The trace keeps what is needed to display the steps, by default
+        # nothing is kept
+        self.trace = trace if trace is not None else NullTrace()
+        # The instruments measure the stages, by default nothing is measured
+        self.instruments = instruments if instruments is not None \
+            else NullInstruments()
+        # The cache gives back the results of a sequence already transformed,
+        # by default nothing is kept
+        self.cache = cache if cache is not None else NullCache()
+
+    @property
+    def list_step_trans_seq(self):
+        """ Rotations of the last transformation, step by step. """
+
+        return self.trace.list_step_trans_seq
+
+    @property
+    def list_el_matrix_final_trans(self):
+        """ Sorted rotation matrix of the last transformation. """
+
+        return self.trace.list_el_matrix_final_trans
+
+    @property
+    def list_step_recons_seq(self):
+        """ Matrices of the last reconstruction, step by step. """
 
-    def transformation_seq(self, sequence: str):
+        return self.trace.list_step_recons_seq
+
+    def transformation_seq(self, sequence: str,
+                           path: str = '../data/bwt.txt'):
         """ Transformation method to obtain the BWT sequence.
+        The rotations of the sequence are sorted with a suffix array, the
+        rotation matrix is never built.
 
-        Parameter
-        ---------
-        sequence : str
+        Parameters
+        ----------
+        sequence : str or PackedSequence
             DNA sequence that we want to make Burrows-Weeler transformation
+        path : str
+            path of the file where the BWT sequence is saved, None to not
+            save it
 
         Return
         ------
@@ -31,54 +70,126 @@ class TransformeeBW:
             sequence
         """
 
-        # Add '$' after the sequence
-        seq = sequence.upper() + "$"
+        # Add '$' after the sequence. A PackedSequence is unpacked into a
+        # string here: the suffix array reads the characters at random
+        # positions, and its lists take more than 24 bytes by character, so
+        # this copy of 1 byte by character is small beside them
+        seq = str(sequence.upper()) + "$"
 
-        # Initialization of the square matrix of all the offsets of the sequence
-        seq_matrix = [seq]
+        key = self.cache.key('bwt', seq)
+        cached = self.cache.get(key)
+        if cached is not None and (cached[1] is not None or
+                                   not self.trace.enabled):
+            bwt, sa = cached
+        else:
+            # Sorting the rotations of the sequence
+            with self.instruments.stage('bwt.suffix_array'):
+                sa = cyclic_suffix_array(seq)
 
-        previous_seq = seq
+            # Recovering the last character of each sorted rotation
+            with self.instruments.stage('bwt.last_column'):
+                bwt = bwt_from_suffix_array(seq, sa)
+            self.remember(seq, bwt, sa)
+        self.instruments.count('bwt.chars', len(seq))
 
-        # Filling of the square matrix
-        for i in range(0, len(seq)-1, 1):
-            next_seq = previous_seq[len(seq)-1] + previous_seq[0:len(seq)-1]
-            # Complete list for print step by step
-            self.list_step_trans_seq.append(next_seq)
-            seq_matrix.append(next_seq)
-            previous_seq = next_seq
+        self.trace.transformation(seq, sa)
 
-        # Sorting the square matrix and display
-        self.sort_and_print_matrix(seq_matrix, self.list_el_matrix_final_trans)
+        if path is not None:
+            with self.instruments.stage('bwt.write'):
+                self.save(bwt, path)
 
-        # Recovering the last character of each line
-        bwt = ""
+        return bwt
 
-        for line in seq_matrix:
-            bwt += line[len(line)-1]
+    def remember(self, seq: str, bwt: str, sa: list):
+        """ This method keep in the cache the BWT sequence of a sequence, and
+        the sequence of the BWT sequence. The suffix array is only kept if
+        the steps are displayed, because it is 8 times larger than the
+        sequence.
 
-        self.save(bwt)
+        Parameters
+        ----------
+        seq : str
+            DNA sequence with '$' at the end
+        bwt : str
+            BWT sequence
+        sa : list
+            sorted start positions of the rotations of seq
+        """
 
-        return bwt
+        if not self.cache.enabled:
+            return
+        self.cache.put(self.cache.key('bwt', seq),
+                       (bwt, array('q', sa) if self.trace.enabled else None))
+        # A sequence which contains '$' can not be given back from its BWT
+        if seq.count('$') == 1:
+            self.cache.put(self.cache.key('unbwt', bwt), seq[0:len(seq)-1])
 
     @staticmethod
-    def save(bwt: str):
+    def save(bwt: str, path: str = '../data/bwt.txt'):
         """ Method which save bwt sequence when a transformation of sequence is
         made.
 
-        Parameter
-        ---------
+        Parameters
+        ----------
         bwt : str
             BWT sequence
+        path : str
+            path of the BWT file
         """
 
-        f = open('../data/bwt.txt', 'w')
+        f = open(path, 'w')
         f.write(bwt)
         f.close()
 
-    def reconstruction_seq(self, bwt: str):
+    def reconstruction_seq(self, bwt: str, lf_mapping: bool = True):
         """ Method of re-transformation of the BWT sequence into the original
         sequence.
 
+        Parameters
+        ----------
+        bwt : str or PackedSequence
+            BWT sequence
+        lf_mapping : bool
+            if True, use the LF-mapping of the BWT sequence (O(n) time and
+            memory), else rebuild the sorted matrix column by column
+
+        Return
+        ------
+        seq : str
+            initial DNA sequence
+        """
+
+        bwt = str(bwt)
+        key = self.cache.key('unbwt', bwt)
+        seq = self.cache.get(key)
+        if seq is None:
+            with self.instruments.stage('bwt.reconstruction'):
+                if lf_mapping:
+                    seq = self.reconstruction_lf(bwt)
+                else:
+                    seq = self.reconstruction_matrix(bwt)
+            if seq is not None:
+                self.cache.put(key, seq)
+        self.instruments.count('bwt.reconstructed_chars', len(bwt))
+
+        # The matrices of the steps are the sorted prefixes of the rotations
+        if seq is not None and self.trace.enabled:
+            text = seq + "$"
+            cached = self.cache.get(self.cache.key('bwt', text))
+            if cached is not None and cached[1] is not None:
+                sa = cached[1]
+            else:
+                sa = cyclic_suffix_array(text)
+                self.remember(text, bwt_from_suffix_array(text, sa), sa)
+            self.trace.reconstruction(text, sa)
+        return seq
+
+    @staticmethod
+    def reconstruction_matrix(bwt: str):
+        """ Method of re-transformation of the BWT sequence into the original
+        sequence by insertion of the BWT sequence in the first column of the
+        matrix, then sorting.
+
         Parameter
         ---------
         bwt : str
@@ -87,7 +198,7 @@ class TransformeeBW:
         Return
         ------
         seq : str
-            initial DNA sequence
+            initial DNA sequence, None if there is no '$' in bwt
         """
 
         # Repetition of insertion of the word bwt in the 1st column then sorting
@@ -96,13 +207,13 @@ class TransformeeBW:
         for char in bwt:
             r_matrix.append(char)
 
-        self.sort_and_print_matrix(r_matrix, self.list_step_recons_seq)
+        r_matrix.sort()
 
         for i in range(0, len(bwt)-1, 1):
             for j in range(0, len(bwt), 1):
                 r_matrix[j] = bwt[j] + r_matrix[j]
 
-            self.sort_and_print_matrix(r_matrix, self.list_step_recons_seq)
+            r_matrix.sort()
 
         # Search for the last character == '$'
         for element in r_matrix:
@@ -111,16 +222,47 @@ class TransformeeBW:
                 return seq
 
     @staticmethod
-    def sort_and_print_matrix(m: list, list_of_mat: list):
-        """ Method to sort and allows display matrix m.
+    def reconstruction_lf(bwt: str):
+        """ Method of re-transformation of the BWT sequence into the original
+        sequence with the LF-mapping.
+        The row i of the sorted matrix is preceded in the sequence by the row
+        C[bwt[i]] + Occ(bwt[i], i), where C[c] is the number of characters
+        smaller than c and Occ(c, i) the number of c before the position i.
 
-        Parameters
-        ----------
-        m : list
-            matrix with elements that we want to sort and display
-        list_of_mat : list
-            list of elements that we will display in the GUI later
+        Parameter
+        ---------
+        bwt : str
+            BWT sequence
+
+        Return
+        ------
+        seq : str
+            initial DNA sequence, None if there is no '$' in bwt
         """
-        m.sort()
-        for element in m:
-            list_of_mat.append(element)
+
+        if '$' not in bwt:
+            return None
+
+        # Occ array: rank of each character among the same characters
+        counts = {}
+        occ = [0] * len(bwt)
+        for i, char in enumerate(bwt):
+            occ[i] = counts.get(char, 0)
+            counts[char] = occ[i] + 1
+
+        # C array: number of characters smaller than each character
+        c_array = {}
+        total = 0
+        for char in sorted(counts):
+            c_array[char] = total
+            total += counts[char]
+
+        # The row which ends by '$' is the sequence, go back from its end
+        row = bwt.index('$')
+        reverse_seq = []
+        for i in range(0, len(bwt)-1, 1):
+            row = c_array[bwt[row]] + occ[row]
+            reverse_seq.append(bwt[row])
+
+        reverse_seq.reverse()
+        return "".join(reverse_seq)
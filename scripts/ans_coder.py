@@ -0,0 +1,468 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+from array import array
+import struct
+import sys
+
+from compression_huffman import HuffmanCompression, HuffmanDecompression
+from mtf_rle import mtf_rle_decode
+from instrumentation import NullInstruments
+from result_cache import NullCache
+from vectorized import get_numpy, rans_encode_lanes, rans_decode_lanes
+
+
+# Magic number at the beginning of an ANS compression file
+ANS_MAGIC = b'ANS1'
+
+# The frequencies are scaled to a sum of 2 ** SCALE_BITS
+SCALE_BITS = 12
+SCALE = 1 << SCALE_BITS
+
+# The states stay between STATE_LOW and 2 ** 32, 16 bits are written or read
+# at once when a state leaves this interval
+STATE_LOW = 1 << 16
+WORD_BITS = 16
+
+# Number of symbols by lane, and maximum number of lanes: the symbol i is
+# coded by the lane i % nb_lanes, each lane has its own state
+LANE_SYMBOLS = 1 << 10
+MAX_LANES = 1 << 14
+
+# Minimal number of lanes to code them with NumPy
+NUMPY_MIN_LANES = 32
+
+# Each step of the NumPy decoder costs about 15 us, whatever the number of
+# lanes, and the pure Python decoder is slower than the Huffman table
+# decoder: rANS is only faster to decode from about 2 ** 19 symbols with
+# NumPy, the shorter sequences are coded by Huffman
+ANS_MIN_SYMBOLS = 1 << 19
+
+
+def nb_lanes(len_seq: int):
+    """ This function give the number of interleaved states used for a
+    sequence. Each lane costs 4 bytes (its final state), and the NumPy path
+    codes all the lanes at once, so long sequences use many lanes.
+
+    Parameter
+    ---------
+    len_seq : int
+        number of symbols
+
+    Return
+    ------
+    nb_lanes : int
+        number of lanes, 0 for an empty sequence
+    """
+
+    if len_seq == 0:
+        return 0
+    return min(max(len_seq // LANE_SYMBOLS, 1), MAX_LANES)
+
+
+def use_ans(len_seq: int):
+    """ This function test if a sequence is coded by rANS, or by Huffman
+    because rANS would be slower to decode.
+
+    Parameter
+    ---------
+    len_seq : int
+        number of symbols
+
+    Return
+    ------
+    ans : bool
+        True to code the sequence by rANS
+    """
+
+    return len_seq >= ANS_MIN_SYMBOLS and get_numpy() is not None
+
+
+def normalize_frequencies(freq: dict, scale: int = SCALE):
+    """ This function scale the frequencies to a sum of scale, each symbol
+    of the sequence keeping at least 1.
+
+    Parameters
+    ----------
+    freq : dict
+        frequency dictionary of the symbols
+    scale : int
+        sum of the scaled frequencies
+
+    Return
+    ------
+    scaled : dict
+        scaled frequency of the symbols of the sequence
+    """
+
+    total = sum(freq.values())
+    if total == 0:
+        # Empty sequence: any symbol, which is never coded
+        return {next(iter(freq)): scale}
+
+    scaled = {char: max(count * scale // total, 1)
+              for char, count in freq.items() if count > 0}
+    # The difference goes to the most frequent symbols, without going below 1
+    difference = scale - sum(scaled.values())
+    chars = sorted(scaled, key=lambda char: freq[char], reverse=True)
+    i = 0
+    while difference != 0:
+        char = chars[i % len(chars)]
+        if difference > 0:
+            scaled[char] += 1
+            difference -= 1
+        elif scaled[char] > 1:
+            scaled[char] -= 1
+            difference += 1
+        i += 1
+    return scaled
+
+
+class ANSTable:
+    """ Class of the tables of the rANS coder. The symbols are coded by their
+    index in the alphabet, and the decoding table gives, for each of the
+    SCALE slots, the index of the symbol, its frequency and its bias. """
+
+    def __init__(self, scaled: dict):
+        self.alphabet = list(scaled)
+        self.freq = [scaled[char] for char in self.alphabet]
+        self.cum = []
+        total = 0
+        for count in self.freq:
+            self.cum.append(total)
+            total += count
+        if total != SCALE:
+            raise ValueError("ANS frequencies sum to {}, not {}".format(
+                total, SCALE))
+
+        self.slot_index = bytearray(SCALE)
+        self.slot_freq = array('l', [0]) * SCALE
+        self.slot_bias = array('l', [0]) * SCALE
+        for index, (count, start) in enumerate(zip(self.freq, self.cum)):
+            for slot in range(start, start + count, 1):
+                self.slot_index[slot] = index
+                self.slot_freq[slot] = count
+                self.slot_bias[slot] = slot - start
+
+        # Index of each byte of the sequence, the unknown characters are 'N'
+        # as in the Huffman compression
+        self.text = isinstance(self.alphabet[0], str)
+        default = self.alphabet.index('N') if 'N' in self.alphabet else 0
+        byte_index = bytearray([default] * 256)
+        for index, char in enumerate(self.alphabet):
+            code = ord(char) if self.text else char
+            if code < 256:
+                byte_index[code] = index
+        self.byte_index = bytes(byte_index)
+
+    def indexes(self, symbols):
+        """ This method give the index of each symbol of a sequence.
+
+        Parameter
+        ---------
+        symbols : str, PackedSequence or list
+            uppercase sequence, or list of move-to-front symbols
+
+        Return
+        ------
+        indexes : bytes
+            index of each symbol in the alphabet
+        """
+
+        if isinstance(symbols, list):
+            return bytes(symbols).translate(self.byte_index)
+        return str(symbols).encode('latin-1', 'replace').translate(
+            self.byte_index)
+
+    def symbols(self, indexes):
+        """ This method give the symbols of a sequence of indexes.
+
+        Parameter
+        ---------
+        indexes : bytes-like
+            index of each symbol in the alphabet
+
+        Return
+        ------
+        symbols : str or list
+            sequence, or list of move-to-front symbols
+        """
+
+        if self.text:
+            table = bytes([ord(char) for char in self.alphabet])
+            return bytes(indexes).translate(
+                table + bytes(256 - len(table))).decode('latin-1')
+        return [self.alphabet[index] for index in indexes]
+
+
+def rans_encode(indexes: bytes, table: ANSTable):
+    """ This function code a sequence of indexes with interleaved rANS
+    states. The encoder works from the end of the sequence, and the words are
+    written in the order where the decoder reads them.
+
+    Parameters
+    ----------
+    indexes : bytes
+        index of each symbol in the alphabet of the table
+    table : ANSTable
+        frequencies of the symbols
+
+    Return
+    ------
+    data : bytes
+        final state of each lane, then the 16 bits words
+    """
+
+    lanes = nb_lanes(len(indexes))
+    if lanes >= NUMPY_MIN_LANES and get_numpy() is not None:
+        states, words = rans_encode_lanes(indexes, table.freq, table.cum,
+                                          lanes, SCALE_BITS, STATE_LOW)
+        return states + words
+
+    freq = table.freq
+    cum = table.cum
+    # Limit of the state before coding a symbol of frequency 1
+    limit = (STATE_LOW >> SCALE_BITS) << WORD_BITS
+    states = [STATE_LOW] * lanes
+    steps = []
+    nb_steps = (len(indexes) + lanes - 1) // lanes if lanes else 0
+    for step in range(nb_steps - 1, -1, -1):
+        step_words = []
+        start = step * lanes
+        for lane, index in enumerate(indexes[start:start + lanes]):
+            x = states[lane]
+            count = freq[index]
+            if x >= limit * count:
+                step_words.append(x & 0xffff)
+                x >>= WORD_BITS
+            states[lane] = ((x // count) << SCALE_BITS) + x % count + \
+                cum[index]
+        steps.append(step_words)
+
+    words = array('H', [word for step_words in reversed(steps)
+                        for word in step_words])
+    states = array('I', states)
+    if sys.byteorder == 'big':
+        words.byteswap()
+        states.byteswap()
+    return states.tobytes() + words.tobytes()
+
+
+def rans_decode(data, len_seq: int, table: ANSTable):
+    """ This function decode a sequence coded by rans_encode.
+
+    Parameters
+    ----------
+    data : bytes-like
+        final state of each lane, then the 16 bits words
+    len_seq : int
+        number of symbols
+    table : ANSTable
+        frequencies of the symbols
+
+    Return
+    ------
+    indexes : bytes
+        index of each symbol in the alphabet of the table
+    """
+
+    lanes = nb_lanes(len_seq)
+    if len(data) < 4 * lanes or (len(data) - 4 * lanes) % 2:
+        raise ValueError("ANS stream is truncated")
+    if lanes == 0:
+        return b''
+    if lanes >= NUMPY_MIN_LANES and get_numpy() is not None:
+        return rans_decode_lanes(data, len_seq, table.slot_index,
+                                 table.slot_freq, table.slot_bias, lanes,
+                                 SCALE_BITS, STATE_LOW)
+
+    states = array('I', bytes(data[0:4 * lanes]))
+    words = array('H', bytes(data[4 * lanes:]))
+    if sys.byteorder == 'big':
+        states.byteswap()
+        words.byteswap()
+    states = states.tolist()
+
+    slot_index = table.slot_index
+    slot_freq = table.slot_freq
+    slot_bias = table.slot_bias
+    mask = SCALE - 1
+    indexes = bytearray(len_seq)
+    position = 0
+    for start in range(0, len_seq, lanes):
+        for lane in range(0, min(lanes, len_seq - start), 1):
+            x = states[lane]
+            slot = x & mask
+            indexes[start + lane] = slot_index[slot]
+            x = slot_freq[slot] * (x >> SCALE_BITS) + slot_bias[slot]
+            if x < STATE_LOW:
+                if position >= len(words):
+                    raise ValueError("ANS stream is truncated")
+                x = (x << WORD_BITS) | words[position]
+                position += 1
+            states[lane] = x
+    # The decoder ends where the encoder started
+    if position != len(words) or any(x != STATE_LOW for x in states):
+        raise ValueError("ANS stream does not match its length")
+    return bytes(indexes)
+
+
+class ANSCompression(HuffmanCompression):
+    """ Class of compression by asymmetric numeral systems (rANS). The
+    frequency pass is the one of the Huffman compression, then the
+    frequencies are scaled to 2 ** SCALE_BITS: a symbol costs about
+    -log2(p) bits instead of a whole number of bits. A sequence shorter than
+    ANS_MIN_SYMBOLS, or without NumPy, gives a Huffman compression, so the
+    decoding is never slower than Huffman (see use_ans). """
+
+    name = 'ans'
+
+    def __init__(self, sequence, path: str = '../data/ansfile.ans',
+                 mtf_rle: bool = False, max_code_length: int = None,
+                 instruments: NullInstruments = None,
+                 cache: NullCache = None):
+        self.scaled_freq = {}
+        # True if the sequence is coded by Huffman
+        self.huffman = False
+        super().__init__(sequence, path, mtf_rle, max_code_length,
+                         instruments, cache)
+
+    def creation_codes(self, max_code_length: int = None):
+        """ This method scale the frequencies of the symbols, or create the
+        Huffman codes of a short sequence. """
+
+        self.huffman = not use_ans(sum(self.dict_freq.values()))
+        if self.huffman:
+            super().creation_codes(max_code_length)
+        else:
+            self.scaled_freq = normalize_frequencies(self.dict_freq)
+
+    def compression(self):
+        """ This method code the sequence with the scaled frequencies. """
+
+        if self.huffman:
+            super().compression()
+            return
+        table = ANSTable(self.scaled_freq)
+        with self.instruments.stage('ans.encode'):
+            self.compressed_seq = bytearray(rans_encode(
+                table.indexes(self.symbols), table))
+        self.len_binary_seq = 8 * len(self.compressed_seq)
+
+    def cached_result(self):
+        if self.huffman:
+            return super().cached_result()
+        return (self.dict_freq, self.scaled_freq, bytes(self.compressed_seq))
+
+    def restore(self, cached: tuple):
+        # A Huffman compression is kept as 4 values, a rANS one as 3
+        self.huffman = len(cached) == 4
+        if self.huffman:
+            super().restore(cached)
+            return
+        dict_freq, scaled_freq, compressed_seq = cached
+        self.dict_freq = dict(dict_freq)
+        self.scaled_freq = dict(scaled_freq)
+        self.compressed_seq = bytearray(compressed_seq)
+        self.len_binary_seq = 8 * len(self.compressed_seq)
+
+    def header(self):
+        """ This method give the header of the compression file.
+
+        Return
+        ------
+        header : bytearray
+            magic number, number of symbols, kind of symbols and scaled
+            frequencies, or Huffman header
+        """
+
+        if self.huffman:
+            return super().header()
+        # The frequencies are counted on the coded symbols
+        len_seq = sum(self.dict_freq.values())
+        header = bytearray(ANS_MAGIC)
+        header += struct.pack('<QBH', len_seq, self.mtf_rle,
+                              len(self.scaled_freq))
+        for char, count in self.scaled_freq.items():
+            if self.mtf_rle:
+                header += struct.pack('<B', char)
+            else:
+                char_bytes = char.encode('utf-8')
+                header += struct.pack('<B', len(char_bytes)) + char_bytes
+            header += struct.pack('<H', count)
+        return header
+
+
+def read_ans_header(f):
+    """ This function read the header of an ANS compression file. The file
+    is then at the beginning of the coded states and words.
+
+    Parameter
+    ---------
+    f : file object
+        compression file opened in binary mode
+
+    Return
+    ------
+    len_seq : int
+        number of symbols
+    scaled_freq : dict
+        scaled frequency of each symbol
+    mtf_rle : bool
+        True if the symbols are move-to-front and zero run symbols
+    """
+
+    if f.read(len(ANS_MAGIC)) != ANS_MAGIC:
+        raise ValueError("{} is not an ANS compression file".format(
+            getattr(f, 'name', f)))
+
+    len_seq, mtf_rle, nb_char = struct.unpack(
+        '<QBH', f.read(struct.calcsize('<QBH')))
+    scaled_freq = {}
+    for i in range(0, nb_char, 1):
+        if mtf_rle:
+            char = f.read(1)[0]
+        else:
+            len_char = f.read(1)[0]
+            char = f.read(len_char).decode('utf-8')
+        scaled_freq[char], = struct.unpack('<H', f.read(2))
+    return len_seq, scaled_freq, bool(mtf_rle)
+
+
+class ANSDecompression(HuffmanDecompression):
+    """ Class of decompression of an ANS compression. len_seq is the number
+    of symbols and dict_bin_char the scaled frequencies of the header. """
+
+    name = 'ans'
+
+    def __init__(self, compressed_seq, len_seq, scaled_freq,
+                 path: str = '../data/decansfile.txt', mtf_rle: bool = False,
+                 instruments: NullInstruments = None,
+                 cache: NullCache = None):
+        super().__init__(compressed_seq, len_seq, scaled_freq, path, mtf_rle,
+                         instruments, cache)
+
+    @property
+    def initial_binary_seq(self):
+        return self.binary_seq
+
+    def decompression(self):
+        """ This method decode the states and words of the compression to
+        give the initial sequence. """
+
+        table = ANSTable(self.dict_bin_char)
+        with self.instruments.stage('ans.decode'):
+            indexes = rans_decode(self.compressed_seq,
+                                  self.len_init_binary_seq, table)
+            symbols = table.symbols(indexes)
+        if self.mtf_rle:
+            with self.instruments.stage('ans.mtf_rle_decode'):
+                self.initial_seq = mtf_rle_decode(symbols)
+        else:
+            self.initial_seq = symbols
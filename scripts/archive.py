@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+import struct
+
+from bit_stream import BitWriter
+from compression_huffman import read_header
+from huffman_codes import HuffmanTableDecoder
+from huffman_stream import HuffmanStreamCompression
+from instrumentation import NullInstruments
+
+
+# Magic number at the beginning of an archive file, then the len of the
+# sequence and the number of characters by block
+ARCHIVE_MAGIC = b'HUFA'
+ARCHIVE_HEADER = '<QI'
+# Byte offset and number of bits of each block in the index
+INDEX_ENTRY = '<QQ'
+# Byte offset of the index, at the end of the file
+ARCHIVE_FOOTER = '<Q'
+
+
+class HuffmanArchive(HuffmanStreamCompression):
+    """ Class of Huffman compression in independent blocks, for random
+    access. All the blocks use the same codes, each block begins on a new
+    byte, and an index at the end of the file gives the position and the
+    number of bits of each block. A region of the sequence is decoded from
+    the blocks which contain it only. """
+
+    def __init__(self, chunks, block_size: int = 1 << 16,
+                 max_code_length: int = None,
+                 instruments: NullInstruments = None):
+        self.block_size = block_size
+        super().__init__(chunks, max_code_length, instruments)
+
+    def blocks(self):
+        """ This method regroup the parts of the sequence in blocks of
+        block_size characters.
+
+        Return
+        ------
+        blocks : generator
+            uppercase blocks of the sequence, the last one can be shorter
+        """
+
+        rest = ""
+        for chunk in self.chunks():
+            rest += chunk.upper()
+            nb_full = len(rest) // self.block_size * self.block_size
+            for start in range(0, nb_full, self.block_size):
+                yield rest[start:start + self.block_size]
+            rest = rest[nb_full:]
+        if rest:
+            yield rest
+
+    def write_compression(self, f):
+        """ This method compress the blocks of the sequence and write the
+        archive in an opened file.
+
+        Parameter
+        ---------
+        f : file object
+            file opened in binary mode
+        """
+
+        len_seq = sum(self.dict_freq.values())
+        f.write(ARCHIVE_MAGIC + struct.pack(ARCHIVE_HEADER, len_seq,
+                                            self.block_size))
+        header = self.header()
+        f.write(header)
+        offset = len(ARCHIVE_MAGIC) + struct.calcsize(ARCHIVE_HEADER) + \
+            len(header)
+
+        index = []
+        for block in self.blocks():
+            writer = BitWriter()
+            with self.instruments.stage(self.name + '.encode'):
+                self.encode(block, writer)
+                data = writer.flush()
+            index.append((offset, writer.len_bits))
+            with self.instruments.stage(self.name + '.write'):
+                f.write(data)
+            offset += len(data)
+            self.instruments.count(self.name + '.input_chars', len(block))
+            self.instruments.count(self.name + '.output_bytes', len(data))
+
+        f.write(struct.pack('<I', len(index)))
+        for entry in index:
+            f.write(struct.pack(INDEX_ENTRY, *entry))
+        f.write(struct.pack(ARCHIVE_FOOTER, offset))
+
+
+class ArchiveReader:
+    """ Class of random access reader of an archive written by
+    HuffmanArchive. The index is read when the archive is opened, then each
+    region only reads and decodes its blocks. """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.read_index()
+        except Exception:
+            self.file.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """ This method close the archive file. """
+
+        self.file.close()
+
+    def __len__(self):
+        return self.len_seq
+
+    def read_index(self):
+        """ This method read the header, the codes and the index of the
+        archive. """
+
+        f = self.file
+        if f.read(len(ARCHIVE_MAGIC)) != ARCHIVE_MAGIC:
+            raise ValueError("{} is not an archive file".format(self.path))
+        self.len_seq, self.block_size = struct.unpack(
+            ARCHIVE_HEADER, f.read(struct.calcsize(ARCHIVE_HEADER)))
+        len_binary_seq, dict_char, mtf_rle = read_header(f)
+        codes = {char: (int(code, 2), len(code))
+                 for char, code in dict_char.items()}
+        self.decoder = HuffmanTableDecoder(codes)
+
+        f.seek(-struct.calcsize(ARCHIVE_FOOTER), 2)
+        index_offset, = struct.unpack(ARCHIVE_FOOTER, f.read(
+            struct.calcsize(ARCHIVE_FOOTER)))
+        f.seek(index_offset)
+        nb_blocks, = struct.unpack('<I', f.read(4))
+        data = f.read(nb_blocks * struct.calcsize(INDEX_ENTRY))
+        self.index = list(struct.iter_unpack(INDEX_ENTRY, data))
+        if len(self.index) != nb_blocks:
+            raise ValueError("{}: the index is truncated".format(self.path))
+
+    def block(self, i: int):
+        """ This method decode a block.
+
+        Parameter
+        ---------
+        i : int
+            index of the block
+
+        Return
+        ------
+        block : str
+            characters of the block
+        """
+
+        offset, nb_bits = self.index[i]
+        self.file.seek(offset)
+        return self.decoder.decode(self.file.read((nb_bits + 7) // 8),
+                                   nb_bits)
+
+    def extract(self, start: int, end: int):
+        """ This method decode a region of the sequence.
+
+        Parameters
+        ----------
+        start : int
+            position of the first character of the region
+        end : int
+            position after the last character of the region
+
+        Return
+        ------
+        region : str
+            characters between start and end
+        """
+
+        start = max(start, 0)
+        end = min(end, self.len_seq)
+        if start >= end:
+            return ""
+        first = start // self.block_size
+        last = (end - 1) // self.block_size
+        region = "".join([self.block(i) for i in range(first, last+1, 1)])
+        offset = first * self.block_size
+        return region[start - offset:end - offset]
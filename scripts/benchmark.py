@@ -0,0 +1,389 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import platform
+import random
+import subprocess
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    # No peak RSS outside Unix
+    resource = None
+
+from BWT import TransformeeBW
+from compression_huffman import HuffmanCompression, HuffmanDecompression
+
+
+# Number of characters generated at once
+GENERATION_CHUNK = 1 << 20
+
+# Larger sizes are skipped for these stages, unless --no-limit is given: the
+# suffix array of the BWT holds one Python int by character
+SIZE_LIMITS = {'bwt': 10 ** 7, 'unbwt': 10 ** 7, 'huff_mtf': 10 ** 7,
+               'unhuff_mtf': 10 ** 7}
+
+
+def generate_uniform(size: int, rng: random.Random):
+    """ This function generate a sequence where A, C, G, T are equally
+    likely.
+
+    Parameters
+    ----------
+    size : int
+        number of characters
+    rng : random.Random
+        random generator
+
+    Return
+    ------
+    sequence : str
+        DNA sequence
+    """
+
+    return "".join([
+        "".join(rng.choices("ACGT", k=min(GENERATION_CHUNK, size - start)))
+        for start in range(0, size, GENERATION_CHUNK)])
+
+
+def generate_skewed(size: int, rng: random.Random):
+    """ This function generate a sequence rich in A and T (like an AT-rich
+    genome), with a few N. """
+
+    return "".join([
+        "".join(rng.choices("ACGTN", weights=[35, 14, 14, 35, 2],
+                            k=min(GENERATION_CHUNK, size - start)))
+        for start in range(0, size, GENERATION_CHUNK)])
+
+
+def generate_repetitive(size: int, rng: random.Random):
+    """ This function generate a sequence made of copies of a 1 kb motif,
+    with 1 % of mutations (like tandem repeats). """
+
+    motif = generate_uniform(1000, rng)
+    sequence = bytearray((motif * (size // len(motif) + 1))[0:size].encode())
+    for i in range(0, size // 100, 1):
+        sequence[rng.randrange(size)] = ord(rng.choice("ACGT"))
+    return sequence.decode()
+
+
+def generate_n_rich(size: int, rng: random.Random):
+    """ This function generate a uniform sequence where runs of N (like the
+    gaps of an assembly) cover about 20 % of the sequence. """
+
+    pieces = []
+    length = 0
+    while length < size:
+        part = generate_uniform(min(rng.randint(100, 5000), size - length),
+                                rng)
+        gap = "N" * min(rng.randint(25, 1250), size - length - len(part))
+        pieces += [part, gap]
+        length += len(part) + len(gap)
+    return "".join(pieces)
+
+
+GENERATORS = {'uniform': generate_uniform,
+              'skewed': generate_skewed,
+              'repetitive': generate_repetitive,
+              'n_rich': generate_n_rich}
+
+
+def peak_rss_mb():
+    """ This function give the peak resident memory of the process.
+
+    Return
+    ------
+    peak : float
+        peak RSS in MB, None if it is unknown
+    """
+
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    if sys.platform == 'darwin':
+        return peak / 1e6
+    return peak / 1e3
+
+
+def run_case(generator: str, size: int, stage: str, seed: int,
+             repeat: int = 1):
+    """ This function run one stage on one generated sequence. It is run in a
+    new process, so that the peak RSS is the one of this case only (it
+    includes the generation of the sequence and the preparation of the input
+    of the stage).
+
+    Parameters
+    ----------
+    generator : str
+        name of the sequence generator
+    size : int
+        number of characters of the sequence
+    stage : str
+        'bwt', 'unbwt', 'huff', 'unhuff', 'huff_mtf' or 'unhuff_mtf' (the
+        stages with move-to-front compress the BWT sequence, as after a BWT)
+    seed : int
+        seed of the random generator
+    repeat : int
+        number of runs of the stage, the best time is kept
+
+    Return
+    ------
+    result : dict
+        time, throughput, peak RSS and compression ratio
+    """
+
+    sequence = GENERATORS[generator](size, random.Random(seed))
+    bwt = TransformeeBW(None)
+    mtf_rle = stage.endswith('_mtf')
+    if mtf_rle or stage == 'unbwt':
+        bwt_seq = bwt.transformation_seq(sequence, path=None)
+    if mtf_rle:
+        sequence = bwt_seq
+    compression = None
+    if stage.startswith('unhuff'):
+        compression = HuffmanCompression(sequence, path=None, mtf_rle=mtf_rle)
+
+    seconds = None
+    for i in range(0, repeat, 1):
+        start = time.perf_counter()
+        if stage == 'bwt':
+            bwt.transformation_seq(sequence, path=None)
+        elif stage == 'unbwt':
+            bwt.reconstruction_seq(bwt_seq)
+        elif stage.startswith('huff'):
+            compression = HuffmanCompression(sequence, path=None,
+                                             mtf_rle=mtf_rle)
+        else:
+            HuffmanDecompression(compression.compressed_seq,
+                                 compression.len_binary_seq,
+                                 compression.dict_char, path=None,
+                                 mtf_rle=mtf_rle)
+        elapsed = time.perf_counter() - start
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+
+    ratio = None
+    if compression is not None:
+        ratio = size / max(len(compression.compressed_seq), 1)
+
+    return {'generator': generator,
+            'size': size,
+            'stage': stage,
+            'seconds': seconds,
+            'mb_per_s': size / 1e6 / seconds if seconds > 0 else None,
+            'peak_rss_mb': peak_rss_mb(),
+            'ratio': ratio}
+
+
+def run_isolated(case: tuple):
+    """ This function run a case in a new process.
+
+    Parameter
+    ---------
+    case : tuple
+        arguments of run_case
+
+    Return
+    ------
+    result : dict
+        result of run_case
+    """
+
+    with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+        return pool.apply(run_case, case)
+
+
+def format_result(result: dict):
+    """ This function give the line which displays a result.
+
+    Parameter
+    ---------
+    result : dict
+        result of run_case
+
+    Return
+    ------
+    line : str
+        generator, size, stage, throughput, peak RSS and ratio
+    """
+
+    line = "{generator:>10} {size:>10} {stage:>10}".format(**result)
+    if result['mb_per_s'] is not None:
+        line += " {:9.3f} MB/s".format(result['mb_per_s'])
+    if result['peak_rss_mb'] is not None:
+        line += " {:8.1f} MB peak".format(result['peak_rss_mb'])
+    if result['ratio'] is not None:
+        line += " ratio {:.2f}".format(result['ratio'])
+    return line
+
+
+def environment():
+    """ This function describe the version of the code and of Python, to
+    compare results of different versions.
+
+    Return
+    ------
+    environment : dict
+        commit, Python version, platform and date
+    """
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                                capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return {'commit': commit,
+            'python': platform.python_version(),
+            'numpy': numpy_version,
+            'platform': platform.platform(),
+            'date': datetime.datetime.now().isoformat(timespec='seconds')}
+
+
+def compare(old: dict, new: dict, threshold: float = 0.1):
+    """ This function compare the throughput of the cases of two benchmark
+    results.
+
+    Parameters
+    ----------
+    old : dict
+        previous results
+    new : dict
+        current results
+    threshold : float
+        relative slowdown above which a case is a regression
+
+    Return
+    ------
+    regressions : list
+        (generator, size, stage, old MB/s, new MB/s) of the slower cases
+    """
+
+    old_speeds = {(r['generator'], r['size'], r['stage']): r['mb_per_s']
+                  for r in old['results']}
+    regressions = []
+    for r in new['results']:
+        key = (r['generator'], r['size'], r['stage'])
+        old_speed = old_speeds.get(key)
+        if old_speed and r['mb_per_s'] and \
+                r['mb_per_s'] < old_speed * (1 - threshold):
+            regressions.append(key + (old_speed, r['mb_per_s']))
+    return regressions
+
+
+def parse_size(text: str):
+    """ This function read a size like '1k', '10M' or '1000'.
+
+    Parameter
+    ---------
+    text : str
+        size with an optional suffix k, M or G
+
+    Return
+    ------
+    size : int
+        number of characters
+    """
+
+    multipliers = {'k': 10 ** 3, 'M': 10 ** 6, 'G': 10 ** 9}
+    if text[-1:] in multipliers:
+        return int(float(text[:-1]) * multipliers[text[-1]])
+    return int(text)
+
+
+def create_parser():
+    """ This function create the parser of the command line.
+
+    Return
+    ------
+    parser : argparse.ArgumentParser
+        parser of the benchmark options
+    """
+
+    parser = argparse.ArgumentParser(
+        prog="python benchmark.py",
+        description="Benchmark of the BWT and the Huffman compression on "
+                    "synthetic DNA sequences.")
+    parser.add_argument("--sizes", default="1k,10k,100k,1M,10M,100M",
+                        help="comma separated sizes (suffix k, M or G)")
+    parser.add_argument("--generators", default=",".join(GENERATORS),
+                        help="comma separated generators among "
+                             + ", ".join(GENERATORS))
+    parser.add_argument("--stages",
+                        default="bwt,unbwt,huff,unhuff,huff_mtf,unhuff_mtf",
+                        help="comma separated stages")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="number of runs of each case, the best time "
+                             "is kept")
+    parser.add_argument("--seed", type=int, default=2021,
+                        help="seed of the generators")
+    parser.add_argument("--no-limit", action="store_true",
+                        help="also run the BWT on the sizes above {}"
+                             .format(SIZE_LIMITS['bwt']))
+    parser.add_argument("-o", "--output", default=None,
+                        help="JSON file of the results")
+    parser.add_argument("--compare", default=None,
+                        help="JSON file of previous results, the slower "
+                             "cases are reported")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative slowdown reported by --compare")
+    return parser
+
+
+def main(argv=None):
+    """ This function run the benchmark given in the command line.
+
+    Parameter
+    ---------
+    argv : list
+        arguments of the command line, sys.argv[1:] if None
+    """
+
+    args = create_parser().parse_args(argv)
+    sizes = [parse_size(size) for size in args.sizes.split(',')]
+    results = []
+
+    for generator in args.generators.split(','):
+        for size in sizes:
+            for stage in args.stages.split(','):
+                if not args.no_limit and size > SIZE_LIMITS.get(stage, size):
+                    continue
+                result = run_isolated((generator, size, stage, args.seed,
+                                       args.repeat))
+                results.append(result)
+                print(format_result(result), flush=True)
+
+    report = {'environment': environment(), 'results': results}
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        for generator, size, stage, old_speed, new_speed in regressions:
+            print("slower: {} {} {}: {:.3f} -> {:.3f} MB/s".format(
+                generator, size, stage, old_speed, new_speed))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+class BitWriter:
+    """ Class which packs variable-length binary codes into bytes. The first
+    bit written is the most significant bit of the first byte. """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.len_bits = 0
+        self.acc = 0
+        self.nb_acc_bits = 0
+
+    def write(self, code: int, length: int):
+        """ This method add a binary code at the end of the stream.
+
+        Parameters
+        ----------
+        code : int
+            binary code, its length lower bits are written
+        length : int
+            number of bits of the code
+        """
+
+        self.acc = (self.acc << length) | code
+        self.nb_acc_bits += length
+        self.len_bits += length
+
+        # Move the complete bytes of the accumulator into the buffer
+        if self.nb_acc_bits >= 64:
+            nb_bytes = self.nb_acc_bits // 8
+            self.nb_acc_bits -= nb_bytes * 8
+            self.buffer += (self.acc >> self.nb_acc_bits).to_bytes(nb_bytes,
+                                                                   'big')
+            self.acc &= (1 << self.nb_acc_bits) - 1
+
+    def take_bytes(self):
+        """ This method remove the complete bytes written so far from the
+        buffer, the bits which do not make a complete byte stay in the
+        writer.
+
+        Return
+        ------
+        data : bytearray
+            complete bytes written since the last call
+        """
+
+        nb_bytes = self.nb_acc_bits // 8
+        if nb_bytes:
+            self.nb_acc_bits -= nb_bytes * 8
+            self.buffer += (self.acc >> self.nb_acc_bits).to_bytes(nb_bytes,
+                                                                   'big')
+            self.acc &= (1 << self.nb_acc_bits) - 1
+        data = self.buffer
+        self.buffer = bytearray()
+        return data
+
+    def flush(self):
+        """ This method add, if needed, 0 to complete the last byte.
+
+        Return
+        ------
+        data : bytearray
+            bytes written since the last call of take_bytes
+        """
+
+        padding = (8 - self.nb_acc_bits % 8) % 8
+        self.acc <<= padding
+        self.nb_acc_bits += padding
+        return self.take_bytes()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import os
+import re
+import struct
+
+from BWT import TransformeeBW
+from entropy_coders import coder_name, compress, decompress
+from huffman_stream import read_chunks
+from suffix_array import cyclic_suffix_array, bwt_from_suffix_array
+
+
+# Magic number at the beginning of a block compression file
+BLOCK_MAGIC = b'BWTB'
+
+# Header of a block: flags, len of the block, row of '$' in the BWT sequence
+# and number of bytes of the entropy coding which follows
+BLOCK_HEADER = '<BIII'
+
+# Flag of the blocks whose BWT sequence goes through move-to-front and zero
+# run encoding before Huffman compression
+FLAG_MTF_RLE = 1
+
+# Flags of the blocks coded by rANS, or by Huffman with several tables,
+# instead of Huffman
+FLAG_ANS = 2
+FLAG_MULTI = 4
+CODER_FLAGS = {'huffman': 0, 'ans': FLAG_ANS, 'multi': FLAG_MULTI}
+
+
+def normalize_block(block: str):
+    """ This function give the uppercase block where the characters which
+    are not A, C, G, T are replaced by 'N', as in Huffman compression.
+
+    Parameter
+    ---------
+    block : str
+        part of the DNA sequence
+
+    Return
+    ------
+    block : str
+        normalized block
+    """
+
+    return re.sub('[^ACGTN]', 'N', block.upper())
+
+
+def compress_block(block: str, mtf_rle: bool = False,
+                   coder: str = 'huffman'):
+    """ This function make the Burrows-Weeler transformation and the Huffman
+    or rANS compression of a block. The '$' is removed from the BWT sequence
+    and its row is stored in the header, like in bzip2.
+
+    Parameters
+    ----------
+    block : str
+        part of the DNA sequence
+    mtf_rle : bool
+        if True, make move-to-front and zero run encoding of the BWT sequence
+        before Huffman compression
+    coder : str
+        entropy coder, 'huffman', 'ans', 'multi', or 'best' for the smaller
+        coding of the block
+
+    Return
+    ------
+    data : bytes
+        header and Huffman compression of the block
+    """
+
+    seq = normalize_block(block) + "$"
+    bwt = bwt_from_suffix_array(seq, cyclic_suffix_array(seq))
+    primary = bwt.index('$')
+
+    bwt = bwt[0:primary] + bwt[primary+1:]
+    coders = tuple(CODER_FLAGS) if coder == 'best' else (coder,)
+    codings = []
+    for name in coders:
+        compression = compress(bwt, name, path=None, mtf_rle=mtf_rle)
+        codings.append((len(compression.compressed_seq), name,
+                        compression.header() + compression.compressed_seq))
+    len_data, coder, data = min(codings)
+    # The flag is the one of the coder which was used: a short block given
+    # to rANS is coded by Huffman
+    flags = (FLAG_MTF_RLE if mtf_rle else 0) | CODER_FLAGS[coder_name(data)]
+
+    return struct.pack(BLOCK_HEADER, flags, len(seq)-1, primary,
+                       len(data)) + data
+
+
+def decompress_block(data):
+    """ This function give the part of the DNA sequence of a block
+    compressed by compress_block. Each block can be decompressed alone.
+
+    Parameter
+    ---------
+    data : bytes-like
+        header and Huffman compression of the block
+
+    Return
+    ------
+    block : str
+        part of the DNA sequence
+
+    Exception
+    ---------
+    ValueError
+        if the block is truncated or damaged
+    """
+
+    header_size = struct.calcsize(BLOCK_HEADER)
+    if len(data) < header_size:
+        raise ValueError("block is shorter than its header")
+    flags, len_block, primary, len_huffman = \
+        struct.unpack_from(BLOCK_HEADER, data)
+    coding = data[header_size:]
+    if len(coding) != len_huffman:
+        raise ValueError("block is shorter than its coding")
+    # The coder of the block is found by the magic number of its coding
+    decompression = decompress(coding, path=None)
+    bwt = decompression.initial_seq
+    expected_flags = (FLAG_MTF_RLE if decompression.mtf_rle else 0) | \
+        CODER_FLAGS[coder_name(coding)]
+    if flags != expected_flags:
+        raise ValueError("block flags {} do not match its coding".format(
+            flags))
+    # The block has as many characters as its BWT sequence without '$',
+    # and the '$' is only given by its row in the header
+    if len(bwt) != len_block:
+        raise ValueError("block has {} characters, its header says "
+                         "{}".format(len(bwt), len_block))
+    if primary > len(bwt) or '$' in bwt:
+        raise ValueError("block has a wrong row of '$'")
+
+    block = TransformeeBW.reconstruction_lf(bwt[0:primary] + "$" +
+                                            bwt[primary:])
+    # The LF-mapping of a damaged BWT sequence goes back to the row of '$'
+    # before the start of the block
+    if '$' in block:
+        raise ValueError("block is not a BWT sequence")
+    return block
+
+
+class BlockPipeline:
+    """ Class of BWT and Huffman compression by independent blocks. The blocks
+    are compressed in parallel by a pool of processes, and written in order.
+    """
+
+    def __init__(self, block_size: int = 1 << 19, workers: int = None,
+                 mtf_rle: bool = True, coder: str = 'huffman'):
+        self.block_size = block_size
+        self.workers = workers
+        self.mtf_rle = mtf_rle
+        self.coder = coder
+
+    def parallel_map(self, function, items):
+        """ This method apply a function to the items in a pool of processes.
+        At most two items by process are waiting, so the items can be read
+        progressively.
+
+        Parameters
+        ----------
+        function : function
+            function defined at the top level of a module
+        items : iterable
+            arguments of the function
+
+        Return
+        ------
+        results : generator
+            results of the function, in the order of the items
+        """
+
+        workers = self.workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            max_pending = 2 * workers
+            pending = []
+            for item in items:
+                pending.append(executor.submit(function, item))
+                if len(pending) >= max_pending:
+                    yield pending.pop(0).result()
+            for future in pending:
+                yield future.result()
+
+    def compress(self, blocks, path: str):
+        """ This method compress blocks of sequence and save them.
+
+        Parameters
+        ----------
+        blocks : iterable
+            parts of the DNA sequence
+        path : str
+            path of the compression file
+        """
+
+        with open(path, 'wb') as f:
+            self.write_blocks(blocks, f)
+
+    def write_blocks(self, blocks, f):
+        """ This method compress blocks of sequence and writes them in an
+        opened file.
+
+        Parameters
+        ----------
+        blocks : iterable
+            parts of the DNA sequence
+        f : file object
+            compression file opened in binary mode
+        """
+
+        f.write(BLOCK_MAGIC)
+        f.write(struct.pack('<I', self.block_size))
+        non_empty_blocks = (block for block in blocks if block)
+        for data in self.parallel_map(partial(compress_block,
+                                              mtf_rle=self.mtf_rle,
+                                              coder=self.coder),
+                                      non_empty_blocks):
+            f.write(data)
+
+    def compress_file(self, input_path: str, output_path: str):
+        """ This method compress a sequence file by blocks of block_size
+        characters.
+
+        Parameters
+        ----------
+        input_path : str
+            path of the sequence file
+        output_path : str
+            path of the compression file
+        """
+
+        self.compress(read_chunks(input_path, self.block_size), output_path)
+
+    @staticmethod
+    def read_blocks(path: str):
+        """ This method read the compressed blocks of a file one by one.
+
+        Parameter
+        ---------
+        path : str
+            path of the compression file
+
+        Return
+        ------
+        data : generator
+            header and Huffman compression of each block
+        """
+
+        with open(path, 'rb') as f:
+            for data in BlockPipeline.iter_blocks(f):
+                yield data
+
+    @staticmethod
+    def iter_blocks(f):
+        """ This method read the compressed blocks of an opened file one by
+        one.
+
+        Parameter
+        ---------
+        f : file object
+            compression file opened in binary mode
+
+        Return
+        ------
+        data : generator
+            header and Huffman compression of each block
+
+        Exception
+        ---------
+        ValueError
+            if the file is not a block compression file, or is truncated
+        """
+
+        name = getattr(f, 'name', f)
+        header_size = struct.calcsize(BLOCK_HEADER)
+        if f.read(len(BLOCK_MAGIC)) != BLOCK_MAGIC:
+            raise ValueError("{} is not a block compression file".format(
+                name))
+        data = f.read(struct.calcsize('<I'))
+        if len(data) != struct.calcsize('<I'):
+            raise ValueError("{} is truncated".format(name))
+        block_size, = struct.unpack('<I', data)
+        if block_size == 0:
+            raise ValueError("{} has a block size of 0".format(name))
+        header = f.read(header_size)
+        while header:
+            if len(header) != header_size:
+                raise ValueError("{} is truncated in a block header".format(
+                    name))
+            flags, len_block, primary, len_huffman = \
+                struct.unpack(BLOCK_HEADER, header)
+            # The blocks are never empty, nor longer than the block size
+            if not 0 < len_block <= block_size:
+                raise ValueError("{} has a block of {} characters, for "
+                                 "blocks of {}".format(name, len_block,
+                                                       block_size))
+            coding = f.read(len_huffman)
+            if len(coding) != len_huffman:
+                raise ValueError("{} is truncated in a block".format(name))
+            yield header + coding
+            header = f.read(header_size)
+
+    def decompress(self, input_path: str, output_path: str):
+        """ This method decompress all the blocks of a file in parallel and
+        writes the DNA sequence.
+
+        Parameters
+        ----------
+        input_path : str
+            path of the compression file
+        output_path : str
+            path of the DNA sequence file
+        """
+
+        with open(input_path, 'rb') as f_in, open(output_path, 'w') as f_out:
+            self.read_write_blocks(f_in, f_out)
+
+    def read_write_blocks(self, f_in, f_out):
+        """ This method decompress all the blocks of an opened file in
+        parallel and writes the DNA sequence in another opened file.
+
+        Parameters
+        ----------
+        f_in : file object
+            compression file opened in binary mode
+        f_out : file object
+            DNA sequence file opened in text mode
+        """
+
+        for block in self.parallel_map(decompress_block,
+                                       self.iter_blocks(f_in)):
+            f_out.write(block)
@@ -0,0 +1,430 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+import argparse
+import sys
+
+from BWT import TransformeeBW
+from entropy_coders import ENTROPY_CODERS, compress, decompress
+from instrumentation import create_instruments
+
+
+def open_input(path: str, binary: bool = False):
+    """ This function open the input file, or give the standard input if the
+    path is '-'.
+
+    Parameters
+    ----------
+    path : str
+        path of the input file, or '-'
+    binary : bool
+        True to read bytes, False to read text
+
+    Return
+    ------
+    f : file object
+        opened input
+    """
+
+    if path == '-':
+        return sys.stdin.buffer if binary else sys.stdin
+    return open(path, 'rb' if binary else 'r')
+
+
+def open_output(path: str, binary: bool = False):
+    """ This function open the output file, or give the standard output if
+    the path is '-'.
+
+    Parameters
+    ----------
+    path : str
+        path of the output file, or '-'
+    binary : bool
+        True to write bytes, False to write text
+
+    Return
+    ------
+    f : file object
+        opened output
+    """
+
+    if path == '-':
+        return sys.stdout.buffer if binary else sys.stdout
+    return open(path, 'wb' if binary else 'w')
+
+
+def read_sequence(path: str):
+    """ This function read a whole sequence, without line breaks.
+
+    Parameter
+    ---------
+    path : str
+        path of the sequence file, or '-'
+
+    Return
+    ------
+    sequence : str
+        sequence of the file
+    """
+
+    f = open_input(path)
+    sequence = f.read().replace('\n', '').replace('\r', '')
+    if f is not sys.stdin:
+        f.close()
+    return sequence
+
+
+def write_result(path: str, result, binary: bool = False):
+    """ This function write the result of a command.
+
+    Parameters
+    ----------
+    path : str
+        path of the output file, or '-'
+    result : str or bytes
+        result of the command
+    binary : bool
+        True if result is bytes
+    """
+
+    f = open_output(path, binary)
+    f.write(result)
+    if f in (sys.stdout, sys.stdout.buffer):
+        f.flush()
+    else:
+        f.close()
+
+
+def open_records(args):
+    """ This function open the reader of a FASTA or FASTQ input, and save
+    its side streams if they are asked.
+
+    Parameter
+    ---------
+    args : argparse.Namespace
+        arguments of the command
+
+    Return
+    ------
+    reader : MappedReader
+        reader of the input
+    """
+
+    # The readers are only loaded for a FASTA or FASTQ input
+    from seq_readers import open_reader, write_side_stream
+
+    if args.input == '-':
+        sys.exit("cli: a FASTA or FASTQ input must be a file")
+    reader = open_reader(args.input, args.format)
+    if args.headers is not None:
+        write_side_stream(reader.headers(), args.headers)
+    if args.qualities is not None:
+        if args.format != 'fastq':
+            sys.exit("cli: only a FASTQ input has qualities")
+        write_side_stream(reader.qualities(), args.qualities)
+    return reader
+
+
+def command_bwt(args):
+    """ Burrows-Weeler transformation of a DNA sequence. """
+
+    if args.format == 'raw':
+        sequence = read_sequence(args.input)
+    else:
+        from packed_seq import PackedSequence
+
+        with open_records(args) as reader:
+            sequence = PackedSequence.from_chunks(reader.sequence_chunks())
+    bwt = TransformeeBW(None, instruments=args.instruments,
+                        cache=args.cache).transformation_seq(sequence,
+                                                             path=None)
+    write_result(args.output, bwt)
+
+
+def command_unbwt(args):
+    """ Reconstruction of a DNA sequence from its BWT sequence. """
+
+    seq = TransformeeBW(None, instruments=args.instruments,
+                        cache=args.cache).reconstruction_seq(
+        read_sequence(args.input))
+    if seq is None:
+        sys.exit("cli: the BWT sequence does not contain '$'")
+    write_result(args.output, seq)
+
+
+def command_huff(args):
+    """ Huffman (or rANS) compression of a sequence. """
+
+    if args.format != 'raw':
+        from huffman_stream import HuffmanStreamCompression
+
+        if args.mtf_rle:
+            sys.exit("cli: --mtf-rle needs a raw sequence")
+        if args.coder != 'huffman':
+            sys.exit("cli: --coder {} needs a raw sequence".format(
+                args.coder))
+        with open_records(args) as reader:
+            f = open_output(args.output, binary=True)
+            compression = HuffmanStreamCompression.from_reader(
+                reader, instruments=args.instruments)
+            compression.write_compression(f)
+            if f is sys.stdout.buffer:
+                f.flush()
+            else:
+                f.close()
+        return
+
+    compression = compress(read_sequence(args.input), args.coder, path=None,
+                           mtf_rle=args.mtf_rle,
+                           instruments=args.instruments, cache=args.cache)
+    write_result(args.output,
+                 bytes(compression.header() + compression.compressed_seq),
+                 binary=True)
+
+
+def command_unhuff(args):
+    """ Huffman (or rANS) decompression of a compression file, whose coder
+    is found by its magic number. """
+
+    f = open_input(args.input, binary=True)
+    try:
+        decomp = decompress(f.read(), path=None,
+                            instruments=args.instruments, cache=args.cache)
+    except ValueError as e:
+        sys.exit("cli: {}".format(e))
+    write_result(args.output, decomp.initial_seq)
+
+
+def command_pipeline(args):
+    """ Compression or decompression by blocks of BWT, move-to-front and
+    Huffman. """
+
+    # The process pool is only loaded by this command
+    from block_pipeline import BlockPipeline
+    from huffman_stream import iter_chunks
+
+    pipeline = BlockPipeline(block_size=args.block_size,
+                             workers=args.workers,
+                             mtf_rle=not args.no_mtf_rle,
+                             coder=args.coder)
+    f_in = open_input(args.input, binary=args.decompress)
+    f_out = open_output(args.output, binary=not args.decompress)
+    try:
+        if args.decompress:
+            pipeline.read_write_blocks(f_in, f_out)
+        else:
+            pipeline.write_blocks(iter_chunks(f_in, args.block_size), f_out)
+    except ValueError as e:
+        sys.exit("cli: {}".format(e))
+    finally:
+        # The standard input and output are not closed
+        if args.input != '-':
+            f_in.close()
+        if args.output == '-':
+            f_out.flush()
+        else:
+            f_out.close()
+
+
+def command_archive(args):
+    """ Huffman compression in blocks with an index, for random access. """
+
+    from archive import HuffmanArchive
+    from huffman_stream import read_chunks
+
+    # The sequence is read twice (frequencies, then codes) and the index is
+    # written at the end, so both must be files
+    if args.input == '-' or args.output == '-':
+        sys.exit("cli: an archive is made from a file into a file")
+    compression = HuffmanArchive(lambda: read_chunks(args.input),
+                                 block_size=args.block_size,
+                                 instruments=args.instruments)
+    compression.save_compression(args.output)
+
+
+def command_extract(args):
+    """ Extraction of a region of an archive. """
+
+    from archive import ArchiveReader
+
+    if args.input == '-':
+        sys.exit("cli: an archive must be read from a file")
+    with ArchiveReader(args.input) as reader:
+        end = len(reader) if args.end is None else args.end
+        write_result(args.output, reader.extract(args.start, end))
+
+
+def command_batch(args):
+    """ Huffman compression of the reads of a FASTA or FASTQ file with one
+    code table, and an index of the reads. """
+
+    from read_batch import ReadBatchCompression
+
+    # The reads are read twice (frequencies, then codes) and the index is
+    # written at the end, so both must be files
+    if args.output == '-':
+        sys.exit("cli: the reads are compressed into a file")
+    with open_records(args) as reader:
+        compression = ReadBatchCompression.from_reader(
+            reader, sample_size=args.sample, instruments=args.instruments)
+        compression.save_compression(args.output)
+
+
+def command_unbatch(args):
+    """ Decompression of a range of reads, one read by line. """
+
+    from read_batch import ReadBatchReader
+
+    if args.input == '-':
+        sys.exit("cli: the reads must be read from a file")
+    with ReadBatchReader(args.input) as reader:
+        reads = reader.reads(args.start, args.end)
+    write_result(args.output, "".join([read + "\n" for read in reads]))
+
+
+def create_parser():
+    """ This function create the parser of the command line.
+
+    Return
+    ------
+    parser : argparse.ArgumentParser
+        parser with one sub-command by transformation
+    """
+
+    parser = argparse.ArgumentParser(
+        prog="python -m cli",
+        description="Burrows-Weeler transformation and Huffman compression "
+                    "of DNA sequences, without graphical interface.")
+    parser.add_argument("--profile", action="append", default=[],
+                        metavar="SINK",
+                        help="measure the stages and send the measures to "
+                             "SINK: 'log', 'json:PATH' or 'prometheus:PATH' "
+                             "(can be repeated)")
+    parser.add_argument("--profile-allocations", action="store_true",
+                        help="also measure the memory allocated by each "
+                             "stage (slower)")
+    parser.add_argument("--cache", dest="cache_dir", default=None,
+                        metavar="DIR",
+                        help="keep the results of bwt, unbwt, huff and "
+                             "unhuff in DIR, an input already processed "
+                             "is given back without computation")
+    parser.add_argument("--cache-size", type=int, default=1024,
+                        metavar="MB",
+                        help="size of the cache directory, the results used "
+                             "the longest time ago are removed (default "
+                             "1024)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    commands = [("bwt", command_bwt),
+                ("unbwt", command_unbwt),
+                ("huff", command_huff),
+                ("unhuff", command_unhuff),
+                ("pipeline", command_pipeline),
+                ("archive", command_archive),
+                ("extract", command_extract),
+                ("batch", command_batch),
+                ("unbatch", command_unbatch)]
+    for name, function in commands:
+        subparser = subparsers.add_parser(name, help=function.__doc__.strip())
+        subparser.add_argument("input", nargs="?", default="-",
+                               help="input file, '-' for standard input")
+        subparser.add_argument("-o", "--output", default="-",
+                               help="output file, '-' for standard output")
+        subparser.set_defaults(function=function)
+        if name in ("bwt", "huff"):
+            subparser.add_argument("--format", default="raw",
+                                   choices=["raw", "fasta", "fastq"],
+                                   help="format of the input: raw sequence, "
+                                        "or sequences of the records of a "
+                                        "FASTA or FASTQ file")
+        if name == "batch":
+            subparser.add_argument("--format", default="fastq",
+                                   choices=["fasta", "fastq"],
+                                   help="format of the input")
+            subparser.add_argument("--sample", type=int, default=None,
+                                   metavar="N",
+                                   help="make the code table from the first "
+                                        "N reads only")
+        if name in ("bwt", "huff", "batch"):
+            subparser.add_argument("--headers", default=None,
+                                   help="file where the headers of the "
+                                        "records are saved")
+            subparser.add_argument("--qualities", default=None,
+                                   help="file where the qualities of the "
+                                        "FASTQ records are saved")
+        if name == "huff":
+            subparser.add_argument("--mtf-rle", action="store_true",
+                                   help="move-to-front and zero run encoding "
+                                        "before Huffman (for BWT sequences)")
+            subparser.add_argument("--coder", default="huffman",
+                                   choices=sorted(ENTROPY_CODERS),
+                                   help="entropy coder")
+        if name == "archive":
+            subparser.add_argument("--block-size", type=int, default=1 << 16,
+                                   help="number of characters by block")
+        if name == "extract":
+            subparser.add_argument("--start", type=int, default=0,
+                                   help="position of the first character")
+            subparser.add_argument("--end", type=int, default=None,
+                                   help="position after the last character")
+        if name == "unbatch":
+            subparser.add_argument("--start", type=int, default=0,
+                                   help="index of the first read")
+            subparser.add_argument("--end", type=int, default=None,
+                                   help="index after the last read")
+        if name == "pipeline":
+            subparser.add_argument("-d", "--decompress", action="store_true",
+                                   help="decompress instead of compress")
+            subparser.add_argument("--block-size", type=int, default=1 << 19,
+                                   help="number of characters by block")
+            subparser.add_argument("--workers", type=int, default=None,
+                                   help="number of processes")
+            subparser.add_argument("--no-mtf-rle", action="store_true",
+                                   help="disable move-to-front and zero run "
+                                        "encoding")
+            subparser.add_argument("--coder", default="huffman",
+                                   choices=sorted(ENTROPY_CODERS) + ["best"],
+                                   help="entropy coder, best keeps the "
+                                        "smaller coding of each block")
+    return parser
+
+
+def main(argv=None):
+    """ This function run the command given in the command line.
+
+    Parameter
+    ---------
+    argv : list
+        arguments of the command line, sys.argv[1:] if None
+    """
+
+    args = create_parser().parse_args(argv)
+    try:
+        args.instruments = create_instruments(args.profile,
+                                              args.profile_allocations)
+    except ValueError as error:
+        sys.exit("cli: {}".format(error))
+    args.cache = None
+    if args.cache_dir is not None:
+        from result_cache import ResultCache
+
+        args.cache = ResultCache(directory=args.cache_dir,
+                                 max_disk_bytes=args.cache_size << 20)
+    if 'log' in args.profile:
+        import logging
+
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+    try:
+        args.function(args)
+    finally:
+        args.instruments.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,24 +7,104 @@ __license__ = "MIT"
 __copyright__ = "Copyright 2021, @MeganeBoujeant"
 
 
-from tree_node import TreeNode
+import struct
 
+from tree_node import HuffmanTree
+from bit_stream import BitWriter
+from huffman_codes import canonical_codes, check_code_lengths, \
+    package_merge, HuffmanTableDecoder
+from mtf_rle import mtf_rle_encode, mtf_rle_decode, NB_MTF_SYMBOLS
+from vectorized import use_numpy, byte_view, byte_counts, encode_symbols
+from instrumentation import NullInstruments
+from result_cache import NullCache
+
+
+# Magic number at the beginning of a Huffman compression file
+HUFFMAN_MAGIC = b'HUF1'
 
-class HuffmanCompression:
-    """ Class of Huffman Compression. """
 
-    def __init__(self, sequence: str):
+class HuffmanCompression:
+    """ Class of Huffman Compression. The sequence is a str or a
+    PackedSequence, whose characters are counted without unpacking it. """
+
+    # Name of the entropy coder, for the stages and the cache
+    name = 'huffman'
+
+    def __init__(self, sequence, path: str = '../data/huffile.huf',
+                 mtf_rle: bool = False, max_code_length: int = None,
+                 instruments: NullInstruments = None,
+                 cache: NullCache = None):
+        self.instruments = instruments if instruments is not None \
+            else NullInstruments()
         self.sequence = sequence.upper()
+        self.mtf_rle = mtf_rle
+        self.symbols = None
         self.len_binary_seq = 0
-        self.dict_freq = self.freq_nucleotide()
-        self.tree = self.creation_tree()
+        self.dict_freq = {}
+        self.tree = None
+        self.code_lengths = {}
         self.dict_char = {}
-        self.char_to_str_binary(self.tree)
-        self.binary_seq = ''
-        self.dict_unicode = {}
-        self.seq_unicode = ''
-        self.compression()
-        self.save_compression()
+        self.compressed_seq = bytearray()
+
+        # The cache gives back the compression of a sequence already
+        # compressed with the same parameters
+        cache = cache if cache is not None else NullCache()
+        key = cache.key(self.name, self.sequence, mtf_rle=mtf_rle,
+                        max_code_length=max_code_length)
+        cached = cache.get(key)
+        if cached is not None:
+            self.restore(cached)
+        else:
+            # With mtf_rle, the sequence is compressed as move-to-front and
+            # zero run symbols, which is better after a BWT
+            if mtf_rle:
+                with self.instruments.stage(self.name + '.mtf_rle'):
+                    self.symbols = mtf_rle_encode(str(self.sequence))
+            else:
+                self.symbols = self.sequence
+            with self.instruments.stage(self.name + '.frequencies'):
+                self.dict_freq = self.freq_nucleotide()
+            with self.instruments.stage(self.name + '.codes'):
+                self.creation_codes(max_code_length)
+            self.compression()
+            cache.put(key, self.cached_result())
+        self.instruments.count(self.name + '.input_chars', len(self.sequence))
+        self.instruments.count(self.name + '.output_bytes',
+                               len(self.compressed_seq))
+        if path is not None:
+            with self.instruments.stage(self.name + '.write'):
+                self.save_compression(path)
+
+    def cached_result(self):
+        """ This method give what the cache keeps of the compression.
+
+        Return
+        ------
+        cached : tuple
+            frequencies, code lengths, number of bits and bytes of the
+            compression
+        """
+
+        return (self.dict_freq, self.code_lengths, self.len_binary_seq,
+                bytes(self.compressed_seq))
+
+    def restore(self, cached: tuple):
+        """ This method give back a compression kept in the cache. The tree
+        is not kept, the codes are the canonical codes of the code lengths.
+
+        Parameter
+        ---------
+        cached : tuple
+            frequencies, code lengths, number of bits and bytes of the
+            compression
+        """
+
+        dict_freq, code_lengths, len_binary_seq, compressed_seq = cached
+        self.dict_freq = dict(dict_freq)
+        self.code_lengths = dict(code_lengths)
+        self.canonical_dict_char()
+        self.len_binary_seq = len_binary_seq
+        self.compressed_seq = bytearray(compressed_seq)
 
     def freq_nucleotide(self):
         """ This method create the frequency dictionary of the characters of the
@@ -35,165 +115,369 @@ class HuffmanCompression:
         freq : dict
             frequency dictionary of the characters of the sequence
         """
+        if self.mtf_rle:
+            if use_numpy(self.symbols):
+                counts = byte_counts(byte_view(self.symbols))
+                return {symbol: counts[symbol]
+                        for symbol in range(0, NB_MTF_SYMBOLS, 1)}
+            return {symbol: self.symbols.count(symbol)
+                    for symbol in range(0, NB_MTF_SYMBOLS, 1)}
         freq = {'A': 0, 'C': 0, 'T': 0, 'G': 0, 'N': 0}
-        for char in self.sequence:
-            if char in freq.keys():
-                freq[char] += 1
-            else:
-                freq['N'] += 1
+        return self.update_freq(freq, self.sequence)
+
+    @staticmethod
+    def update_freq(freq: dict, sequence: str):
+        """ This method add the characters of a sequence to a frequency
+        dictionary. The characters which are not in the dictionary are counted
+        as 'N'.
+
+        Parameters
+        ----------
+        freq : dict
+            frequency dictionary that we want to complete
+        sequence : str or PackedSequence
+            uppercase sequence (or part of sequence)
+
+        Return
+        ------
+        freq : dict
+            frequency dictionary completed
+        """
+        # A long text is counted in one pass by NumPy, a packed sequence
+        # counts its bytes itself
+        counts = None
+        if isinstance(sequence, str) and use_numpy(sequence):
+            counts = byte_counts(byte_view(sequence))
+
+        nb_known = 0
+        for char in freq.keys():
+            if char != 'N':
+                if counts is not None and ord(char) < 256:
+                    count = counts[ord(char)]
+                else:
+                    count = sequence.count(char)
+                freq[char] += count
+                nb_known += count
+        freq['N'] += len(sequence) - nb_known
         return freq
 
+    def creation_codes(self, max_code_length: int = None):
+        """ This method create the tree, the code lengths and the canonical
+        codes of the characters.
+
+        Parameter
+        ---------
+        max_code_length : int
+            maximum length of a code, None for no limit
+        """
+
+        self.tree = self.creation_tree()
+        self.code_lengths = self.tree_code_lengths()
+        if max_code_length is not None and \
+                max(self.code_lengths.values()) > max_code_length:
+            freq = {char: self.dict_freq[char] for char in self.code_lengths}
+            self.code_lengths = package_merge(freq, max_code_length)
+        self.canonical_dict_char()
+
     def creation_tree(self):
         """ This method create the binary tree which represent the best
-        compression.
+        compression. The characters which are not in the sequence have no
+        leaf, except to have at least 2 leaves.
 
         Return
         ------
-        tree_list[0] : object
+        root : TreeNode
             root node of the tree
         """
-        tree_list = []
 
-        for char, freq in self.dict_freq.items():
-            # Creation of a list which contain the leaves of the tree
-            tree_list.append(TreeNode(char, freq))
+        chars = [char for char, freq in self.dict_freq.items() if freq > 0]
+        for char in self.dict_freq:
+            if len(chars) >= 2:
+                break
+            if char not in chars:
+                chars.append(char)
+
+        tree = HuffmanTree.build({char: self.dict_freq[char]
+                                  for char in chars})
+        return tree.root
+
+    def tree_code_lengths(self):
+        """ This method give the length of the code of each character, which
+        is the depth of its leaf in the tree.
 
-        while len(tree_list) > 1:
-            # Sorting the list of nodes according to their frequency
-            # Allows to have the 2 smaller frequencies at the beginning
-            # of the list
-            tree_list.sort(key=lambda x: x.data)
+        Return
+        ------
+        code_lengths : dict
+            dictionary with key = character and value = length of its code
+        """
 
-            # Creation of a new node that merges the 2 first nodes of the list
-            new_freq = tree_list[0].data + tree_list[1].data
-            new_char = tree_list[0].char + tree_list[1].char
+        return self.tree.tree.code_lengths()
 
-            # Creation of the new node
-            new_node = TreeNode(new_char, new_freq)
+    def canonical_dict_char(self):
+        """ This method create the dictionary which give the binary code of
+        each character, with the canonical codes of the code lengths.
+        """
 
-            new_node.update_child(tree_list[0], tree_list[1])
+        self.dict_char = {char: format(code, '0{}b'.format(length))
+                          for char, (code, length)
+                          in canonical_codes(self.code_lengths).items()}
 
-            # Added binary path of the 2 nodes that have been merged
-            # And deleting this after added
-            tree_list[0].bin = '0'
-            tree_list.pop(0)
-            tree_list[0].bin = '1'
-            tree_list.pop(0)
+    def compression(self):
+        """ This method compress the sequence. The binary codes of the
+        characters are packed in the bytes of compressed_seq. """
 
-            # Added the new node to the list of nodes
-            tree_list.append(new_node)
+        writer = BitWriter()
+        with self.instruments.stage(self.name + '.encode'):
+            self.encode(self.symbols, writer)
 
-        return tree_list[0]
+        # Storage of the len of the initial binary sequence
+        self.len_binary_seq = writer.len_bits
+
+        # Added, if needed, binary to divide the sequence into 8 binary
+        with self.instruments.stage(self.name + '.pack'):
+            self.compressed_seq = writer.flush()
 
-    def char_to_str_binary(self, node, bin_char=''):
-        """ This method create a dictionary which give the binary number of each
-        character.
-        This binary number corresponds to the path taken from the root of the
-        tree: 0 = left; 1 = right.
+    def encode(self, sequence, writer: BitWriter):
+        """ This method write the binary codes of the characters of a sequence.
 
         Parameters
         ----------
-        node : node object
-            root node of the tree
-        bin_char : str
-            binary character associated with the node according to if is a left
-            child or a right child
+        sequence : str, PackedSequence or list
+            uppercase sequence (or part of sequence), or list of move-to-front
+            symbols
+        writer : BitWriter
+            writer which packs the binary codes
         """
 
-        bin_char = bin_char + node.bin
+        # Binary code of each character as (integer, number of bits)
+        codes = {char: (int(code, 2), len(code))
+                 for char, code in self.dict_char.items()}
+        code_n = codes.get('N')
 
-        if node.is_leaf():
-            self.dict_char[node.char] = bin_char
+        if use_numpy(sequence):
+            encode_symbols(sequence, codes, code_n or (0, 0), writer)
+            return
 
-        if node.left_child:
-            self.char_to_str_binary(node.left_child, bin_char)
-        if node.right_child:
-            self.char_to_str_binary(node.right_child, bin_char)
+        for char in sequence:
+            code, length = codes.get(char, code_n)
+            writer.write(code, length)
 
-    def compression(self):
-        """ This method compress the sequence. This method given the unicode
-        sequence which correspond to the initial sequence. """
+    @property
+    def binary_seq(self):
+        """ Binary sequence of the compression, as a string of '0' and '1'
+        (only used for display). """
 
-        seq = self.sequence
+        return "".join([format(byte, '08b') for byte in self.compressed_seq])
 
-        # Transformation of the sequence into binary sequence
-        for char in seq:
-            if char in self.dict_char.keys():
-                self.binary_seq += self.dict_char[char]
-            else:
-                self.binary_seq += self.dict_char['N']
+    @property
+    def dict_unicode(self):
+        """ Dictionary with key = binary byte and value = unicode character
+        corresponding (only used for display). """
 
-        # Storage of the len of the initial binary sequence
-        self.len_binary_seq = len(self.binary_seq)
+        return {format(byte, '08b'): chr(byte)
+                for byte in self.compressed_seq}
 
-        # Added, if needed, binary to divide the sequence into 8 binary
-        while len(self.binary_seq) % 8 != 0:
-            self.binary_seq = self.binary_seq + '0'
-
-        # Transformation of the 8 bytes sequences in the corresponding unicode
-        # characters
-        # Added this characters in dictionary
-        # and Transformation of the binary sequence to unicode sequence
-        for i in range(0, len(self.binary_seq), 8):
-            self.dict_unicode[self.binary_seq[i:i+8]] = \
-                chr(int(self.binary_seq[i:i+8], 2))
-            self.seq_unicode = self.seq_unicode + \
-                chr(int(self.binary_seq[i:i+8], 2))
-
-    def save_compression(self):
-        """ This method save parameters of Huffman compression. """
-
-        f = open('../data/huffile.txt', 'w')
-        f.write(self.seq_unicode + "\n" + str(self.len_binary_seq) + "\n" +
-                str(self.dict_char))
-        f.close()
+    @property
+    def seq_unicode(self):
+        """ Unicode sequence corresponding to the bytes of the compression
+        (only used for display). """
 
+        return "".join([chr(byte) for byte in self.compressed_seq])
 
-class HuffmanDecompression:
-    """ Class of Huffman Decompression. """
+    def save_compression(self, path: str = '../data/huffile.huf'):
+        """ This method save the Huffman compression in a binary file.
+        The header contains the len of the binary sequence, the kind of
+        symbols and the code length of each symbol, followed by the bytes of
+        the compression. The codes are the canonical codes of these lengths.
 
-    def __init__(self, unicode_sequence, len_seq, dict_bin_char):
-        self.unicode_seq = unicode_sequence
-        self.binary_seq = ""
-        self.len_init_binary_seq = len_seq
-        self.initial_seq = ""
-        self.dict_bin_char = dict_bin_char
-        self.initial_binary_seq = ""
-        self.decompression()
+        Parameter
+        ---------
+        path : str
+            path of the compression file
+        """
 
-    def decompression(self):
-        """ This method decompress the unicode sequence to given the initial
-        sequence. """
+        with open(path, 'wb') as f:
+            f.write(self.header())
+            f.write(self.compressed_seq)
 
-        # Transformation of unicode sequence to binary sequence
-        for char in self.unicode_seq:
-            dec = ord(char)
-            self.binary_seq += format(dec, '08b')
+    def header(self):
+        """ This method give the header of the compression file.
+
+        Return
+        ------
+        header : bytearray
+            magic number, len of the binary sequence, kind of symbols and code
+            lengths
+        """
 
-        self.binary_seq = str(self.binary_seq)
+        header = bytearray(HUFFMAN_MAGIC)
+        header += struct.pack('<QBH', self.len_binary_seq, self.mtf_rle,
+                              len(self.dict_char))
+        for char, code in self.dict_char.items():
+            if self.mtf_rle:
+                header += struct.pack('<B', char)
+            else:
+                char_bytes = char.encode('utf-8')
+                header += struct.pack('<B', len(char_bytes)) + char_bytes
+            header += struct.pack('<B', len(code))
+        return header
+
+
+def load_compression(path: str):
+    """ This function read a Huffman compression file written by
+    HuffmanCompression.save_compression.
+
+    Parameter
+    ---------
+    path : str
+        path of the compression file
+
+    Return
+    ------
+    compressed_seq : bytes
+        bytes of the compression
+    len_binary_seq : int
+        number of bits of the compression, without padding
+    dict_char : dict
+        dictionary with key = character and value = binary code
+    mtf_rle : bool
+        True if the symbols are move-to-front and zero run symbols
+    """
+
+    with open(path, 'rb') as f:
+        len_binary_seq, dict_char, mtf_rle = read_header(f)
+        compressed_seq = f.read()
+
+    return compressed_seq, len_binary_seq, dict_char, mtf_rle
+
+
+def read_header(f):
+    """ This function read the header of a Huffman compression file. The file
+    is then at the beginning of the bytes of the compression.
+
+    Parameter
+    ---------
+    f : file object
+        compression file opened in binary mode
+
+    Return
+    ------
+    len_binary_seq : int
+        number of bits of the compression, without padding
+    dict_char : dict
+        dictionary with key = character and value = binary code
+    mtf_rle : bool
+        True if the symbols are move-to-front and zero run symbols
+
+    Exception
+    ---------
+    ValueError
+        if the file is not a Huffman compression file, or if its code
+        lengths are not the lengths of a complete prefix code
+    """
+
+    if f.read(len(HUFFMAN_MAGIC)) != HUFFMAN_MAGIC:
+        raise ValueError("{} is not a Huffman compression file".format(
+            getattr(f, 'name', f)))
+
+    len_binary_seq, mtf_rle, nb_char = struct.unpack(
+        '<QBH', f.read(struct.calcsize('<QBH')))
+
+    code_lengths = {}
+    for i in range(0, nb_char, 1):
+        if mtf_rle:
+            char = f.read(1)[0]
+        else:
+            len_char = f.read(1)[0]
+            char = f.read(len_char).decode('utf-8')
+        code_lengths[char] = f.read(1)[0]
+    # The codes of a tree of nb_char symbols have at most nb_char - 1 bits
+    check_code_lengths(code_lengths, max(nb_char - 1, 1))
+
+    dict_char = {char: format(code, '0{}b'.format(length))
+                 for char, (code, length)
+                 in canonical_codes(code_lengths).items()}
+
+    return len_binary_seq, dict_char, bool(mtf_rle)
 
-        # Remove binary which was add to obtain a multiple of 8
-        nb_char_over = len(self.binary_seq) - self.len_init_binary_seq
-        self.initial_binary_seq = \
-            self.binary_seq[0:len(self.binary_seq)-nb_char_over]
 
-        # Course of binary sequence and verification if the path corresponds to
-        # a DNA character to rebuild the initial DNA sequence
-        path_in_progress = ""
+class HuffmanDecompression:
+    """ Class of Huffman Decompression. """
 
-        for binary in self.initial_binary_seq:
-            path_in_progress += binary
-            for key, value in self.dict_bin_char.items():
-                if value == path_in_progress:
-                    self.initial_seq += key
-                    path_in_progress = ""
-                    break
+    # Name of the entropy coder, for the stages and the cache
+    name = 'huffman'
 
-        self.save_decompression()
+    def __init__(self, compressed_seq, len_seq, dict_bin_char,
+                 path: str = '../data/dechufile.txt', mtf_rle: bool = False,
+                 instruments: NullInstruments = None,
+                 cache: NullCache = None):
+        self.instruments = instruments if instruments is not None \
+            else NullInstruments()
+        self.compressed_seq = compressed_seq
+        self.len_init_binary_seq = len_seq
+        self.initial_seq = ""
+        self.dict_bin_char = dict_bin_char
+        self.mtf_rle = mtf_rle
+
+        # The cache gives back the sequence of a compression already
+        # decompressed
+        cache = cache if cache is not None else NullCache()
+        key = cache.key('un' + self.name, compressed_seq, len_seq=len_seq,
+                        codes=sorted(dict_bin_char.items()), mtf_rle=mtf_rle)
+        cached = cache.get(key)
+        if cached is not None:
+            self.initial_seq = cached
+        else:
+            self.decompression()
+            cache.put(key, self.initial_seq)
+        self.instruments.count(self.name + '.input_bytes',
+                               len(compressed_seq))
+        self.instruments.count(self.name + '.output_chars',
+                               len(self.initial_seq))
+        if path is not None:
+            with self.instruments.stage(self.name + '.write'):
+                self.save_decompression(path)
+
+    @property
+    def binary_seq(self):
+        """ Binary sequence of the bytes of the compression, as a string of
+        '0' and '1' (only used for display). """
+
+        return "".join([format(byte, '08b') for byte in self.compressed_seq])
+
+    @property
+    def initial_binary_seq(self):
+        """ Binary sequence without the binary which was add to obtain a
+        multiple of 8 (only used for display). """
+
+        return self.binary_seq[0:self.len_init_binary_seq]
 
-    def save_decompression(self):
-        """ This method save parameters of Huffman decompression. """
+    def decompression(self):
+        """ This method decompress the bytes of the compression to given the
+        initial sequence. The bytes are read by a lookup table which decode
+        several characters at each step. """
+
+        codes = {char: (int(code, 2), len(code))
+                 for char, code in self.dict_bin_char.items()}
+        with self.instruments.stage(self.name + '.decode'):
+            decoder = HuffmanTableDecoder(codes)
+            symbols = decoder.decode(self.compressed_seq,
+                                     self.len_init_binary_seq)
+        if self.mtf_rle:
+            with self.instruments.stage(self.name + '.mtf_rle_decode'):
+                self.initial_seq = mtf_rle_decode(symbols)
+        else:
+            self.initial_seq = symbols
+
+    def save_decompression(self, path: str = '../data/dechufile.txt'):
+        """ This method save parameters of Huffman decompression.
+
+        Parameter
+        ---------
+        path : str
+            path of the decompression file
+        """
 
-        f = open('../data/dechufile.txt', 'w')
+        f = open(path, 'w')
         f.write(self.initial_seq)
         f.close()
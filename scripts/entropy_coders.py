@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+import io
+import struct
+
+from compression_huffman import HuffmanCompression, HuffmanDecompression, \
+    HUFFMAN_MAGIC, read_header
+from ans_coder import ANSCompression, ANSDecompression, ANS_MAGIC, \
+    read_ans_header
+from multi_huffman import MultiHuffmanCompression, \
+    MultiHuffmanDecompression, MULTI_MAGIC, read_multi_header
+
+
+# Entropy coders: compression class, decompression class, magic number and
+# function which reads the header. The compression classes have the
+# arguments of HuffmanCompression, the decompression classes the arguments of
+# HuffmanDecompression, and the headers give (length, table, mtf_rle)
+ENTROPY_CODERS = {
+    'huffman': (HuffmanCompression, HuffmanDecompression, HUFFMAN_MAGIC,
+                read_header),
+    'ans': (ANSCompression, ANSDecompression, ANS_MAGIC, read_ans_header),
+    'multi': (MultiHuffmanCompression, MultiHuffmanDecompression,
+              MULTI_MAGIC, read_multi_header),
+}
+
+
+def compress(sequence, coder: str = 'huffman', **options):
+    """ This function compress a sequence with an entropy coder.
+
+    Parameters
+    ----------
+    sequence : str or PackedSequence
+        DNA sequence, or BWT sequence
+    coder : str
+        name of the entropy coder, a key of ENTROPY_CODERS
+    options : dict
+        other arguments of the compression class, like mtf_rle or path
+
+    Return
+    ------
+    compression : HuffmanCompression
+        compression, whose header() and compressed_seq are the file
+    """
+
+    if coder not in ENTROPY_CODERS:
+        raise ValueError("unknown entropy coder: {}".format(coder))
+    return ENTROPY_CODERS[coder][0](sequence, **options)
+
+
+def coder_name(data):
+    """ This function give the entropy coder of a compression file, found by
+    its magic number. An 'ans' compression of a short sequence is a Huffman
+    compression.
+
+    Parameter
+    ---------
+    data : bytes-like
+        header and bytes of the compression
+
+    Return
+    ------
+    coder : str
+        name of the entropy coder, a key of ENTROPY_CODERS
+    """
+
+    for coder, (compression_class, decompression_class, magic, read) in \
+            ENTROPY_CODERS.items():
+        if bytes(data[0:len(magic)]) == magic:
+            return coder
+    raise ValueError("unknown compression format")
+
+
+def decompress(data, **options):
+    """ This function decompress a compression file, whose entropy coder is
+    found by its magic number.
+
+    Parameters
+    ----------
+    data : bytes-like
+        header and bytes of the compression
+    options : dict
+        other arguments of the decompression class, like path
+
+    Return
+    ------
+    decompression : HuffmanDecompression
+        decompression, whose initial_seq is the sequence
+
+    Exception
+    ---------
+    ValueError
+        if the format is unknown, or if the file is truncated, or if its
+        header or its coding are not valid. The Huffman codings have no
+        checksum: a damaged file whose coding stays valid gives a wrong
+        sequence
+    """
+
+    compression_class, decompression_class, magic, read = \
+        ENTROPY_CODERS[coder_name(data)]
+    f = io.BytesIO(data)
+    try:
+        len_seq, table, mtf_rle = read(f)
+    except (IndexError, struct.error):
+        raise ValueError("compression file is shorter than its header")
+    return decompression_class(f.read(), len_seq, table, mtf_rle=mtf_rle,
+                               **options)
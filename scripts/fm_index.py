@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+from array import array
+import json
+
+
+class FMIndex:
+    """ Class of FM-index, which allows to search a pattern in the BWT
+    sequence without reconstruction of the initial sequence. """
+
+    def __init__(self, bwt: str, occ_step: int = 64, sa_step: int = 32,
+                 sa_samples: dict = None):
+        if bwt.count('$') != 1:
+            raise ValueError("BWT sequence must contain one '$'")
+        self.bwt = bwt
+        self.occ_step = occ_step
+        self.sa_step = sa_step
+        self.c_array = {}
+        self.occ_checkpoints = {}
+        self.creation_occ()
+        if sa_samples is None:
+            self.sa_samples = {}
+            self.creation_sa_samples()
+        else:
+            self.sa_samples = sa_samples
+
+    def creation_occ(self):
+        """ This method create the C array and the Occ checkpoints.
+        C[c] is the number of characters smaller than c in the BWT sequence,
+        and the checkpoint k of c is the number of c in bwt[0:k*occ_step]. """
+
+        bwt = self.bwt
+        step = self.occ_step
+        counts = {char: 0 for char in set(bwt)}
+        checkpoints = {char: array('L') for char in counts}
+
+        for start in range(0, len(bwt)+1, step):
+            for char, count in counts.items():
+                checkpoints[char].append(count)
+            for char in bwt[start:start+step]:
+                counts[char] += 1
+
+        total = 0
+        for char in sorted(counts):
+            self.c_array[char] = total
+            total += counts[char]
+        self.occ_checkpoints = checkpoints
+
+    def occ(self, char: str, i: int):
+        """ This method give the number of char in bwt[0:i].
+
+        Parameters
+        ----------
+        char : str
+            character of the BWT sequence
+        i : int
+            end position (excluded)
+
+        Return
+        ------
+        occ : int
+            number of occurrences of char before the position i
+        """
+
+        k = i // self.occ_step
+        start = k * self.occ_step
+        return self.occ_checkpoints[char][k] + self.bwt.count(char, start, i)
+
+    def lf(self, row: int):
+        """ This method give the row of the rotation which starts one
+        character before the rotation of the row given.
+
+        Parameter
+        ---------
+        row : int
+            row of the sorted matrix
+
+        Return
+        ------
+        row : int
+            row of the previous rotation
+        """
+
+        char = self.bwt[row]
+        return self.c_array[char] + self.occ(char, row)
+
+    def creation_sa_samples(self):
+        """ This method keeps the position in the sequence of the rows whose
+        position is a multiple of sa_step. The whole sequence is traversed
+        backward with the LF-mapping, starting from the row of the whole
+        sequence. """
+
+        n = len(self.bwt)
+        row = self.bwt.index('$')
+        # The row which ends with '$' is the rotation starting at 0
+        self.sa_samples[row] = 0
+        for pos in range(n-1, 0, -1):
+            row = self.lf(row)
+            if pos % self.sa_step == 0:
+                self.sa_samples[row] = pos
+
+    def backward_search(self, pattern: str):
+        """ This method give the interval of the rows of the sorted matrix
+        which start with the pattern.
+
+        Parameter
+        ---------
+        pattern : str
+            pattern that we want to search
+
+        Return
+        ------
+        (lo, hi) : tuple
+            interval of rows [lo, hi), empty if lo == hi
+        """
+
+        # '$' is not a character of the sequence, it is never found
+        if '$' in pattern:
+            return 0, 0
+        lo = 0
+        hi = len(self.bwt)
+        for char in reversed(pattern):
+            if char not in self.c_array:
+                return 0, 0
+            lo = self.c_array[char] + self.occ(char, lo)
+            hi = self.c_array[char] + self.occ(char, hi)
+            if lo >= hi:
+                return 0, 0
+        return lo, hi
+
+    def count(self, pattern: str):
+        """ This method count the occurrences of the pattern in the sequence.
+
+        Parameter
+        ---------
+        pattern : str
+            pattern that we want to count
+
+        Return
+        ------
+        count : int
+            number of occurrences of the pattern, overlapping ones
+            included. Like str.count, the empty pattern is found at each
+            position and at the end: its count is len(sequence) + 1
+        """
+
+        lo, hi = self.backward_search(pattern.upper())
+        return hi - lo
+
+    def locate(self, pattern: str):
+        """ This method give the positions of the pattern in the sequence.
+
+        Parameter
+        ---------
+        pattern : str
+            pattern that we want to locate
+
+        Return
+        ------
+        positions : list
+            sorted start positions (from 0) of the pattern in the sequence,
+            from 0 to len(sequence) for the empty pattern
+        """
+
+        lo, hi = self.backward_search(pattern.upper())
+        positions = []
+        for row in range(lo, hi, 1):
+            # Go back until a sampled row, the position is the sampled
+            # position plus the number of steps made
+            steps = 0
+            while row not in self.sa_samples:
+                row = self.lf(row)
+                steps += 1
+            positions.append(self.sa_samples[row] + steps)
+        positions.sort()
+        return positions
+
+    def count_many(self, patterns):
+        """ This method count the occurrences of several patterns.
+
+        Parameter
+        ---------
+        patterns : iterable
+            patterns that we want to count
+
+        Return
+        ------
+        counts : dict
+            dictionary with key = pattern and value = number of occurrences
+        """
+
+        return {pattern: self.count(pattern) for pattern in patterns}
+
+    def locate_many(self, patterns):
+        """ This method give the positions of several patterns.
+
+        Parameter
+        ---------
+        patterns : iterable
+            patterns that we want to locate
+
+        Return
+        ------
+        positions : dict
+            dictionary with key = pattern and value = list of positions
+        """
+
+        return {pattern: self.locate(pattern) for pattern in patterns}
+
+    def save(self, path: str):
+        """ This method save the FM-index, so it can be loaded once for many
+        queries.
+
+        Parameter
+        ---------
+        path : str
+            path of the index file
+        """
+
+        with open(path, 'w') as f:
+            json.dump({'bwt': self.bwt, 'occ_step': self.occ_step,
+                       'sa_step': self.sa_step,
+                       'sa_samples': list(self.sa_samples.items())}, f)
+
+    @classmethod
+    def load(cls, path: str):
+        """ This method load a FM-index saved with the save method.
+
+        Parameter
+        ---------
+        path : str
+            path of the index file
+
+        Return
+        ------
+        index : FMIndex
+            FM-index of the file
+        """
+
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data['bwt'], data['occ_step'], data['sa_step'],
+                   dict(data['sa_samples']))
@@ -0,0 +1,302 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+import heapq
+
+
+def canonical_codes(code_lengths: dict):
+    """ This function give the canonical Huffman codes of the symbols.
+    The symbols are sorted by code length then by symbol, and each code is
+    the previous code plus one, shifted when the length increases.
+
+    Parameter
+    ---------
+    code_lengths : dict
+        dictionary with key = symbol and value = length of its code
+
+    Return
+    ------
+    codes : dict
+        dictionary with key = symbol and value = (code, length)
+    """
+
+    codes = {}
+    code = 0
+    previous_length = 0
+    for symbol in sorted(code_lengths, key=lambda s: (code_lengths[s], s)):
+        length = code_lengths[symbol]
+        code <<= length - previous_length
+        codes[symbol] = (code, length)
+        code += 1
+        previous_length = length
+    return codes
+
+
+def check_code_lengths(code_lengths: dict, max_length: int):
+    """ This function check that code lengths read from a file are the
+    lengths of a complete prefix code: each length is between 1 and
+    max_length, and the lengths fill the code space (Kraft equality), except
+    for a single symbol.
+
+    Parameters
+    ----------
+    code_lengths : dict
+        dictionary with key = symbol and value = length of its code
+    max_length : int
+        maximum length of a code
+
+    Exception
+    ---------
+    ValueError
+        if the lengths are not the lengths of a complete prefix code
+    """
+
+    lengths = list(code_lengths.values())
+    if not lengths:
+        return
+    if min(lengths) < 1 or max(lengths) > max_length:
+        raise ValueError("invalid Huffman code lengths")
+    # Sum of 2 ** -length, in units of 2 ** -max_length
+    if len(lengths) > 1 and sum(1 << (max_length - length)
+                                for length in lengths) != 1 << max_length:
+        raise ValueError("invalid Huffman code lengths")
+
+
+def package_merge(freq: dict, max_length: int):
+    """ This function give the optimal code lengths of the symbols when no
+    code can be longer than max_length (package-merge algorithm).
+    At each level, the items are paired in packages, which are merged with
+    the symbols; a symbol gets one bit for each of the 2n-2 cheapest items of
+    the last level in which it appears.
+
+    Parameters
+    ----------
+    freq : dict
+        frequency dictionary of the symbols
+    max_length : int
+        maximum length of a code
+
+    Return
+    ------
+    code_lengths : dict
+        dictionary with key = symbol and value = length of its code
+    """
+
+    symbols = sorted(freq, key=lambda s: freq[s])
+    if len(symbols) == 1:
+        return {symbols[0]: 1}
+    if len(symbols) > 1 << max_length:
+        raise ValueError("{} symbols can not have codes of at most {} "
+                         "bits".format(len(symbols), max_length))
+
+    leaves = [(freq[symbol], (symbol, )) for symbol in symbols]
+    items = leaves
+    for level in range(1, max_length, 1):
+        packages = [(items[i][0] + items[i+1][0], items[i][1] + items[i+1][1])
+                    for i in range(0, len(items)-1, 2)]
+        items = list(heapq.merge(leaves, packages, key=lambda item: item[0]))
+
+    code_lengths = {symbol: 0 for symbol in symbols}
+    for weight, item_symbols in items[0:2*len(symbols)-2]:
+        for symbol in item_symbols:
+            code_lengths[symbol] += 1
+    return code_lengths
+
+
+class HuffmanTableDecoder:
+    """ Class of Huffman decoder with a lookup table.
+    The table is indexed by the next table_bits bits of the stream and gives
+    all the symbols whose code is complete in these bits, so several symbols
+    are decoded at each step. """
+
+    def __init__(self, codes: dict, table_bits: int = 12):
+        self.table_bits = table_bits
+        self.max_length = max(length for code, length in codes.values())
+        # Symbols of the codes by (length, code), used for the long codes
+        self.dict_code = {(length, code): symbol
+                          for symbol, (code, length) in codes.items()}
+        self.text = all(isinstance(symbol, str) for symbol in codes)
+        self.table = []
+        self.creation_table()
+        self.acc = 0
+        self.nb_acc_bits = 0
+        self.remaining = 0
+
+    def decode_symbol(self, value: int, nb_bits: int):
+        """ This method decode the symbol at the beginning of value.
+
+        Parameters
+        ----------
+        value : int
+            nb_bits bits of the stream
+        nb_bits : int
+            number of bits of value
+
+        Return
+        ------
+        (symbol, length) : tuple
+            symbol decoded and length of its code, None if no code of at most
+            nb_bits bits is a prefix of value
+        """
+
+        for length in range(1, min(nb_bits, self.max_length)+1, 1):
+            code = value >> (nb_bits - length)
+            if (length, code) in self.dict_code:
+                return self.dict_code[(length, code)], length
+        return None
+
+    def creation_table(self):
+        """ This method create the lookup table. The entry of an index is the
+        symbols decoded from its table_bits bits and the number of bits used.
+        The tables of 0 to table_bits bits are built in turn: after its first
+        symbol, the entry of an index continues with the entry of its
+        remaining bits in a smaller table.
+        """
+
+        empty = ("" if self.text else (), 0)
+        tables = [[empty]]
+        for nb_bits in range(1, self.table_bits+1, 1):
+            # First symbol of each index: a code of length bits is the
+            # beginning of 2 ** (nb_bits - length) indexes
+            first = [None] * (1 << nb_bits)
+            for (length, code), symbol in self.dict_code.items():
+                if length <= nb_bits:
+                    shift = nb_bits - length
+                    first[code << shift:(code+1) << shift] = \
+                        [(symbol, length)] * (1 << shift)
+            table = []
+            for index, decoded in enumerate(first):
+                if decoded is None:
+                    table.append(empty)
+                    continue
+                symbol, length = decoded
+                rest = nb_bits - length
+                symbols, used = tables[rest][index & ((1 << rest) - 1)]
+                if self.text:
+                    table.append((symbol + symbols, length + used))
+                else:
+                    table.append(((symbol, ) + symbols, length + used))
+            tables.append(table)
+        self.table = tables[self.table_bits]
+
+    def start(self, len_bits: int):
+        """ This method prepare the decoder to a new stream.
+
+        Parameter
+        ---------
+        len_bits : int
+            number of bits of the stream, without padding
+        """
+
+        self.acc = 0
+        self.nb_acc_bits = 0
+        self.remaining = len_bits
+
+    def feed(self, data):
+        """ This method decode the symbols of a part of the stream. The bits
+        of an incomplete code are kept for the next part.
+
+        Parameter
+        ---------
+        data : bytes-like
+            next bytes of the stream
+
+        Return
+        ------
+        pieces : list
+            decoded symbols, as strings of characters for a text alphabet
+        """
+
+        pieces = []
+        table = self.table
+        nb_bits = self.table_bits
+        mask = (1 << nb_bits) - 1
+        acc = self.acc
+        nb_acc_bits = self.nb_acc_bits
+        remaining = self.remaining
+
+        for i in range(0, len(data), 8):
+            word = data[i:i+8]
+            acc = (acc << (8 * len(word))) | int.from_bytes(word, 'big')
+            nb_acc_bits += 8 * len(word)
+
+            while remaining >= nb_bits and nb_acc_bits >= nb_bits:
+                symbols, used = table[(acc >> (nb_acc_bits - nb_bits)) & mask]
+                if used == 0:
+                    # Code longer than the table
+                    if nb_acc_bits < self.max_length:
+                        break
+                    value = acc >> (nb_acc_bits - self.max_length)
+                    decoded = self.decode_symbol(
+                        value & ((1 << self.max_length) - 1), self.max_length)
+                    if decoded is None:
+                        # The code lengths are not a complete prefix code
+                        raise ValueError("invalid Huffman code")
+                    symbol, used = decoded
+                    symbols = symbol if self.text else (symbol, )
+                pieces.append(symbols)
+                nb_acc_bits -= used
+                remaining -= used
+
+            acc &= (1 << nb_acc_bits) - 1
+
+        self.acc = acc
+        self.nb_acc_bits = nb_acc_bits
+        self.remaining = remaining
+        return pieces
+
+    def finish(self):
+        """ This method decode the last symbols of the stream, whose bits are
+        fewer than the size of the table.
+
+        Return
+        ------
+        pieces : list
+            last decoded symbols
+        """
+
+        if self.nb_acc_bits < self.remaining:
+            raise ValueError("Huffman stream is shorter than its length")
+
+        pieces = []
+        value = self.acc >> (self.nb_acc_bits - self.remaining)
+        while self.remaining > 0:
+            decoded = self.decode_symbol(value, self.remaining)
+            if decoded is None:
+                raise ValueError("Huffman stream ends inside a code")
+            symbol, length = decoded
+            pieces.append(symbol if self.text else (symbol, ))
+            self.remaining -= length
+            value &= (1 << self.remaining) - 1
+        self.acc = 0
+        self.nb_acc_bits = 0
+        return pieces
+
+    def decode(self, data, len_bits: int):
+        """ This method decode a whole stream.
+
+        Parameters
+        ----------
+        data : bytes-like
+            bytes of the stream
+        len_bits : int
+            number of bits of the stream, without padding
+
+        Return
+        ------
+        symbols : str or list
+            decoded sequence, a string for a text alphabet
+        """
+
+        self.start(len_bits)
+        pieces = self.feed(data)
+        pieces += self.finish()
+        if self.text:
+            return "".join(pieces)
+        return [symbol for piece in pieces for symbol in piece]
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+from bit_stream import BitWriter
+from compression_huffman import HuffmanCompression, read_header
+from huffman_codes import HuffmanTableDecoder
+from instrumentation import NullInstruments
+
+
+def read_chunks(path: str, chunk_size: int = 1 << 20):
+    """ This function read a sequence file by parts of chunk_size characters.
+    The line breaks are removed.
+
+    Parameters
+    ----------
+    path : str
+        path of the sequence file
+    chunk_size : int
+        number of characters read at each step
+
+    Return
+    ------
+    chunk : generator
+        parts of the sequence
+    """
+
+    with open(path) as f:
+        for chunk in iter_chunks(f, chunk_size):
+            yield chunk
+
+
+def iter_chunks(f, chunk_size: int = 1 << 20):
+    """ This function read an opened sequence file by parts of chunk_size
+    characters. The line breaks are removed.
+
+    Parameters
+    ----------
+    f : file object
+        sequence file opened in text mode
+    chunk_size : int
+        number of characters read at each step
+
+    Return
+    ------
+    chunk : generator
+        parts of the sequence
+    """
+
+    chunk = f.read(chunk_size)
+    while chunk:
+        yield chunk.replace('\n', '').replace('\r', '')
+        chunk = f.read(chunk_size)
+
+
+class HuffmanStreamCompression(HuffmanCompression):
+    """ Class of Huffman Compression of a sequence read by parts.
+    The first pass over the parts counts the frequencies, the second one
+    encodes each part and writes it directly in the compression file, so the
+    whole sequence is never in memory. """
+
+    def __init__(self, chunks, max_code_length: int = None,
+                 instruments: NullInstruments = None):
+        self.instruments = instruments if instruments is not None \
+            else NullInstruments()
+        self.chunks = chunks
+        self.sequence = ''
+        self.mtf_rle = False
+        with self.instruments.stage(self.name + '.frequencies'):
+            self.dict_freq = self.freq_nucleotide()
+        self.tree = None
+        self.code_lengths = {}
+        self.dict_char = {}
+        with self.instruments.stage(self.name + '.codes'):
+            self.creation_codes(max_code_length)
+        self.compressed_seq = bytearray()
+        # The len of the binary sequence is known before the encoding
+        self.len_binary_seq = sum(self.dict_freq[char] * len(code)
+                                  for char, code in self.dict_char.items())
+
+    @classmethod
+    def from_file(cls, path: str, chunk_size: int = 1 << 20,
+                  instruments: NullInstruments = None):
+        """ This method prepare the compression of a sequence file.
+
+        Parameters
+        ----------
+        path : str
+            path of the sequence file
+        chunk_size : int
+            number of characters read at each step
+        instruments : NullInstruments
+            measures of the stages, None to measure nothing
+
+        Return
+        ------
+        compression : HuffmanStreamCompression
+            compression ready to be saved
+        """
+
+        return cls(lambda: read_chunks(path, chunk_size),
+                   instruments=instruments)
+
+    @classmethod
+    def from_reader(cls, reader, chunk_size: int = 1 << 20,
+                    instruments: NullInstruments = None):
+        """ This method prepare the compression of the sequences of a FASTA
+        or FASTQ file, one after the other. The headers and qualities are
+        side streams of the reader, they are not in the compression.
+
+        Parameters
+        ----------
+        reader : MappedReader
+            reader of the file
+        chunk_size : int
+            number of characters read at each step
+        instruments : NullInstruments
+            measures of the stages, None to measure nothing
+
+        Return
+        ------
+        compression : HuffmanStreamCompression
+            compression ready to be saved
+        """
+
+        return cls(lambda: reader.sequence_chunks(chunk_size),
+                   instruments=instruments)
+
+    def freq_nucleotide(self):
+        """ This method create the frequency dictionary of the characters of
+        all the parts of the sequence.
+
+        Return
+        ------
+        freq : dict
+            frequency dictionary of the characters of the sequence
+        """
+
+        freq = {'A': 0, 'C': 0, 'T': 0, 'G': 0, 'N': 0}
+        for chunk in self.chunks():
+            self.update_freq(freq, chunk.upper())
+        return freq
+
+    def save_compression(self, path: str = '../data/huffile.huf'):
+        """ This method compress the parts of the sequence and save them in a
+        binary file, with the same format as HuffmanCompression.
+
+        Parameter
+        ---------
+        path : str
+            path of the compression file
+        """
+
+        with open(path, 'wb') as f:
+            self.write_compression(f)
+
+    def write_compression(self, f):
+        """ This method compress the parts of the sequence and write them in
+        an opened file.
+
+        Parameter
+        ---------
+        f : file object
+            file opened in binary mode
+        """
+
+        writer = BitWriter()
+        f.write(self.header())
+        for chunk in self.chunks():
+            with self.instruments.stage(self.name + '.encode'):
+                self.encode(chunk.upper(), writer)
+                data = writer.take_bytes()
+            with self.instruments.stage(self.name + '.write'):
+                f.write(data)
+            self.instruments.count(self.name + '.input_chars', len(chunk))
+            self.instruments.count(self.name + '.output_bytes', len(data))
+        f.write(writer.flush())
+
+
+class HuffmanStreamDecompression:
+    """ Class of Huffman Decompression of a compression file read by parts.
+    """
+
+    def __init__(self, input_path: str, output_path: str,
+                 chunk_size: int = 1 << 20):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.chunk_size = chunk_size
+        self.decompression()
+
+    def decompression(self):
+        """ This method decompress the compression file part by part and
+        writes the initial sequence in the output file. """
+
+        with open(self.input_path, 'rb') as f_in, \
+                open(self.output_path, 'w') as f_out:
+            len_binary_seq, dict_char, mtf_rle = read_header(f_in)
+            if mtf_rle:
+                raise ValueError("move-to-front files can not be streamed")
+            codes = {char: (int(code, 2), len(code))
+                     for char, code in dict_char.items()}
+            decoder = HuffmanTableDecoder(codes)
+            decoder.start(len_binary_seq)
+
+            chunk = f_in.read(self.chunk_size)
+            while chunk:
+                f_out.write("".join(decoder.feed(chunk)))
+                chunk = f_in.read(self.chunk_size)
+            f_out.write("".join(decoder.finish()))
@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+import os
+import time
+
+
+class NullStage:
+    """ Context of a stage which measures nothing. """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_STAGE = NullStage()
+
+
+class NullInstruments:
+    """ Default instrumentation of the transformations, which records
+    nothing: a stage costs one method call, whatever the size of the
+    sequence. """
+
+    enabled = False
+
+    def stage(self, name: str):
+        """ This method give the context which measures a stage.
+
+        Parameter
+        ---------
+        name : str
+            name of the stage, like 'huffman.encode'
+
+        Return
+        ------
+        stage : context manager
+            context around the code of the stage
+        """
+
+        return NULL_STAGE
+
+    def count(self, name: str, value: int):
+        """ This method add a value to a counter.
+
+        Parameters
+        ----------
+        name : str
+            name of the counter, like 'huffman.output_bytes'
+        value : int
+            value added
+        """
+
+    def flush(self):
+        """ This method send the measures to the sinks. """
+
+
+class Stage:
+    """ Context which measures the time, and the peak of allocated memory if
+    asked, of a stage. """
+
+    def __init__(self, instruments, name: str):
+        self.instruments = instruments
+        self.name = name
+        self.start = 0
+        self.start_memory = 0
+        self.peak = 0
+
+    def __enter__(self):
+        if self.instruments.track_allocations:
+            self.instruments.enter_memory(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.start
+        peak = None
+        if self.instruments.track_allocations:
+            peak = self.instruments.exit_memory(self)
+        self.instruments.record(self.name, seconds, peak)
+        return False
+
+
+class Instruments(NullInstruments):
+    """ Instrumentation which records, for each stage, the number of calls,
+    the time and the peak of memory allocated (with tracemalloc, only if
+    track_allocations is True because it slows down the allocations), and
+    counters of characters and bytes. flush sends them to the sinks. """
+
+    enabled = True
+
+    def __init__(self, sinks=(), track_allocations: bool = False):
+        self.sinks = list(sinks)
+        self.track_allocations = track_allocations
+        self.stages = {}
+        self.counters = {}
+        # Stages in progress, for the memory peak of the nested stages
+        self.memory_stack = []
+
+    def stage(self, name: str):
+        return Stage(self, name)
+
+    def count(self, name: str, value: int):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def record(self, name: str, seconds: float, peak: int = None):
+        """ This method add a measure of a stage.
+
+        Parameters
+        ----------
+        name : str
+            name of the stage
+        seconds : float
+            time of the stage
+        peak : int
+            peak of memory allocated during the stage, in bytes
+        """
+
+        stats = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0,
+                                              'alloc_peak_bytes': None})
+        stats['calls'] += 1
+        stats['seconds'] += seconds
+        if peak is not None:
+            stats['alloc_peak_bytes'] = max(stats['alloc_peak_bytes'] or 0,
+                                            peak)
+
+    def enter_memory(self, stage: Stage):
+        """ This method start the measure of memory of a stage. The peak of
+        tracemalloc is reset at each stage, so the peak of the stage in
+        progress is kept before. """
+
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        current, peak = tracemalloc.get_traced_memory()
+        if self.memory_stack:
+            parent = self.memory_stack[-1]
+            parent.peak = max(parent.peak, peak)
+        tracemalloc.reset_peak()
+        stage.start_memory = current
+        stage.peak = current
+        self.memory_stack.append(stage)
+
+    def exit_memory(self, stage: Stage):
+        """ This method end the measure of memory of a stage.
+
+        Return
+        ------
+        peak : int
+            peak of memory allocated during the stage, in bytes
+        """
+
+        import tracemalloc
+
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(stage.peak, peak)
+        self.memory_stack.pop()
+        if self.memory_stack:
+            parent = self.memory_stack[-1]
+            parent.peak = max(parent.peak, peak)
+        tracemalloc.reset_peak()
+        return peak - stage.start_memory
+
+    def report(self):
+        """ This method give the measures.
+
+        Return
+        ------
+        report : dict
+            statistics of each stage and counters
+        """
+
+        return {'stages': self.stages, 'counters': self.counters}
+
+    def flush(self):
+        report = self.report()
+        for sink in self.sinks:
+            sink.emit(report)
+
+
+class LogSink:
+    """ Sink which writes the measures in a logger. """
+
+    def __init__(self, logger=None):
+        # Like tracemalloc and json, logging is only loaded when it is used,
+        # so the default instrumentation loads nothing
+        import logging
+
+        self.logger = logger or logging.getLogger("instrumentation")
+
+    def emit(self, report: dict):
+        """ This method send the measures.
+
+        Parameter
+        ---------
+        report : dict
+            statistics of each stage and counters
+        """
+
+        for name, stats in sorted(report['stages'].items()):
+            if stats['alloc_peak_bytes'] is None:
+                self.logger.info("%s: %d calls, %.6f s", name, stats['calls'],
+                                 stats['seconds'])
+            else:
+                self.logger.info("%s: %d calls, %.6f s, %d bytes allocated",
+                                 name, stats['calls'], stats['seconds'],
+                                 stats['alloc_peak_bytes'])
+        for name, value in sorted(report['counters'].items()):
+            self.logger.info("%s: %d", name, value)
+
+
+def write_atomic(path: str, text: str):
+    """ This function replace a file by a complete new file, so that a
+    reader never sees a half written file.
+
+    Parameters
+    ----------
+    path : str
+        path of the file
+    text : str
+        content of the file
+    """
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class JsonSink:
+    """ Sink which writes the measures in a JSON file. """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def emit(self, report: dict):
+        import json
+
+        write_atomic(self.path, json.dumps(report, indent=2, sort_keys=True))
+
+
+class PrometheusSink:
+    """ Sink which writes the measures in a text file of the Prometheus
+    format, for the textfile collector of the node exporter. """
+
+    def __init__(self, path: str, prefix: str = "dna_compression"):
+        self.path = path
+        self.prefix = prefix
+
+    def emit(self, report: dict):
+        lines = []
+        metrics = [("stage_calls_total", "counter", 'calls'),
+                   ("stage_seconds_total", "counter", 'seconds'),
+                   ("stage_alloc_peak_bytes", "gauge", 'alloc_peak_bytes')]
+        for metric, kind, key in metrics:
+            lines.append("# TYPE {}_{} {}".format(self.prefix, metric, kind))
+            for name, stats in sorted(report['stages'].items()):
+                if stats[key] is not None:
+                    lines.append('{}_{}{{stage="{}"}} {}'.format(
+                        self.prefix, metric, name, stats[key]))
+        lines.append("# TYPE {}_total counter".format(self.prefix))
+        for name, value in sorted(report['counters'].items()):
+            lines.append('{}_total{{counter="{}"}} {}'.format(
+                self.prefix, name, value))
+        write_atomic(self.path, "\n".join(lines) + "\n")
+
+
+def create_instruments(specs, track_allocations: bool = False):
+    """ This function create the instrumentation of a list of sinks.
+
+    Parameters
+    ----------
+    specs : list
+        sinks as 'log', 'json:PATH' or 'prometheus:PATH'
+    track_allocations : bool
+        True to measure the peak of memory allocated by each stage
+
+    Return
+    ------
+    instruments : NullInstruments
+        NullInstruments if there is no sink, else Instruments
+    """
+
+    sinks = []
+    for spec in specs:
+        kind, _, path = spec.partition(':')
+        if kind == 'log':
+            sinks.append(LogSink())
+        elif kind == 'json' and path:
+            sinks.append(JsonSink(path))
+        elif kind == 'prometheus' and path:
+            sinks.append(PrometheusSink(path))
+        else:
+            raise ValueError("unknown instrumentation sink: {}".format(spec))
+    if not sinks:
+        return NullInstruments()
+    return Instruments(sinks, track_allocations)
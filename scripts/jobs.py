@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+import queue
+import threading
+
+from instrumentation import NullInstruments
+
+
+class JobCancelled(Exception):
+    """ Exception raised in a job when it is cancelled. """
+
+
+class Job:
+    """ Class of a job run by a JobExecutor. The job function is run in the
+    worker thread, the callbacks are called in the thread of the Tk loop. """
+
+    def __init__(self, name: str, function, done=None, error=None):
+        self.name = name
+        self.function = function
+        # Callbacks of the result and of the exception
+        self.done = done
+        self.error = error
+        self.state = 'queued'
+        # Last stage begun by the job and number of stages begun
+        self.message = ''
+        self.nb_stages = 0
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        """ This method ask the job to stop. A queued job is never run, a
+        running job stops at the beginning of its next stage. """
+
+        self.cancelled.set()
+
+    def check(self):
+        """ This method stop the job if it is cancelled.
+
+        Exception
+        ---------
+        JobCancelled
+            if the job is cancelled
+        """
+
+        if self.cancelled.is_set():
+            raise JobCancelled(self.name)
+
+    def report(self, message: str):
+        """ This method give the progress of the job, then stop it if it is
+        cancelled.
+
+        Parameter
+        ---------
+        message : str
+            stage begun by the job
+        """
+
+        self.message = message
+        self.nb_stages += 1
+        self.check()
+
+
+class JobInstruments(NullInstruments):
+    """ Instruments given to the models: in a job, each stage reports the
+    progress of the job and is a point where the job can be cancelled. The
+    measures are given to the instruments of the controller. """
+
+    def __init__(self, instruments: NullInstruments = None):
+        self.instruments = instruments if instruments is not None \
+            else NullInstruments()
+        self.enabled = self.instruments.enabled
+        # Job run by each thread, nothing in the thread of the Tk loop
+        self.local = threading.local()
+
+    @property
+    def job(self):
+        """ Job run by the current thread, None if there is not. """
+
+        return getattr(self.local, 'job', None)
+
+    @job.setter
+    def job(self, job: Job):
+        self.local.job = job
+
+    def stage(self, name: str):
+        job = self.job
+        if job is not None:
+            job.report(name)
+        return self.instruments.stage(name)
+
+    def count(self, name: str, value: int):
+        self.instruments.count(name, value)
+
+    def flush(self):
+        self.instruments.flush()
+
+
+class JobExecutor:
+    """ Class of executor which runs the jobs one after the other in a worker
+    thread, so that the GUI stays responsive. The Tk loop polls the
+    finished jobs with after(), and calls their callbacks, because tkinter
+    must only be used in its own thread.
+
+    A thread is used rather than a process: the models keep the steps of the
+    transformations for the view, and can not be sent to another process. """
+
+    def __init__(self, root, instruments: JobInstruments = None,
+                 poll_ms: int = 50):
+        self.root = root
+        self.instruments = instruments if instruments is not None \
+            else JobInstruments()
+        self.poll_ms = poll_ms
+        self.pending = queue.Queue()
+        self.finished = queue.Queue()
+        self.jobs = []
+        # Callback called in the Tk loop when the progress can have changed
+        self.on_progress = None
+        self.polling = False
+        self.worker = None
+
+    def submit(self, name: str, function, done=None, error=None):
+        """ This method add a job after the other jobs.
+
+        Parameters
+        ----------
+        name : str
+            name of the job, displayed with its progress
+        function : function
+            function without argument run in the worker thread
+        done : function
+            function called with the result in the Tk loop
+        error : function
+            function called with the exception in the Tk loop, if None the
+            exception is reported like the exceptions of the Tk callbacks
+
+        Return
+        ------
+        job : Job
+            job added
+        """
+
+        job = Job(name, function, done, error)
+        self.jobs.append(job)
+        self.pending.put(job)
+        if self.worker is None:
+            self.worker = threading.Thread(target=self.run, daemon=True,
+                                           name="jobs")
+            self.worker.start()
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.poll_ms, self.poll)
+        return job
+
+    def run(self):
+        """ This method run the jobs in the worker thread. """
+
+        while True:
+            job = self.pending.get()
+            if job is None:
+                return
+            result = None
+            exception = None
+            self.instruments.job = job
+            try:
+                job.check()
+                job.state = 'running'
+                result = job.function()
+                job.state = 'done'
+            except JobCancelled:
+                job.state = 'cancelled'
+            except Exception as e:
+                job.state = 'failed'
+                exception = e
+            finally:
+                self.instruments.job = None
+            self.finished.put((job, result, exception))
+
+    def poll(self):
+        """ This method call the callbacks of the finished jobs in the Tk
+        loop, then poll again while jobs are not finished. """
+
+        try:
+            while True:
+                try:
+                    job, result, exception = self.finished.get_nowait()
+                except queue.Empty:
+                    break
+                self.jobs.remove(job)
+                if job.state == 'done' and job.done is not None:
+                    job.done(result)
+                elif job.state == 'failed':
+                    if job.error is not None:
+                        job.error(exception)
+                    else:
+                        self.root.report_callback_exception(
+                            type(exception), exception,
+                            exception.__traceback__)
+        finally:
+            # A callback which fails does not stop the polling
+            if self.on_progress is not None:
+                self.on_progress(self.jobs)
+            if self.jobs:
+                self.root.after(self.poll_ms, self.poll)
+            else:
+                self.polling = False
+
+    def cancel_all(self):
+        """ This method cancel the queued jobs and the running job. """
+
+        for job in self.jobs:
+            job.cancel()
+
+    def shutdown(self, timeout: float = 1.0):
+        """ This method cancel the jobs and stop the worker thread. A job
+        only sees the cancellation between two stages, so the thread is
+        waited at most timeout seconds: it is a daemon thread, which does
+        not keep the process alive when the window is closed.
+
+        Parameter
+        ---------
+        timeout : float
+            maximum time to wait for the running job, in seconds
+        """
+
+        self.cancel_all()
+        if self.worker is not None:
+            self.pending.put(None)
+            self.worker.join(timeout)
+            self.worker = None
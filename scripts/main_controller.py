@@ -7,18 +7,39 @@ __license__ = "MIT"
 __copyright__ = "Copyright 2021, @MeganeBoujeant"
 
 
+from contextlib import contextmanager
+
 from view import View
 from BWT import TransformeeBW
-from compression_huffman import HuffmanCompression, HuffmanDecompression
+from step_trace import StepTrace, JoinedRows, TextRows
+from packed_seq import read_packed
+from instrumentation import NullInstruments
+from jobs import JobExecutor, JobInstruments
+from result_cache import ResultCache
+from compression_huffman import HuffmanCompression, HuffmanDecompression, \
+    load_compression
 
 
 class Controller:
     """ Class of controller which make the link between TransformeeBW,
     HuffmanCompression, HuffmanDecompression models and the view of the GUI."""
 
-    def __init__(self):
+    def __init__(self, instruments: NullInstruments = None,
+                 cache: ResultCache = None):
         self.view = View(self)
-        self.bwt = TransformeeBW(self)
+        # The instruments measure the actions of the user and their stages,
+        # by default nothing is measured
+        self.instruments = instruments if instruments is not None \
+            else NullInstruments()
+        # The results of the sequences already processed are given back by
+        # the cache, by default they are kept in memory only
+        self.cache = cache if cache is not None else ResultCache()
+        # The transformations are run in jobs, out of the Tk loop: each
+        # stage of the models reports the progress of its job
+        self.job_instruments = JobInstruments(self.instruments)
+        self.jobs = JobExecutor(self.view, self.job_instruments)
+        self.jobs.on_progress = self.view.show_jobs
+        self.bwt = self.new_bwt()
         self.results_bwt = ''
         self.step = 0
         self.results_seq = ''
@@ -29,6 +50,69 @@ class Controller:
         """ This method allows initialization of the main interface. """
 
         self.view.main()
+        self.jobs.shutdown()
+
+    def new_bwt(self):
+        """ This method create the model of Burrows-Weeler transformation of a
+        job. Each job has its own model, so that the steps displayed are not
+        changed while a job is running.
+
+        Return
+        ------
+        bwt : TransformeeBW
+            model of Burrows-Weeler transformation
+        """
+
+        return TransformeeBW(self, trace=StepTrace(),
+                             instruments=self.job_instruments,
+                             cache=self.cache)
+
+    @contextmanager
+    def action(self, name: str):
+        """ This method measure an action of the user, then send the
+        measures to the sinks of the instruments.
+
+        Parameter
+        ---------
+        name : str
+            name of the action
+        """
+
+        with self.instruments.stage('controller.' + name):
+            yield
+        self.instruments.flush()
+
+    def run_job(self, name: str, function, done):
+        """ This method run a function in a job, out of the Tk loop.
+
+        Parameters
+        ----------
+        name : str
+            name of the action, displayed with the progress of the job
+        function : function
+            function without argument run in the job
+        done : function
+            function called with the result in the Tk loop, to update the
+            view
+
+        Return
+        ------
+        job : Job
+            job of the function
+        """
+
+        def job():
+            with self.action(name):
+                return function()
+
+        return self.jobs.submit(name, job, done=done,
+                                error=self.view.show_error)
+
+    def cancel_jobs(self):
+        """ This method is called when using the Cancel button.
+        This method cancels the running job and the queued jobs. """
+
+        self.jobs.cancel_all()
 
     def bwt_button(self, seq):
         """ This method is called when using the BWT button.
@@ -41,8 +125,14 @@ class Controller:
             DNA sequence
         """
 
-        self.results_bwt = self.bwt.transformation_seq(seq)
-        self.view.bwt_page()
+        bwt = self.new_bwt()
+
+        def done(results_bwt):
+            self.bwt = bwt
+            self.results_bwt = results_bwt
+            self.view.bwt_page()
+
+        self.run_job('bwt_button', lambda: bwt.transformation_seq(seq), done)
 
     def huffman_button(self, seq):
         """ This method is called when using the Huffman Compression button.
@@ -55,11 +145,14 @@ class Controller:
             DNA sequence
         """
 
-        self.compression = HuffmanCompression(seq)
-        binary_seq = self.compression.binary_seq
-        unicode_dict = self.compression.dict_unicode
-        self.unicode_seq = self.compression.seq_unicode
-        self.view.huffman_page(seq, binary_seq, unicode_dict, self.unicode_seq)
+        def done(compression):
+            self.compression = compression
+            self.unicode_seq = compression.seq_unicode
+            self.view.huffman_page(seq, compression.binary_seq,
+                                   compression.dict_unicode, self.unicode_seq)
+
+        self.run_job('huffman_button', lambda: HuffmanCompression(
+            seq, instruments=self.job_instruments, cache=self.cache), done)
 
     def print_matrix_bwt_by_step(self):
         """ This method is called when using the Next Step button on BWT page.
@@ -67,8 +160,10 @@ class Controller:
         """
 
         if self.step < len(self.bwt.list_step_trans_seq):
-            self.view.add_label(self.bwt.list_step_trans_seq[self.step])
             self.step += 1
+            # The steps already displayed stay above the new one
+            self.view.show_rows(self.bwt.list_step_trans_seq.window(
+                0, self.step), end=True)
             self.view.reset_button()
             self.view.button_bwt()
         else:
@@ -81,9 +176,9 @@ class Controller:
         and BWT sequence. """
 
         self.view.reset()
-        for step in self.bwt.list_el_matrix_final_trans:
-            self.view.add_label(step)
-        self.view.add_label("BWT sequence : " + self.results_bwt)
+        self.view.show_rows(JoinedRows([
+            self.bwt.list_el_matrix_final_trans,
+            ["BWT sequence : " + str(self.results_bwt)]]))
         self.view.button_after_bwt()
 
     def back_to_seq_button(self):
@@ -91,9 +186,17 @@ class Controller:
          This method launches recontruction of DNA sequence starting from BWT
          sequence, and update the view consequently."""
 
-        self.results_seq = self.bwt.reconstruction_seq(self.results_bwt)
-        self.step = 0
-        self.view.recon_bwt_page()
+        bwt = self.new_bwt()
+        results_bwt = self.results_bwt
+
+        def done(results_seq):
+            self.bwt = bwt
+            self.results_seq = results_seq
+            self.step = 0
+            self.view.recon_bwt_page()
+
+        self.run_job('back_to_seq_button',
+                     lambda: bwt.reconstruction_seq(results_bwt), done)
 
     def print_step_recon_bwt(self):
         """ This method is called when using the Next Step button on
@@ -103,8 +206,8 @@ class Controller:
 
         self.view.reset()
         if self.step < len(self.bwt.list_step_recons_seq)-len(self.results_bwt):
-            for line in range(self.step, self.step+len(self.results_bwt), 1):
-                self.view.add_label(self.bwt.list_step_recons_seq[line])
+            self.view.show_rows(self.bwt.list_step_recons_seq.window(
+                self.step, self.step+len(self.results_bwt)))
             self.step += len(self.results_bwt)
             self.view.reset_button()
             self.view.button_recon_bwt()
@@ -122,9 +225,10 @@ class Controller:
         start_last_step = len(self.bwt.list_step_recons_seq)-len(
             self.results_bwt)
         end_last_step = len(self.bwt.list_step_recons_seq)
-        for line in range(start_last_step, end_last_step, 1):
-            self.view.add_label(self.bwt.list_step_recons_seq[line])
-        self.view.add_label("The initial sequence is : " + self.results_seq)
+        self.view.show_rows(JoinedRows([
+            self.bwt.list_step_recons_seq.window(start_last_step,
+                                                 end_last_step),
+            ["The initial sequence is : " + self.results_seq]]))
 
     def decomp_huffman_button(self):
         """ This method is called when using the Huffman Decompression button on
@@ -132,12 +236,16 @@ class Controller:
         This method launches Huffman decompression of unicode sequence, and
         update the view consequently. """
 
-        len_seq = self.compression.len_binary_seq
-        dict_bin_char = self.compression.dict_char
-        decomp = HuffmanDecompression(self.unicode_seq, len_seq, dict_bin_char)
-        initial_sequence = decomp.initial_seq
-        self.view.decomp_huffman_page(self.unicode_seq, decomp.binary_seq,
-                                      initial_sequence)
+        compression = self.compression
+
+        def done(decomp):
+            self.view.decomp_huffman_page(self.unicode_seq, decomp.binary_seq,
+                                          decomp.initial_seq)
+
+        self.run_job('decomp_huffman_button', lambda: HuffmanDecompression(
+            compression.compressed_seq, compression.len_binary_seq,
+            compression.dict_char, instruments=self.job_instruments,
+            cache=self.cache), done)
 
     def huffman_with_bwt_button(self, seq):
         """ This method is called when using the Huffman Compression button on
@@ -147,16 +255,20 @@ class Controller:
 
         Parameter
         ---------
-        seq : str
+        seq : str or PackedSequence
             BWT sequence
         """
 
-        self.compression = HuffmanCompression(seq)
-        binary_seq = self.compression.binary_seq
-        unicode_dict = self.compression.dict_unicode
-        self.unicode_seq = self.compression.seq_unicode
-        self.view.huffman_bwt_page(seq, binary_seq, unicode_dict,
-                                   self.unicode_seq)
+        def done(compression):
+            self.compression = compression
+            self.unicode_seq = compression.seq_unicode
+            self.view.huffman_bwt_page(str(seq), compression.binary_seq,
+                                       compression.dict_unicode,
+                                       self.unicode_seq)
+
+        self.run_job('huffman_with_bwt_button', lambda: HuffmanCompression(
+            seq, mtf_rle=True, instruments=self.job_instruments,
+            cache=self.cache), done)
 
     def decomp_bwt_huffman_button(self):
         """ This method is called when using the Huffman Decompression button on
@@ -165,18 +277,19 @@ class Controller:
         This method launches Huffman decompression of unicode sequence, and
         update the view consequently. """
 
-        len_seq = self.compression.len_binary_seq
-        dict_bin_char = self.compression.dict_char
-        decomp = HuffmanDecompression(self.unicode_seq, len_seq, dict_bin_char)
-        pre_initial_seq = decomp.initial_seq
-        initial_sequence = ""
-        for char in pre_initial_seq:
-            if char == 'N':
-                initial_sequence += '$'
-            else:
-                initial_sequence += char
-        self.view.decomp_bwt_huffman_page(self.unicode_seq, decomp.binary_seq,
-                                          initial_sequence)
+        compression = self.compression
+
+        # The move-to-front alphabet contains '$', so the BWT sequence is
+        # given back as it is
+        def done(decomp):
+            self.view.decomp_bwt_huffman_page(self.unicode_seq,
+                                              decomp.binary_seq,
+                                              decomp.initial_seq)
+
+        self.run_job('decomp_bwt_huffman_button', lambda: HuffmanDecompression(
+            compression.compressed_seq, compression.len_binary_seq,
+            compression.dict_char, mtf_rle=compression.mtf_rle,
+            instruments=self.job_instruments, cache=self.cache), done)
 
     def check_file(self, path):
         """ This method is called when user open file. This method check what
@@ -189,61 +302,120 @@ class Controller:
         """
 
         bwt_file = "bwt.txt"
-        huff_file = "huffile.txt"
+        huff_file = "huffile.huf"
         bwt_huff_file = "dechufile.txt"
 
         # If file is a bwt file, display a view which propose to make
         # reconstruction of the initial DNA sequence, or make Huffman
         # compression
         if path[len(path)-len(bwt_file):len(path)] == bwt_file:
-            with open('../data/bwt.txt') as f:
-                self.results_bwt = f.read()
-            self.view.reset()
-            self.view.add_label("Your BWT sequence is :")
-            self.view.add_label(self.results_bwt)
-            self.view.button_after_bwt()
+            def done(results_bwt):
+                self.results_bwt = results_bwt
+                self.view.reset()
+                self.view.show_rows(JoinedRows([
+                    ["Your BWT sequence is :"],
+                    TextRows(str(self.results_bwt))]))
+                self.view.button_after_bwt()
+
+            self.run_job('check_file', lambda: read_packed('../data/bwt.txt'),
+                         done)
 
         # If file is a Huffman file, make Huffman decompression
         elif path[len(path)-len(huff_file):len(path)] == huff_file:
-            with open('../data/huffile.txt') as f:
-                list_huffile_element = f.read().split('\n')
-
-            self.unicode_seq = list_huffile_element[0]
-            len_binary_seq = int(list_huffile_element[1])
-            dict_bin_char = eval(list_huffile_element[2])
-            decomp = HuffmanDecompression(self.unicode_seq, len_binary_seq,
-                                          dict_bin_char)
-            initial_sequence = decomp.initial_seq
-
-            # Check if sequence obtained is the initial DNA sequence or BWT
-            # sequence, then display the initial sequence
-            if '$' in initial_sequence:
-                self.results_bwt = initial_sequence
-                self.results_seq = self.bwt.reconstruction_seq(self.results_bwt)
-                self.view.decomp_huffman_page(self.unicode_seq,
-                                              decomp.binary_seq,
-                                              self.results_seq)
-            else:
-                self.view.decomp_huffman_page(self.unicode_seq,
-                                              decomp.binary_seq,
-                                              initial_sequence)
+            bwt = self.new_bwt()
+            self.run_job('check_file', lambda: self.decompress_file(bwt),
+                         lambda results: self.show_file(bwt, *results))
 
-        # If file is a BWT Huffman file, make reconstruction of the initial DNA
-        # sequence
+        # If file is a BWT Huffman file, make reconstruction of the initial
+        # DNA sequence
         elif path[len(path)-len(bwt_huff_file):len(path)] == bwt_huff_file:
-            with open('../data/dechufile.txt') as f:
-                self.results_bwt = f.read()
-
-            if 'N' in self.results_bwt:
-                tmp_bwt_results = ""
-                for char in self.results_bwt:
-                    if char == 'N':
-                        tmp_bwt_results += '$'
-                    else:
-                        tmp_bwt_results += char
-                self.results_bwt = tmp_bwt_results
-
-            self.back_to_seq_button()
+            def done(results_bwt):
+                self.results_bwt = results_bwt
+                self.back_to_seq_button()
+
+            self.run_job('check_file', self.read_bwt_file, done)
+
+    def decompress_file(self, bwt):
+        """ This method make Huffman decompression of the Huffman file, then
+        reconstruction of the initial DNA sequence if the file contains a BWT
+        sequence. It is run in a job.
+
+        Parameter
+        ---------
+        bwt : TransformeeBW
+            model of Burrows-Weeler transformation of the job
+
+        Return
+        ------
+        (compressed_seq, decomp, results_bwt, results_seq) : tuple
+            content of the file, decompression, BWT sequence and initial
+            sequence (None if the file does not contain a BWT sequence)
+        """
+
+        compressed_seq, len_binary_seq, dict_bin_char, mtf_rle = \
+            load_compression('../data/huffile.huf')
+        decomp = HuffmanDecompression(compressed_seq, len_binary_seq,
+                                      dict_bin_char, mtf_rle=mtf_rle,
+                                      instruments=self.job_instruments,
+                                      cache=self.cache)
+        initial_sequence = decomp.initial_seq
+
+        # Check if sequence obtained is the initial DNA sequence or BWT
+        # sequence
+        if '$' in initial_sequence:
+            return compressed_seq, decomp, initial_sequence, \
+                bwt.reconstruction_seq(initial_sequence)
+        return compressed_seq, decomp, None, None
+
+    def show_file(self, bwt, compressed_seq, decomp, results_bwt,
+                  results_seq):
+        """ This method display the initial sequence of the Huffman file,
+        when its decompression is finished.
+
+        Parameters
+        ----------
+        bwt : TransformeeBW
+            model of Burrows-Weeler transformation of the job
+        compressed_seq : bytes
+            content of the file
+        decomp : HuffmanDecompression
+            decompression of the file
+        results_bwt : str
+            BWT sequence, None if the file does not contain a BWT sequence
+        results_seq : str
+            initial sequence obtained from the BWT sequence
+        """
+
+        self.unicode_seq = "".join([chr(byte) for byte in compressed_seq])
+        if results_bwt is not None:
+            self.bwt = bwt
+            self.results_bwt = results_bwt
+            self.results_seq = results_seq
+            self.view.decomp_huffman_page(self.unicode_seq, decomp.binary_seq,
+                                          self.results_seq)
+        else:
+            self.view.decomp_huffman_page(self.unicode_seq, decomp.binary_seq,
+                                          decomp.initial_seq)
+
+    @staticmethod
+    def read_bwt_file():
+        """ This method read the BWT sequence of the BWT Huffman file. It is
+        run in a job.
+
+        Return
+        ------
+        results_bwt : str
+            BWT sequence
+        """
+
+        with open('../data/dechufile.txt') as f:
+            results_bwt = f.read()
+
+        # The files without move-to-front coded the '$' as 'N', the other
+        # files keep the '$' and their 'N' are bases
+        if '$' not in results_bwt:
+            results_bwt = results_bwt.replace('N', '$')
+        return results_bwt
 
 
 if __name__ == "__main__":
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+import re
+
+
+# Initial order of the move-to-front list, the other characters are 'N'
+MTF_ALPHABET = "$ACGNT"
+
+# Symbols of the zero runs, the other symbols are the move-to-front index + 1
+RUNA = 0
+RUNB = 1
+
+# Number of symbols after move-to-front and zero run encoding
+NB_MTF_SYMBOLS = len(MTF_ALPHABET) + 1
+
+
+def mtf_rle_encode(sequence: str, alphabet: str = MTF_ALPHABET):
+    """ This function make the move-to-front transformation of a sequence,
+    then replaces the runs of 0 by their length written in bijective base 2
+    with RUNA (0) for the digit 1 and RUNB (1) for the digit 2, like in
+    bzip2.
+    After a BWT, the runs of a same character give long runs of 0, so the
+    sequence of symbols is much shorter than the sequence.
+
+    Parameters
+    ----------
+    sequence : str
+        uppercase sequence, usually a BWT sequence
+    alphabet : str
+        initial order of the move-to-front list
+
+    Return
+    ------
+    symbols : list
+        RUNA, RUNB or move-to-front index + 1 of the characters
+    """
+
+    sequence = re.sub('[^{}]'.format(re.escape(alphabet)), 'N', sequence)
+    mtf_list = list(alphabet)
+    symbols = []
+    run = 0
+
+    # A run of k same characters gives the index of the character then k-1
+    # zeros
+    for match in re.finditer(r'(.)\1*', sequence, re.DOTALL):
+        index = mtf_list.index(match.group(1))
+        len_run = match.end() - match.start()
+        if index == 0:
+            run += len_run
+            continue
+        add_zero_run(symbols, run)
+        symbols.append(index + 1)
+        mtf_list.insert(0, mtf_list.pop(index))
+        run = len_run - 1
+    add_zero_run(symbols, run)
+
+    return symbols
+
+
+def add_zero_run(symbols: list, run: int):
+    """ This function add the RUNA/RUNB symbols of a run of 0.
+
+    Parameters
+    ----------
+    symbols : list
+        symbols to complete
+    run : int
+        number of 0 of the run
+    """
+
+    while run > 0:
+        run -= 1
+        symbols.append(run & 1)
+        run >>= 1
+
+
+def mtf_rle_decode(symbols, alphabet: str = MTF_ALPHABET):
+    """ This function give the sequence encoded by mtf_rle_encode.
+
+    Parameters
+    ----------
+    symbols : iterable
+        RUNA, RUNB or move-to-front index + 1 of the characters
+    alphabet : str
+        initial order of the move-to-front list
+
+    Return
+    ------
+    sequence : str
+        decoded sequence
+
+    Exception
+    ---------
+    ValueError
+        if a symbol is out of the alphabet
+    """
+
+    mtf_list = list(alphabet)
+    pieces = []
+    run = 0
+    weight = 1
+
+    for symbol in symbols:
+        if symbol <= RUNB:
+            run += (symbol + 1) * weight
+            weight <<= 1
+            continue
+        if run:
+            # A run of 0 repeats the first character of the list
+            pieces.append(mtf_list[0] * run)
+            run = 0
+            weight = 1
+        if symbol - 1 >= len(mtf_list):
+            raise ValueError("move-to-front symbol {} is out of the "
+                             "alphabet".format(symbol))
+        char = mtf_list.pop(symbol - 1)
+        mtf_list.insert(0, char)
+        pieces.append(char)
+    if run:
+        pieces.append(mtf_list[0] * run)
+
+    return "".join(pieces)
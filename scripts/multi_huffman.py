@@ -0,0 +1,698 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+import struct
+
+from bit_stream import BitWriter
+from compression_huffman import HuffmanCompression, HuffmanDecompression
+from huffman_codes import canonical_codes, check_code_lengths, \
+    package_merge, HuffmanTableDecoder
+from mtf_rle import mtf_rle_decode
+from instrumentation import NullInstruments
+from result_cache import NullCache
+from vectorized import use_numpy, get_numpy, group_counts, assign_groups, \
+    encode_groups, farthest_groups, pack_codes
+
+
+# Magic number at the beginning of a compression file with several tables
+MULTI_MAGIC = b'HUFT'
+
+# Number of symbols coded with the same table, as in bzip2
+GROUP_SIZE = 50
+
+# Maximum number of tables, and number of passes which improve them
+MAX_TABLES = 6
+NB_ITERATIONS = 4
+
+# Maximum length of a code
+MAX_CODE_LENGTH = 17
+
+# Cost given to a symbol which has no code in a table, so that the groups
+# where it appears never choose this table
+NO_CODE_COST = 1 << 10
+
+# Bits of the lookup tables of the decoder: the tables of a short sequence
+# are smaller, because their construction would cost more than the decoding
+SMALL_TABLE_BITS = 8
+TABLE_BITS = 10
+SMALL_SEQUENCE = 1 << 19
+
+# Bits of each byte, to read the selectors
+BYTE_BITS = [format(byte, '08b') for byte in range(0, 256, 1)]
+
+
+def nb_tables(len_seq: int):
+    """ This function give the number of tables for a sequence, as in bzip2:
+    a short sequence can not pay the header and the selectors of many
+    tables.
+
+    Parameter
+    ---------
+    len_seq : int
+        number of symbols
+
+    Return
+    ------
+    nb : int
+        number of tables
+    """
+
+    nb_groups = -(-len_seq // GROUP_SIZE)
+    for max_len, nb in ((200, 2), (600, 3), (1200, 4), (2400, 5)):
+        if len_seq < max_len:
+            return min(nb, nb_groups)
+    return min(MAX_TABLES, nb_groups)
+
+
+def symbol_indexes(symbols, alphabet: list):
+    """ This function give the index of each symbol in the alphabet. The
+    characters which are not in the alphabet are 'N', as in the Huffman
+    compression.
+
+    Parameters
+    ----------
+    symbols : str, PackedSequence or list
+        uppercase sequence, or list of move-to-front symbols
+    alphabet : list
+        symbols of the sequence
+
+    Return
+    ------
+    indexes : bytes
+        index of each symbol
+    """
+
+    text = not isinstance(symbols, list)
+    default = alphabet.index('N') if 'N' in alphabet else 0
+    byte_index = bytearray([default] * 256)
+    for index, char in enumerate(alphabet):
+        code = ord(char) if text else char
+        if code < 256:
+            byte_index[code] = index
+    if text:
+        return str(symbols).encode('latin-1', 'replace').translate(
+            byte_index)
+    return bytes(symbols).translate(byte_index)
+
+
+def table_lengths(freq: list):
+    """ This function give the code lengths of a table. The symbols which
+    are not counted have no code.
+
+    Parameter
+    ---------
+    freq : list
+        number of occurrences of each symbol
+
+    Return
+    ------
+    lengths : list
+        length of the code of each symbol, 0 if it has no code
+    """
+
+    counted = {index: count for index, count in enumerate(freq) if count > 0}
+    lengths = [0] * len(freq)
+    if counted:
+        for index, length in package_merge(counted,
+                                           MAX_CODE_LENGTH).items():
+            lengths[index] = length
+    return lengths
+
+
+def selector_codes(selectors: list, nb: int):
+    """ This function give the codes of the selectors: each table number is
+    replaced by its rank in a move-to-front list, which is coded in unary
+    (rank times 1, then 0). A run of groups with the same table costs one
+    bit by group, and there are no selectors with one table.
+
+    Parameters
+    ----------
+    selectors : list
+        table of each group
+    nb : int
+        number of tables
+
+    Return
+    ------
+    codes : list
+        (code, length) of each selector
+    """
+
+    if nb == 1:
+        return []
+    order = list(range(0, nb, 1))
+    codes = []
+    for table in selectors:
+        rank = order.index(table)
+        order.insert(0, order.pop(rank))
+        codes.append((((1 << rank) - 1) << 1, rank + 1))
+    return codes
+
+
+class MultiHuffmanCompression(HuffmanCompression):
+    """ Class of Huffman compression with several code tables, like bzip2.
+    The symbols are cut in groups of GROUP_SIZE symbols, and each group is
+    coded with the table which gives the fewest bits. The tables are
+    improved in turn: each group chooses its table, then each table is
+    rebuilt from the symbols of its groups. So the compression follows the
+    changes of composition along a genome (GC-rich islands, repeats, runs of
+    N). """
+
+    name = 'multi'
+
+    def __init__(self, sequence, path: str = '../data/huffile.huft',
+                 mtf_rle: bool = False, max_code_length: int = None,
+                 instruments: NullInstruments = None,
+                 cache: NullCache = None):
+        self.alphabet = []
+        self.tables = []
+        self.selectors = []
+        super().__init__(sequence, path, mtf_rle, max_code_length,
+                         instruments, cache)
+
+    def creation_codes(self, max_code_length: int = None):
+        """ This method choose the table of each group and create the code
+        lengths of the tables. Codes of at most MAX_CODE_LENGTH bits are
+        used, max_code_length is not used. """
+
+        # The alphabet is sorted, so that the canonical codes of the indexes
+        # are the canonical codes of the symbols
+        self.alphabet = sorted([char for char, freq in self.dict_freq.items()
+                                if freq > 0])
+        self.indexes = symbol_indexes(self.symbols, self.alphabet)
+        self.tables, self.selectors = self.optimize_tables()
+
+    def optimize_tables(self):
+        """ This method create the tables and the selectors. The first
+        tables are built from clusters of groups of close composition. At the
+        end, the tables are kept only if they give fewer bits than one table,
+        selectors included.
+
+        Return
+        ------
+        tables : list
+            code length of each symbol in each table
+        selectors : list
+            table of each group
+        """
+
+        len_seq = len(self.indexes)
+        nb = nb_tables(len_seq)
+        if nb == 0:
+            return [], []
+        nb_symbols = len(self.alphabet)
+        counts = group_counts(self.indexes, nb_symbols, GROUP_SIZE) \
+            if use_numpy(self.indexes) else \
+            [[self.indexes.count(index, start, start + GROUP_SIZE)
+              for index in range(0, nb_symbols, 1)]
+             for start in range(0, len_seq, GROUP_SIZE)]
+
+        freq = [self.dict_freq[char] for char in self.alphabet]
+        single = table_lengths(freq)
+        single_cost = sum([count * length
+                           for count, length in zip(freq, single)])
+        if nb == 1:
+            return [single], [0] * len(counts)
+
+        nb_groups = len(counts)
+        selectors = farthest_groups(counts, nb) \
+            if not isinstance(counts, list) else \
+            self.farthest_groups(counts, nb)
+        tables, cost = self.tables_of(counts, selectors, nb)
+        for iteration in range(0, NB_ITERATIONS, 1):
+            selectors = self.assign(counts, tables)
+            tables, cost = self.tables_of(counts, selectors, nb)
+
+        # The tables which are not chosen by any group are removed
+        used = sorted(set(selectors))
+        rank = {table: i for i, table in enumerate(used)}
+        tables = [tables[table] for table in used]
+        selectors = [rank[table] for table in selectors]
+
+        cost += sum([length for code, length
+                     in selector_codes(selectors, len(tables))])
+        cost += 8 * len(self.alphabet) * (len(tables) - 1)
+        if cost >= single_cost:
+            return [single], [0] * nb_groups
+        return tables, selectors
+
+    @staticmethod
+    def farthest_groups(counts: list, nb: int):
+        """ This method cluster the groups by their composition, as
+        vectorized.farthest_groups.
+
+        Parameters
+        ----------
+        counts : list
+            number of occurrences of each symbol in each group
+        nb : int
+            number of clusters
+
+        Return
+        ------
+        selectors : list
+            cluster of each group
+        """
+
+        proportions = [[count / sum(group) for count in group]
+                       for group in counts]
+        mean = [sum(column) / len(proportions)
+                for column in zip(*proportions)]
+        distances = [sum([(x - y) ** 2 for x, y in zip(group, mean)])
+                     for group in proportions]
+        nearest = [0] * len(counts)
+        for seed in range(0, nb, 1):
+            seed_group = proportions[distances.index(max(distances))]
+            seed_distances = [sum([(x - y) ** 2
+                                   for x, y in zip(group, seed_group)])
+                              for group in proportions]
+            for group, distance in enumerate(seed_distances):
+                if seed == 0 or distance < distances[group]:
+                    nearest[group] = seed
+                    distances[group] = distance
+        return nearest
+
+    @staticmethod
+    def assign(counts, tables: list):
+        """ This method choose for each group the table which codes it with
+        the fewest bits.
+
+        Parameters
+        ----------
+        counts : list or numpy.ndarray
+            number of occurrences of each symbol in each group
+        tables : list
+            code length of each symbol in each table
+
+        Return
+        ------
+        selectors : list
+            table of each group
+        """
+
+        costs = [[length if length else NO_CODE_COST for length in lengths]
+                 for lengths in tables]
+        if not isinstance(counts, list):
+            return assign_groups(counts, costs)
+        selectors = []
+        for group in counts:
+            group_costs = [sum([count * cost
+                                for count, cost in zip(group, table)])
+                           for table in costs]
+            selectors.append(group_costs.index(min(group_costs)))
+        return selectors
+
+    @staticmethod
+    def tables_of(counts, selectors: list, nb: int):
+        """ This method create each table from the symbols of its groups.
+
+        Parameters
+        ----------
+        counts : list or numpy.ndarray
+            number of occurrences of each symbol in each group
+        selectors : list
+            table of each group
+        nb : int
+            number of tables
+
+        Return
+        ------
+        tables : list
+            code length of each symbol in each table
+        cost : int
+            number of bits of the symbols
+        """
+
+        nb_symbols = len(counts[0])
+        freq = [[0] * nb_symbols for table in range(0, nb, 1)]
+        if isinstance(counts, list):
+            for group, table in zip(counts, selectors):
+                for index, count in enumerate(group):
+                    freq[table][index] += count
+        else:
+            np = get_numpy()
+            table_freq = np.zeros((nb, nb_symbols), np.int64)
+            np.add.at(table_freq, np.asarray(selectors), counts)
+            freq = table_freq.tolist()
+        tables = [table_lengths(table_freq) for table_freq in freq]
+        cost = sum([count * length
+                    for table_freq, lengths in zip(freq, tables)
+                    for count, length in zip(table_freq, lengths)])
+        return tables, cost
+
+    def compression(self):
+        """ This method compress the sequence: the selectors then the codes
+        of the symbols are packed in the bytes of compressed_seq. """
+
+        writer = BitWriter()
+        codes = [canonical_codes({index: length
+                                  for index, length in enumerate(lengths)
+                                  if length})
+                 for lengths in self.tables]
+        with self.instruments.stage('multi.encode'):
+            if use_numpy(self.indexes):
+                np = get_numpy()
+                selectors = selector_codes(self.selectors, len(self.tables))
+                pack_codes(np.array([code for code, length in selectors],
+                                    np.uint64),
+                           np.array([length for code, length in selectors],
+                                    np.int64), writer)
+                encode_groups(self.indexes, self.selectors, codes,
+                              len(self.alphabet), GROUP_SIZE, writer)
+            else:
+                for code, length in selector_codes(self.selectors,
+                                                   len(self.tables)):
+                    writer.write(code, length)
+                for group, table in enumerate(self.selectors):
+                    table_codes = codes[table]
+                    start = group * GROUP_SIZE
+                    for index in self.indexes[start:start + GROUP_SIZE]:
+                        writer.write(*table_codes[index])
+        self.len_binary_seq = writer.len_bits
+        with self.instruments.stage('multi.pack'):
+            self.compressed_seq = writer.flush()
+
+    def cached_result(self):
+        return (self.dict_freq, self.tables, self.selectors,
+                self.len_binary_seq, bytes(self.compressed_seq))
+
+    def restore(self, cached: tuple):
+        dict_freq, tables, selectors, len_binary_seq, compressed_seq = cached
+        self.dict_freq = dict(dict_freq)
+        self.alphabet = sorted([char for char, freq in self.dict_freq.items()
+                                if freq > 0])
+        self.tables = [list(lengths) for lengths in tables]
+        self.selectors = list(selectors)
+        self.len_binary_seq = len_binary_seq
+        self.compressed_seq = bytearray(compressed_seq)
+
+    def header(self):
+        """ This method give the header of the compression file.
+
+        Return
+        ------
+        header : bytearray
+            magic number, number of symbols, kind of symbols, number of
+            tables and code lengths of each symbol in each table
+        """
+
+        # The frequencies are counted on the coded symbols
+        len_seq = sum(self.dict_freq.values())
+        header = bytearray(MULTI_MAGIC)
+        header += struct.pack('<QBBH', len_seq, self.mtf_rle,
+                              len(self.tables), len(self.alphabet))
+        for index, char in enumerate(self.alphabet):
+            if self.mtf_rle:
+                header += struct.pack('<B', char)
+            else:
+                char_bytes = char.encode('utf-8')
+                header += struct.pack('<B', len(char_bytes)) + char_bytes
+            header += bytes([lengths[index] for lengths in self.tables])
+        return header
+
+
+def read_multi_header(f):
+    """ This function read the header of a compression file with several
+    tables. The file is then at the beginning of the selectors.
+
+    Parameter
+    ---------
+    f : file object
+        compression file opened in binary mode
+
+    Return
+    ------
+    len_seq : int
+        number of symbols
+    table_lengths : dict
+        dictionary with key = character and value = tuple of the length of
+        its code in each table (0 if it has no code)
+    mtf_rle : bool
+        True if the symbols are move-to-front and zero run symbols
+    """
+
+    if f.read(len(MULTI_MAGIC)) != MULTI_MAGIC:
+        raise ValueError("{} is not a Huffman compression file with "
+                         "several tables".format(getattr(f, 'name', f)))
+
+    len_seq, mtf_rle, nb, nb_char = struct.unpack(
+        '<QBBH', f.read(struct.calcsize('<QBBH')))
+    lengths = {}
+    for i in range(0, nb_char, 1):
+        if mtf_rle:
+            char = f.read(1)[0]
+        else:
+            len_char = f.read(1)[0]
+            char = f.read(len_char).decode('utf-8')
+        lengths[char] = tuple(f.read(nb))
+        if len(lengths[char]) != nb:
+            raise ValueError("compression file is shorter than its header")
+    # Each table codes the symbols whose length is not 0
+    for table in range(0, nb, 1):
+        table_lengths = {char: char_lengths[table]
+                         for char, char_lengths in lengths.items()
+                         if char_lengths[table]}
+        if lengths and not table_lengths:
+            raise ValueError("code table {} is empty".format(table))
+        check_code_lengths(table_lengths, MAX_CODE_LENGTH)
+    return len_seq, lengths, bool(mtf_rle)
+
+
+class MultiTableDecoder:
+    """ Class of decoder of the compressions with several tables. Each table
+    has a lookup table, as in HuffmanTableDecoder, which decodes several
+    symbols at each step; at the end of a run of groups with the same table,
+    only the symbols of the run are taken from the last entry. """
+
+    def __init__(self, lengths: dict, table_bits: int = TABLE_BITS):
+        self.table_bits = table_bits
+        nb = len(next(iter(lengths.values()))) if lengths else 0
+        self.decoders = []
+        # Entries (symbols, number of bits, number of symbols) of each
+        # lookup table; an entry without complete code has an infinite number
+        # of symbols, so that it is decoded as the end of a run
+        self.lookups = []
+        # Code length of each symbol in each table
+        self.code_lengths = []
+        for table in range(0, nb, 1):
+            codes = canonical_codes({char: char_lengths[table]
+                                     for char, char_lengths in lengths.items()
+                                     if char_lengths[table]})
+            decoder = HuffmanTableDecoder(codes, table_bits)
+            self.decoders.append(decoder)
+            self.lookups.append([(symbols, used, len(symbols) if used
+                                  else float('inf'))
+                                 for symbols, used in decoder.table])
+            self.code_lengths.append({symbol: length for symbol, (code, length)
+                                      in codes.items()})
+        self.text = all(isinstance(char, str) for char in lengths)
+
+    def read_runs(self, data, len_seq: int):
+        """ This method decode the selectors, which are in unary after a
+        move-to-front, as runs of groups with the same table. There are no
+        selectors with one table.
+
+        Parameters
+        ----------
+        data : bytes-like
+            bytes of the stream
+        len_seq : int
+            number of symbols
+
+        Return
+        ------
+        runs : list
+            (table, number of groups) of each run
+        nb_bits : int
+            number of bits of the selectors
+        """
+
+        nb_groups = -(-len_seq // GROUP_SIZE)
+        nb = len(self.decoders)
+        if nb_groups == 0:
+            return [], 0
+        if nb == 0:
+            raise ValueError("Huffman stream has no code table")
+        if nb == 1:
+            return [(0, nb_groups)], 0
+
+        # A selector has at most nb - 1 bits of 1, then a 0
+        bits = "".join([BYTE_BITS[byte]
+                        for byte in bytes(data[0:-(-nb_groups * nb // 8)])])
+        order = list(range(0, nb, 1))
+        runs = []
+        table = order[0]
+        nb_run_groups = 0
+        position = 0
+        for group in range(0, nb_groups, 1):
+            end = bits.find('0', position)
+            if end < 0:
+                raise ValueError("Huffman stream is shorter than its "
+                                 "selectors")
+            rank = end - position
+            position = end + 1
+            if rank:
+                if rank >= nb:
+                    raise ValueError("Huffman stream has a wrong selector")
+                order.insert(0, order.pop(rank))
+                if nb_run_groups:
+                    runs.append((table, nb_run_groups))
+                table = order[0]
+                nb_run_groups = 0
+            nb_run_groups += 1
+        runs.append((table, nb_run_groups))
+        return runs, position
+
+    def decode(self, data, len_seq: int):
+        """ This method decode the selectors then the symbols of a stream.
+
+        Parameters
+        ----------
+        data : bytes-like
+            bytes of the stream
+        len_seq : int
+            number of symbols
+
+        Return
+        ------
+        symbols : str or list
+            decoded sequence, a string for a text alphabet
+        """
+
+        runs, nb_selector_bits = self.read_runs(data, len_seq)
+
+        # The groups of a run are decoded together, and only the last
+        # symbols of the run are taken from an entry
+        nb_bits = self.table_bits
+        mask = (1 << nb_bits) - 1
+        need = max([nb_bits] + [decoder.max_length
+                                for decoder in self.decoders])
+        # The stream is read by words of 32 bytes; the 32 bytes of 0 are
+        # only read by the lookups of the last symbols
+        word = 32
+        data = bytes(data[nb_selector_bits // 8:]) + bytes(word)
+        nb_acc_bits = 8 - nb_selector_bits % 8
+        acc = data[0] & ((1 << nb_acc_bits) - 1)
+        position = 1
+        pieces = []
+        append = pieces.append
+        left_seq = len_seq
+        for table, nb_run_groups in runs:
+            lookup = self.lookups[table]
+            left = min(GROUP_SIZE * nb_run_groups, left_seq)
+            left_seq -= left
+            while left:
+                if nb_acc_bits < need:
+                    # All the bytes are read, with the 32 bytes of 0: the
+                    # length in the header is larger than the stream
+                    if position >= len(data):
+                        raise ValueError("Huffman stream is shorter than "
+                                         "its length")
+                    acc = ((acc & ((1 << nb_acc_bits) - 1)) << (8 * word)) | \
+                        int.from_bytes(data[position:position+word], 'big')
+                    position += word
+                    nb_acc_bits += 8 * word
+                while nb_acc_bits >= need:
+                    symbols, used, nb_symbols = \
+                        lookup[(acc >> (nb_acc_bits - nb_bits)) & mask]
+                    if nb_symbols > left:
+                        break
+                    append(symbols)
+                    nb_acc_bits -= used
+                    left -= nb_symbols
+                else:
+                    continue
+                if not left:
+                    break
+                if used == 0:
+                    # Code longer than the table
+                    symbol, used = self.long_symbol(
+                        self.decoders[table], acc, nb_acc_bits)
+                    append(symbol if self.text else (symbol, ))
+                    nb_acc_bits -= used
+                    left -= 1
+                else:
+                    # Last symbols of the run
+                    symbols = symbols[0:left]
+                    append(symbols)
+                    nb_acc_bits -= sum(map(
+                        self.code_lengths[table].__getitem__, symbols))
+                    left = 0
+        # The bits read past the end of a truncated stream are counted,
+        # even those of the words which were not complete
+        if 8 * position - nb_acc_bits > 8 * (len(data) - word):
+            raise ValueError("Huffman stream is shorter than its length")
+
+        if self.text:
+            return "".join(pieces)
+        return [symbol for piece in pieces for symbol in piece]
+
+    @staticmethod
+    def long_symbol(decoder: HuffmanTableDecoder, acc: int,
+                    nb_acc_bits: int):
+        """ This method decode a symbol whose code is longer than the lookup
+        table.
+
+        Parameters
+        ----------
+        decoder : HuffmanTableDecoder
+            decoder of the table of the group
+        acc : int
+            bits not decoded, at least max_length bits
+        nb_acc_bits : int
+            number of bits of acc
+
+        Return
+        ------
+        (symbol, length) : tuple
+            symbol decoded and length of its code
+        """
+
+        max_length = decoder.max_length
+        value = acc >> (nb_acc_bits - max_length)
+        decoded = decoder.decode_symbol(value & ((1 << max_length) - 1),
+                                        max_length)
+        if decoded is None:
+            raise ValueError("Huffman stream has a wrong code")
+        return decoded
+
+
+class MultiHuffmanDecompression(HuffmanDecompression):
+    """ Class of decompression of a compression with several tables. len_seq
+    is the number of symbols and dict_bin_char the code lengths of the
+    header. """
+
+    name = 'multi'
+
+    def __init__(self, compressed_seq, len_seq, table_lengths,
+                 path: str = '../data/dechufile.txt', mtf_rle: bool = False,
+                 instruments: NullInstruments = None,
+                 cache: NullCache = None):
+        super().__init__(compressed_seq, len_seq, table_lengths, path,
+                         mtf_rle, instruments, cache)
+
+    @property
+    def initial_binary_seq(self):
+        return self.binary_seq
+
+    def decompression(self):
+        """ This method decode the selectors and the codes of the
+        compression to give the initial sequence. """
+
+        with self.instruments.stage('multi.decode'):
+            decoder = MultiTableDecoder(
+                self.dict_bin_char, SMALL_TABLE_BITS
+                if self.len_init_binary_seq < SMALL_SEQUENCE else TABLE_BITS)
+            symbols = decoder.decode(self.compressed_seq,
+                                     self.len_init_binary_seq)
+        if self.mtf_rle:
+            with self.instruments.stage('multi.mtf_rle_decode'):
+                self.initial_seq = mtf_rle_decode(symbols)
+        else:
+            self.initial_seq = symbols
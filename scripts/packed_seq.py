@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from itertools import chain, product
+import re
+import sys
+
+from huffman_stream import read_chunks
+from vectorized import use_numpy, byte_counts
+
+
+# Nucleotides stored on 2 bits, in the order of their code
+NUCLEOTIDES = "ACGT"
+
+# Code of each byte of the text: the other characters are exceptions, they
+# are stored as 'A' and written over by the exception runs
+CODE_TABLE = bytearray(256)
+for code, nucleotide in enumerate(NUCLEOTIDES):
+    CODE_TABLE[ord(nucleotide)] = code
+    CODE_TABLE[ord(nucleotide.lower())] = code
+CODE_TABLE = bytes(CODE_TABLE)
+
+# Packed byte of 4 codes read as a native unsigned int, and the 4 characters
+# of each packed byte (the first character is in the high bits)
+PACK = {}
+UNPACK = [b''] * 256
+for codes in product(range(4), repeat=4):
+    byte = codes[0] << 6 | codes[1] << 4 | codes[2] << 2 | codes[3]
+    PACK[int.from_bytes(bytes(codes), sys.byteorder)] = byte
+    UNPACK[byte] = "".join(NUCLEOTIDES[code] for code in codes).encode()
+
+# Runs of a same character which is not a nucleotide
+EXCEPTION_RUN = re.compile(r'([^ACGT])\1*', re.IGNORECASE)
+
+
+def pack_codes(text: str):
+    """ This function pack the codes of a text, 4 characters by byte.
+
+    Parameter
+    ---------
+    text : str
+        text whose length is a multiple of 4
+
+    Return
+    ------
+    data : bytes
+        packed codes
+    """
+
+    codes = text.encode('latin-1', 'replace').translate(CODE_TABLE)
+    return bytes(map(PACK.__getitem__, memoryview(codes).cast('I')))
+
+
+class PackedSequence:
+    """ Class of DNA sequence stored on 2 bits by nucleotide. The characters
+    which are not A, C, G or T (like N or $) are kept apart as runs of a same
+    character, which are few in a DNA sequence. The sequence is uppercase. """
+
+    __slots__ = ('data', 'length', 'exc_starts', 'exc_lengths', 'exc_chars',
+                 '_counts')
+
+    def __init__(self, data=b'', length: int = 0, exceptions=()):
+        self.data = bytes(data)
+        self.length = length
+        self.exc_starts = array('Q')
+        self.exc_lengths = array('Q')
+        self.exc_chars = []
+        for start, len_run, char in exceptions:
+            self.add_exception(start, len_run, char)
+        self._counts = None
+
+    @classmethod
+    def from_text(cls, text: str):
+        """ This method pack a text.
+
+        Parameter
+        ---------
+        text : str
+            DNA sequence
+
+        Return
+        ------
+        packed : PackedSequence
+            packed sequence
+        """
+
+        return cls.from_chunks([text])
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """ This method pack a text given by parts, without keeping the whole
+        text in memory.
+
+        Parameter
+        ---------
+        chunks : iterable
+            parts of the DNA sequence
+
+        Return
+        ------
+        packed : PackedSequence
+            packed sequence
+        """
+
+        packed = cls()
+        data = bytearray()
+        rest = ""
+        for chunk in chunks:
+            for match in EXCEPTION_RUN.finditer(chunk):
+                packed.add_exception(packed.length + match.start(),
+                                     match.end() - match.start(),
+                                     match.group(1).upper())
+            packed.length += len(chunk)
+            chunk = rest + chunk
+            cut = len(chunk) - len(chunk) % 4
+            data += pack_codes(chunk[0:cut])
+            rest = chunk[cut:]
+        data += pack_codes(rest + "A" * (-len(rest) % 4))
+        packed.data = bytes(data)
+        return packed
+
+    def add_exception(self, start: int, len_run: int, char: str):
+        """ This method add a run of a character which is not a nucleotide,
+        after the other runs. The run is merged with the previous run if it
+        continues it.
+
+        Parameters
+        ----------
+        start : int
+            position of the run
+        len_run : int
+            length of the run
+        char : str
+            character of the run
+        """
+
+        if self.exc_chars and self.exc_chars[-1] == char and \
+                self.exc_starts[-1] + self.exc_lengths[-1] == start:
+            self.exc_lengths[-1] += len_run
+            return
+        self.exc_starts.append(start)
+        self.exc_lengths.append(len_run)
+        self.exc_chars.append(char)
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        return self.to_text()
+
+    def __repr__(self):
+        return "PackedSequence({!r})".format(self.to_text(0, 20) +
+                                             ("..." if self.length > 20
+                                              else ""))
+
+    def __eq__(self, other):
+        if isinstance(other, PackedSequence):
+            return (self.length, self.data, self.exc_starts, self.exc_lengths,
+                    self.exc_chars) == (other.length, other.data,
+                                        other.exc_starts, other.exc_lengths,
+                                        other.exc_chars)
+        if isinstance(other, str):
+            return self.to_text() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def upper(self):
+        """ The sequence is already uppercase, so it is given back without
+        copy. """
+
+        return self
+
+    def to_text(self, start: int = 0, end: int = None):
+        """ This method unpack a part of the sequence.
+
+        Parameters
+        ----------
+        start : int
+            position of the first character
+        end : int
+            position after the last character, None for the end of the
+            sequence
+
+        Return
+        ------
+        text : str
+            characters between start and end
+        """
+
+        end = self.length if end is None else min(end, self.length)
+        if start >= end:
+            return ""
+        first = start // 4
+        text = b"".join(map(UNPACK.__getitem__,
+                            self.data[first:(end + 3) // 4])).decode()
+        text = text[start - 4 * first:end - 4 * first]
+
+        # Exception runs which end after start, in the order of the sequence
+        i = max(bisect_right(self.exc_starts, start) - 1, 0)
+        pieces = []
+        position = start
+        while i < len(self.exc_starts) and self.exc_starts[i] < end:
+            run_start = max(self.exc_starts[i], position)
+            run_end = min(self.exc_starts[i] + self.exc_lengths[i], end)
+            if run_end > run_start:
+                pieces.append(text[position - start:run_start - start])
+                pieces.append(self.exc_chars[i] * (run_end - run_start))
+                position = run_end
+            i += 1
+        if not pieces:
+            return text
+        pieces.append(text[position - start:])
+        return "".join(pieces)
+
+    def iter_text(self, chunk_size: int = 1 << 16):
+        """ This method give the sequence by parts.
+
+        Parameter
+        ---------
+        chunk_size : int
+            number of characters by part
+
+        Return
+        ------
+        chunks : iterator
+            parts of the sequence
+        """
+
+        chunk_size += -chunk_size % 4
+        for start in range(0, self.length, chunk_size):
+            yield self.to_text(start, start + chunk_size)
+
+    def __iter__(self):
+        return chain.from_iterable(self.iter_text())
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, end, step = key.indices(self.length)
+            if step == 1:
+                return PackedSequence.from_text(self.to_text(start, end))
+            return PackedSequence.from_text(self.to_text()[key])
+        if key < 0:
+            key += self.length
+        if not 0 <= key < self.length:
+            raise IndexError("sequence index out of range")
+        return self.to_text(key, key + 1)
+
+    def counts(self):
+        """ This method count the characters of the sequence from the packed
+        bytes, without unpacking them.
+
+        Return
+        ------
+        counts : dict
+            dictionary with key = character and value = number of occurrences
+        """
+
+        if self._counts is not None:
+            return self._counts
+
+        if use_numpy(self.data):
+            histogram = enumerate(byte_counts(self.data))
+        else:
+            histogram = Counter(self.data).items()
+        counts = dict.fromkeys(NUCLEOTIDES, 0)
+        for byte, nb_bytes in histogram:
+            for char in UNPACK[byte].decode():
+                counts[char] += nb_bytes
+
+        # The padding and the exceptions are stored as 'A'
+        counts['A'] -= 4 * len(self.data) - self.length
+        for len_run, char in zip(self.exc_lengths, self.exc_chars):
+            counts['A'] -= len_run
+            counts[char] = counts.get(char, 0) + len_run
+        self._counts = counts
+        return counts
+
+    def count(self, sub: str):
+        """ This method count the occurrences of a character, like str.count.
+
+        Parameter
+        ---------
+        sub : str
+            character (or string) searched
+
+        Return
+        ------
+        count : int
+            number of occurrences
+        """
+
+        if len(sub) == 1:
+            return self.counts().get(sub, 0)
+        return self.to_text().count(sub)
+
+    def __contains__(self, sub: str):
+        return self.count(sub) > 0
+
+
+def read_packed(path: str, chunk_size: int = 1 << 20):
+    """ This function read a sequence file into a packed sequence, by parts,
+    without line breaks.
+
+    Parameters
+    ----------
+    path : str
+        path of the sequence file
+    chunk_size : int
+        number of characters read at once
+
+    Return
+    ------
+    packed : PackedSequence
+        packed sequence of the file
+    """
+
+    return PackedSequence.from_chunks(read_chunks(path, chunk_size))
@@ -0,0 +1,360 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+from array import array
+import itertools
+import struct
+import sys
+
+from bit_stream import BitWriter
+from compression_huffman import HuffmanCompression
+from huffman_codes import canonical_codes, HuffmanTableDecoder
+from instrumentation import NullInstruments
+from vectorized import use_numpy, record_sums
+
+
+# Magic number at the beginning of a file of reads, then the code length of
+# each character of READ_ALPHABET
+READS_MAGIC = b'HUFR'
+READ_ALPHABET = 'ACGTN'
+# Number of records, and typecodes of the arrays of the index: number of
+# characters and number of bits of each record
+INDEX_HEADER = '<Qcc'
+# Byte offset of the index, at the end of the file
+READS_FOOTER = '<Q'
+
+# Number of reads encoded at once
+BATCH_SIZE = 1 << 14
+
+
+def smallest_array(values: array):
+    """ This function give the values in the array of the smallest type
+    which can hold them.
+
+    Parameter
+    ---------
+    values : array
+        non negative integers
+
+    Return
+    ------
+    values : array
+        same values, in an array of type 'B', 'H', 'I' or 'Q'
+    """
+
+    maximum = max(values, default=0)
+    for typecode in 'BHI':
+        if maximum < 1 << (8 * array(typecode).itemsize):
+            return array(typecode, values)
+    return array('Q', values)
+
+
+def batches(reads, size: int = BATCH_SIZE):
+    """ This function regroup the reads in lists of size reads.
+
+    Parameters
+    ----------
+    reads : iterable
+        sequence of each read
+    size : int
+        number of reads by list
+
+    Return
+    ------
+    batches : generator
+        lists of reads, the last one can be shorter
+    """
+
+    reads = iter(reads)
+    batch = list(itertools.islice(reads, size))
+    while batch:
+        yield batch
+        batch = list(itertools.islice(reads, size))
+
+
+class ReadBatchCompression(HuffmanCompression):
+    """ Class of Huffman compression of a collection of short reads. All the
+    reads use one code table, made from the frequencies of the reads or of a
+    sample of them, and are coded one after the other in one stream: there
+    is no tree and no header by read. An index at the end of the file gives
+    the number of characters and of bits of each read, so a read can be
+    decoded alone. """
+
+    name = 'reads'
+
+    def __init__(self, reads, sample_size: int = None,
+                 max_code_length: int = None,
+                 instruments: NullInstruments = None):
+        self.instruments = instruments if instruments is not None \
+            else NullInstruments()
+        # Function which gives the reads, called for each pass
+        self.reads = reads
+        self.sample_size = sample_size
+        self.sequence = ''
+        self.mtf_rle = False
+        with self.instruments.stage('reads.frequencies'):
+            self.dict_freq = self.freq_nucleotide()
+        self.tree = None
+        self.code_lengths = {}
+        self.dict_char = {}
+        with self.instruments.stage('reads.codes'):
+            self.creation_codes(max_code_length)
+        self.compressed_seq = bytearray()
+        self.len_binary_seq = 0
+
+    @classmethod
+    def from_reader(cls, reader, sample_size: int = None,
+                    instruments: NullInstruments = None):
+        """ This method prepare the compression of the reads of a FASTA or
+        FASTQ file. The headers and qualities are side streams of the
+        reader, they are not in the compression.
+
+        Parameters
+        ----------
+        reader : MappedReader
+            reader of the file
+        sample_size : int
+            number of reads whose characters are counted, None for all
+        instruments : NullInstruments
+            measures of the stages, None to measure nothing
+
+        Return
+        ------
+        compression : ReadBatchCompression
+            compression ready to be saved
+        """
+
+        # A read is short, it is copied at once without its line breaks
+        def reads():
+            for record in reader.records():
+                yield record.sequence.tobytes().translate(
+                    None, b'\r\n').decode('latin-1')
+
+        return cls(reads, sample_size=sample_size, instruments=instruments)
+
+    def freq_nucleotide(self):
+        """ This method create the frequency dictionary of the characters of
+        the reads, or of the first sample_size reads. With a sample, each
+        character is counted once more, so that a character which is not in
+        the sample still has a code.
+
+        Return
+        ------
+        freq : dict
+            frequency dictionary of the characters of the reads
+        """
+
+        freq = {'A': 0, 'C': 0, 'T': 0, 'G': 0, 'N': 0}
+        reads = self.reads()
+        if self.sample_size is not None:
+            reads = itertools.islice(reads, self.sample_size)
+            freq = {char: 1 for char in freq}
+        for batch in batches(reads):
+            self.update_freq(freq, "".join(batch).upper())
+        return freq
+
+    def code_header(self):
+        """ This method give the code length of each character of
+        READ_ALPHABET, 0 for a character without code.
+
+        Return
+        ------
+        header : bytes
+            code lengths
+        """
+
+        return bytes([len(self.dict_char.get(char, ''))
+                      for char in READ_ALPHABET])
+
+    def save_compression(self, path: str = '../data/reads.hufr'):
+        """ This method compress the reads and save them in a binary file.
+
+        Parameter
+        ---------
+        path : str
+            path of the compression file
+        """
+
+        with open(path, 'wb') as f:
+            self.write_compression(f)
+
+    def write_compression(self, f):
+        """ This method compress the reads and write them, then the index,
+        in an opened file.
+
+        Parameter
+        ---------
+        f : file object
+            file opened in binary mode
+        """
+
+        header = READS_MAGIC + self.code_header()
+        f.write(header)
+        offset = len(header)
+
+        # Code length of each byte, the unknown characters are 'N'
+        length_table = bytearray([len(self.dict_char.get('N', ''))] * 256)
+        for char, code in self.dict_char.items():
+            length_table[ord(char)] = len(code)
+
+        writer = BitWriter()
+        lengths = array('Q')
+        bits = array('Q')
+        for batch in batches(self.reads()):
+            text = "".join(batch).upper()
+            batch_lengths = [len(read) for read in batch]
+            with self.instruments.stage('reads.encode'):
+                self.encode(text, writer)
+                data = writer.take_bytes()
+                code_lengths = text.encode('latin-1', 'replace').translate(
+                    length_table)
+                if use_numpy(code_lengths):
+                    bits.extend(record_sums(code_lengths, batch_lengths))
+                else:
+                    start = 0
+                    for length in batch_lengths:
+                        bits.append(sum(code_lengths[start:start+length]))
+                        start += length
+            lengths.extend(batch_lengths)
+            with self.instruments.stage('reads.write'):
+                f.write(data)
+            offset += len(data)
+            self.instruments.count('reads.records', len(batch))
+            self.instruments.count('reads.input_chars', len(text))
+            self.instruments.count('reads.output_bytes', len(data))
+        data = writer.flush()
+        f.write(data)
+        offset += len(data)
+        self.len_binary_seq = writer.len_bits
+
+        lengths = smallest_array(lengths)
+        bits = smallest_array(bits)
+        f.write(struct.pack(INDEX_HEADER, len(lengths),
+                            lengths.typecode.encode(),
+                            bits.typecode.encode()))
+        for values in (lengths, bits):
+            if sys.byteorder == 'big':
+                values.byteswap()
+            f.write(values.tobytes())
+        f.write(struct.pack(READS_FOOTER, offset))
+
+
+class ReadBatchReader:
+    """ Class of random access reader of a file written by
+    ReadBatchCompression. The index is read when the file is opened, then
+    each read, or each range of reads, only reads and decodes its bits. """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.read_index()
+        except Exception:
+            self.file.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """ This method close the file. """
+
+        self.file.close()
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __getitem__(self, i: int):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("read index out of range")
+        return self.reads(i, i + 1)[0]
+
+    def __iter__(self):
+        for start in range(0, len(self), BATCH_SIZE):
+            for read in self.reads(start, start + BATCH_SIZE):
+                yield read
+
+    def read_index(self):
+        """ This method read the codes and the index of the file. """
+
+        f = self.file
+        if f.read(len(READS_MAGIC)) != READS_MAGIC:
+            raise ValueError("{} is not a file of reads".format(self.path))
+        code_lengths = {char: length for char, length
+                        in zip(READ_ALPHABET, f.read(len(READ_ALPHABET)))
+                        if length}
+        self.decoder = HuffmanTableDecoder(canonical_codes(code_lengths))
+        self.data_offset = f.tell()
+
+        f.seek(-struct.calcsize(READS_FOOTER), 2)
+        index_offset, = struct.unpack(READS_FOOTER, f.read(
+            struct.calcsize(READS_FOOTER)))
+        f.seek(index_offset)
+        nb_reads, lengths_type, bits_type = struct.unpack(
+            INDEX_HEADER, f.read(struct.calcsize(INDEX_HEADER)))
+        arrays = []
+        for typecode in (lengths_type, bits_type):
+            values = array(typecode.decode())
+            data = f.read(nb_reads * values.itemsize)
+            if len(data) != nb_reads * values.itemsize:
+                raise ValueError("{}: the index is truncated".format(
+                    self.path))
+            values.frombytes(data)
+            if sys.byteorder == 'big':
+                values.byteswap()
+            arrays.append(values)
+        self.lengths, bits = arrays
+        # Bit offset of each read in the stream, and of the end
+        self.offsets = array('Q', [0])
+        self.offsets.extend(itertools.accumulate(bits))
+
+    def reads(self, start: int = 0, end: int = None):
+        """ This method decode a range of reads at once.
+
+        Parameters
+        ----------
+        start : int
+            index of the first read
+        end : int
+            index after the last read, None for the end
+
+        Return
+        ------
+        reads : list
+            sequence of each read
+        """
+
+        end = len(self) if end is None else min(end, len(self))
+        start = max(start, 0)
+        if start >= end:
+            return []
+        first_bit = self.offsets[start]
+        nb_bits = self.offsets[end] - first_bit
+        self.file.seek(self.data_offset + first_bit // 8)
+        data = self.file.read((first_bit % 8 + nb_bits + 7) // 8)
+
+        # The bits before the first read are removed
+        shift = first_bit % 8
+        if shift:
+            value = int.from_bytes(data, 'big')
+            value &= (1 << (8 * len(data) - shift)) - 1
+            data = (value << shift).to_bytes(len(data), 'big')
+        text = self.decoder.decode(data, nb_bits)
+
+        reads = []
+        position = 0
+        for length in self.lengths[start:end]:
+            reads.append(text[position:position+length])
+            position += length
+        return reads
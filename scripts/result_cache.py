@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+import os
+import threading
+from array import array
+from collections import OrderedDict
+
+
+def estimate_size(value):
+    """ This function give about the memory used by a result: only the
+    texts, the bytes and the arrays are counted.
+
+    Parameter
+    ---------
+    value : object
+        result, or tuple, list or dict of results
+
+    Return
+    ------
+    size : int
+        size in bytes
+    """
+
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value)
+    if isinstance(value, array):
+        return len(value) * value.itemsize
+    if isinstance(value, dict):
+        return sum([estimate_size(item) for item in value.values()]) + \
+            64 * len(value)
+    if isinstance(value, (tuple, list)):
+        return sum([estimate_size(item) for item in value]) + 8 * len(value)
+    return 64
+
+
+class NullCache:
+    """ Default cache of the results, which keeps nothing: no key is
+    computed, so the sequence is never hashed. """
+
+    enabled = False
+
+    def key(self, kind: str, data, **params):
+        """ This method give the key of a result.
+
+        Parameters
+        ----------
+        kind : str
+            kind of result, like 'bwt' or 'huffman'
+        data : str, PackedSequence, bytes or list
+            input of the computation
+        params : dict
+            parameters of the computation
+
+        Return
+        ------
+        key : str
+            hexadecimal SHA-256 of the kind, the parameters and the input,
+            None for the NullCache
+        """
+
+        return None
+
+    def get(self, key: str):
+        """ This method give a result kept in the cache.
+
+        Parameter
+        ---------
+        key : str
+            key of the result
+
+        Return
+        ------
+        value : object
+            result, None if it is not in the cache
+        """
+
+        return None
+
+    def put(self, key: str, value):
+        """ This method keep a result in the cache.
+
+        Parameters
+        ----------
+        key : str
+            key of the result
+        value : object
+            result, which can be pickled
+        """
+
+
+class DiskCache:
+    """ Class of the disk tier of the cache: a pickle file by result in a
+    directory. When the files take more than max_bytes, the files which were
+    not read for the longest time are removed. """
+
+    def __init__(self, directory: str, max_bytes: int = 1 << 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str):
+        """ This method give the path of the file of a result. """
+
+        return os.path.join(self.directory, key + ".pkl")
+
+    def get(self, key: str):
+        import pickle
+
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        # The date of the file is the date of the last use, for the eviction
+        os.utime(path)
+        return value
+
+    def put(self, key: str, value):
+        import pickle
+
+        path = self.path(key)
+        # A reader never sees a half written file
+        tmp_path = "{}.{}.tmp".format(path, threading.get_ident())
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """ This method remove the files used the longest time ago, until the
+        files take less than max_bytes. """
+
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pkl"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum([size for mtime, size, path in files])
+        for mtime, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+class ResultCache(NullCache):
+    """ Cache of the results of the transformations, like BWT sequences,
+    code tables and compressions. A result is found by the hash of its input
+    and of the parameters of the computation, so the same sequence gives the
+    same result whatever its file.
+
+    The results are kept in memory, the results used the longest time ago
+    are removed beyond max_entries results or max_bytes bytes. With a
+    directory, they are also kept on disk, for the next runs. """
+
+    enabled = True
+
+    def __init__(self, max_entries: int = 32, max_bytes: int = 256 << 20,
+                 directory: str = None, max_disk_bytes: int = 1 << 30):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.nb_bytes = 0
+        self.disk = DiskCache(directory, max_disk_bytes) \
+            if directory is not None else None
+        # The jobs of the GUI use the cache out of the Tk loop
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, kind: str, data, **params):
+        import hashlib
+
+        digest = hashlib.sha256(kind.encode())
+        digest.update(repr(sorted(params.items())).encode())
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            digest.update(data)
+        elif isinstance(data, list):
+            digest.update(repr(data).encode())
+        else:
+            # A packed sequence has the key of its text
+            digest.update(str(data).encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    def get(self, key: str):
+        if key is None:
+            return None
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+        value = self.disk.get(key) if self.disk is not None else None
+        with self.lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.remember(key, value)
+        return value
+
+    def put(self, key: str, value):
+        if key is None:
+            return
+        with self.lock:
+            self.remember(key, value)
+        if self.disk is not None:
+            self.disk.put(key, value)
+
+    def remember(self, key: str, value):
+        """ This method keep a result in memory, then remove the results used
+        the longest time ago if there are too many. """
+
+        if key in self.entries:
+            self.nb_bytes -= self.sizes[key]
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        self.sizes[key] = estimate_size(value)
+        self.nb_bytes += self.sizes[key]
+        # A result larger than max_bytes is not kept in memory
+        while self.entries and (len(self.entries) > self.max_entries or
+                                self.nb_bytes > self.max_bytes):
+            old_key, old_value = self.entries.popitem(last=False)
+            self.nb_bytes -= self.sizes.pop(old_key)
+
+    def clear(self):
+        """ This method remove the results kept in memory. """
+
+        with self.lock:
+            self.entries.clear()
+            self.sizes.clear()
+            self.nb_bytes = 0
@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+import abc
+import mmap
+
+from packed_seq import PackedSequence
+
+
+class SequenceRecord:
+    """ Class of a record of a FASTA or FASTQ file. The fields are
+    memoryviews on the mapped file, without copy: bytes() gives a copy. """
+
+    __slots__ = ('header', 'sequence', 'quality')
+
+    def __init__(self, header, sequence, quality=None):
+        # Header without its first character ('>' or '@')
+        self.header = header
+        # Sequence, with its line breaks for a FASTA file
+        self.sequence = sequence
+        # Quality string of a FASTQ record, None for a FASTA record
+        self.quality = quality
+
+
+class MappedReader(abc.ABC):
+    """ Class of reader which maps a sequence file in memory. The records are
+    parsed on the mapped file, so a part of the file is only read when it is
+    used, and only the sequence is copied, by parts, to be compressed. Each
+    format gives its own records method. """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file can not be mapped
+            self.map = b''
+        self.view = memoryview(self.map)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """ This method close the file. The mapping stays open as long as
+        records read before are used. """
+
+        self.view.release()
+        if isinstance(self.map, mmap.mmap):
+            try:
+                self.map.close()
+            except BufferError:
+                # Records are still used: the mapping is closed when they are
+                # freed
+                pass
+        self.file.close()
+
+    def line_end(self, start: int):
+        """ This method give the end of the line which begins at start.
+
+        Parameter
+        ---------
+        start : int
+            position of the beginning of the line
+
+        Return
+        ------
+        (end, next_start) : tuple
+            position of the end of the line without line break, and position
+            of the next line
+        """
+
+        end = self.map.find(b'\n', start)
+        next_start = len(self.map) if end < 0 else end + 1
+        end = len(self.map) if end < 0 else end
+        if end > start and self.map[end-1:end] == b'\r':
+            end -= 1
+        return end, next_start
+
+    @abc.abstractmethod
+    def records(self):
+        """ This method give the records of the file.
+
+        Return
+        ------
+        records : generator
+            SequenceRecord of each record
+        """
+
+    def headers(self):
+        """ This method give the side stream of the headers, to compress them
+        apart from the sequences.
+
+        Return
+        ------
+        headers : generator
+            header of each record
+        """
+
+        for record in self.records():
+            yield record.header
+
+    def record_chunks(self, record: SequenceRecord,
+                      chunk_size: int = 1 << 20):
+        """ This method give the sequence of a record by parts, without line
+        breaks.
+
+        Parameters
+        ----------
+        record : SequenceRecord
+            record of the file
+        chunk_size : int
+            number of bytes of the file read at each step
+
+        Return
+        ------
+        chunks : generator
+            parts of the sequence
+        """
+
+        sequence = record.sequence
+        for start in range(0, len(sequence), chunk_size):
+            chunk = sequence[start:start + chunk_size].tobytes()
+            yield chunk.translate(None, b'\r\n').decode('latin-1')
+
+    def sequence_chunks(self, chunk_size: int = 1 << 20):
+        """ This method give the sequences of all the records, one after the
+        other, by parts of about chunk_size characters. The limits of the
+        records are given by the headers side stream and packed_records.
+
+        Parameter
+        ---------
+        chunk_size : int
+            number of characters by part
+
+        Return
+        ------
+        chunks : generator
+            parts of the sequences
+        """
+
+        pieces = []
+        size = 0
+        for record in self.records():
+            for chunk in self.record_chunks(record, chunk_size):
+                pieces.append(chunk)
+                size += len(chunk)
+                if size >= chunk_size:
+                    yield "".join(pieces)
+                    pieces = []
+                    size = 0
+        if pieces:
+            yield "".join(pieces)
+
+    def packed_records(self, chunk_size: int = 1 << 20):
+        """ This method give the sequence of each record as a packed sequence,
+        which can be given to TransformeeBW or HuffmanCompression.
+
+        Parameter
+        ---------
+        chunk_size : int
+            number of bytes of the file read at each step
+
+        Return
+        ------
+        records : generator
+            (header, PackedSequence) of each record
+        """
+
+        for record in self.records():
+            yield record.header, PackedSequence.from_chunks(
+                self.record_chunks(record, chunk_size))
+
+
+class FastaReader(MappedReader):
+    """ Class of reader of FASTA file: each record is a '>' header line
+    followed by the lines of the sequence. """
+
+    def records(self):
+        start = self.map.find(b'>')
+        while start >= 0:
+            header_end, seq_start = self.line_end(start)
+            # The sequence goes to the next line which begins with '>'
+            next_start = self.map.find(b'\n>', seq_start - 1)
+            seq_end = len(self.map) if next_start < 0 else next_start + 1
+            yield SequenceRecord(self.view[start+1:header_end],
+                                 self.view[seq_start:seq_end])
+            start = next_start + 1 if next_start >= 0 else -1
+
+
+class FastqReader(MappedReader):
+    """ Class of reader of FASTQ file: each record is a '@' header line, the
+    sequence line, a '+' line and the quality line. The qualities are a side
+    stream, like the headers. """
+
+    def records(self):
+        start = 0
+        while start < len(self.map):
+            header_end, seq_start = self.line_end(start)
+            if header_end == start:
+                # Empty line
+                start = seq_start
+                continue
+            if self.map[start:start+1] != b'@':
+                raise ValueError("{}: no FASTQ header at byte {}"
+                                 .format(self.path, start))
+            seq_end, plus_start = self.line_end(seq_start)
+            plus_end, qual_start = self.line_end(plus_start)
+            if self.map[plus_start:plus_start+1] != b'+':
+                raise ValueError("{}: no '+' line at byte {}"
+                                 .format(self.path, plus_start))
+            qual_end, next_start = self.line_end(qual_start)
+            if qual_end - qual_start != seq_end - seq_start:
+                raise ValueError("{}: the quality of the record at byte {} "
+                                 "has not the length of the sequence"
+                                 .format(self.path, qual_start))
+            yield SequenceRecord(self.view[start+1:header_end],
+                                 self.view[seq_start:seq_end],
+                                 self.view[qual_start:qual_end])
+            start = next_start
+
+    def qualities(self):
+        """ This method give the side stream of the quality strings, to
+        compress them apart from the sequences.
+
+        Return
+        ------
+        qualities : generator
+            quality string of each record
+        """
+
+        for record in self.records():
+            yield record.quality
+
+
+def write_side_stream(buffers, path: str):
+    """ This function save a side stream (headers or qualities), one line by
+    record, to compress it apart.
+
+    Parameters
+    ----------
+    buffers : iterable
+        bytes-like of each record
+    path : str
+        path of the side stream file
+    """
+
+    with open(path, 'wb') as f:
+        for buffer in buffers:
+            f.write(buffer)
+            f.write(b'\n')
+
+
+def open_reader(path: str, file_format: str = None):
+    """ This function open the reader of a FASTA or FASTQ file.
+
+    Parameters
+    ----------
+    path : str
+        path of the file
+    file_format : str
+        'fasta' or 'fastq', None to guess it from the first character
+
+    Return
+    ------
+    reader : MappedReader
+        reader of the file
+    """
+
+    if file_format is None:
+        with open(path, 'rb') as f:
+            file_format = 'fastq' if f.read(1) == b'@' else 'fasta'
+    if file_format == 'fasta':
+        return FastaReader(path)
+    if file_format == 'fastq':
+        return FastqReader(path)
+    raise ValueError("unknown sequence format: {}".format(file_format))
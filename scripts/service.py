@@ -0,0 +1,732 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+import signal
+import stat
+import struct
+import sys
+import tempfile
+
+from instrumentation import NullInstruments, create_instruments
+
+
+# Default Unix socket of the service
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), "bwt_huffman.sock")
+
+# A request is the len of its JSON header, the header ({"op", "params",
+# "size"}) and size bytes of payload. A response is the len of its JSON
+# header and the header ({"status", "message"}), then the result in chunks:
+# len of the chunk and its bytes, until a chunk of len 0. A chunk of len
+# ERROR_CHUNK is followed by an error message, if the result fails after
+# its first chunks.
+FRAME = '<I'
+ERROR_CHUNK = 0xFFFFFFFF
+MAX_HEADER = 1 << 16
+RESPONSE_CHUNK = 1 << 18
+
+OPERATIONS = ('transform', 'compress', 'decompress', 'extract')
+
+# Memory used by a request, in bytes by byte of payload, for the admission
+# control: the BWT keeps the suffix array as a list of integers
+MEMORY_FACTORS = {'transform': 48, 'compress': 4, 'decompress': 24}
+# An extraction is decoded by parts of EXTRACT_PART characters (or reads
+# for a file of reads), whose memory is about EXTRACT_MEMORY bytes
+EXTRACT_PART = 1 << 20
+EXTRACT_READS = 1 << 14
+EXTRACT_MEMORY = 8 * EXTRACT_PART
+
+# The requests whose payload is smaller than SMALL_REQUEST bytes are run
+# together: BATCH_SIZE requests at most, the first one waits BATCH_DELAY
+# seconds at most
+SMALL_REQUEST = 1 << 16
+BATCH_SIZE = 32
+BATCH_DELAY = 0.002
+
+
+class ServiceError(Exception):
+    """ Exception of a request which fails, given to the client. """
+
+
+def send_frame(data: bytes):
+    """ This function give a frame: len of the data, then the data.
+
+    Parameter
+    ---------
+    data : bytes
+        content of the frame
+
+    Return
+    ------
+    frame : bytes
+        frame to send
+    """
+
+    return struct.pack(FRAME, len(data)) + data
+
+
+def warm_up():
+    """ This function import the transformations in a worker process, when
+    it starts, so that the first request does not pay the imports. Ctrl-C
+    is ignored by the workers: the service stops them itself. """
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import BWT
+    import entropy_coders
+    import archive
+    import read_batch
+
+
+def run_request(op: str, params: dict, payload: bytes):
+    """ This function run a request in a worker process.
+
+    Parameters
+    ----------
+    op : str
+        operation: 'transform', 'compress' or 'decompress'
+    params : dict
+        parameters of the operation
+    payload : bytes
+        sequence, BWT sequence or compression
+
+    Return
+    ------
+    result : bytes
+        BWT sequence, sequence or compression
+    """
+
+    from BWT import TransformeeBW
+    from entropy_coders import compress, decompress
+
+    if op == 'transform':
+        sequence = payload.decode('latin-1')
+        if params.get('inverse', False):
+            result = TransformeeBW(None).reconstruction_seq(sequence)
+            if result is None:
+                raise ServiceError("the BWT sequence does not contain '$'")
+            return result.encode('latin-1')
+        return TransformeeBW(None).transformation_seq(
+            sequence, path=None).encode('latin-1')
+    if op == 'compress':
+        compression = compress(payload.decode('latin-1'),
+                               params.get('coder', 'huffman'), path=None,
+                               mtf_rle=params.get('mtf_rle', False))
+        return bytes(compression.header() + compression.compressed_seq)
+    if op == 'decompress':
+        return decompress(payload, path=None).initial_seq.encode('latin-1')
+    raise ServiceError("unknown operation: {}".format(op))
+
+
+def run_batch(requests: list):
+    """ This function run several small requests in a worker process, so
+    that they pay the dispatch to the process once.
+
+    Parameter
+    ---------
+    requests : list
+        (op, params, payload) of each request
+
+    Return
+    ------
+    results : list
+        (True, result) or (False, error message) of each request
+    """
+
+    results = []
+    for op, params, payload in requests:
+        try:
+            results.append((True, run_request(op, params, payload)))
+        except Exception as e:
+            results.append((False, "{}: {}".format(type(e).__name__, e)))
+    return results
+
+
+def extract_length(path: str):
+    """ This function give the kind and the len of a file which can be
+    extracted.
+
+    Parameter
+    ---------
+    path : str
+        path of an archive (HuffmanArchive) or of a file of reads
+        (ReadBatchCompression)
+
+    Return
+    ------
+    (kind, length) : tuple
+        'archive' and number of characters, or 'reads' and number of reads
+    """
+
+    from archive import ARCHIVE_MAGIC, ArchiveReader
+    from read_batch import READS_MAGIC, ReadBatchReader
+
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    if magic == ARCHIVE_MAGIC:
+        with ArchiveReader(path) as reader:
+            return 'archive', len(reader)
+    if magic == READS_MAGIC:
+        with ReadBatchReader(path) as reader:
+            return 'reads', len(reader)
+    raise ServiceError("{} is not an archive or a file of reads".format(
+        path))
+
+
+def extract_part(path: str, kind: str, start: int, end: int):
+    """ This function decode a part of an archive or of a file of reads.
+
+    Parameters
+    ----------
+    path : str
+        path of the file
+    kind : str
+        'archive' or 'reads'
+    start : int
+        first character, or first read
+    end : int
+        character, or read, after the last one
+
+    Return
+    ------
+    part : bytes
+        characters of the region, or reads, one by line
+    """
+
+    from archive import ArchiveReader
+    from read_batch import ReadBatchReader
+
+    if kind == 'archive':
+        with ArchiveReader(path) as reader:
+            return reader.extract(start, end).encode('latin-1')
+    with ReadBatchReader(path) as reader:
+        return "".join([read + "\n" for read in reader.reads(start, end)]
+                       ).encode('latin-1')
+
+
+class Admission:
+    """ Class of admission control: the requests reserve an estimate of
+    their memory in a budget of max_bytes bytes, and wait while the budget
+    is used by other requests. A request larger than the budget, or beyond
+    max_waiting waiting requests, is refused. """
+
+    def __init__(self, max_bytes: int, max_waiting: int = 64):
+        self.max_bytes = max_bytes
+        self.max_waiting = max_waiting
+        self.available = max_bytes
+        self.waiting = 0
+        self.condition = asyncio.Condition()
+
+    async def acquire(self, nb_bytes: int):
+        """ This method reserve memory for a request.
+
+        Parameter
+        ---------
+        nb_bytes : int
+            memory of the request
+
+        Exception
+        ---------
+        ServiceError
+            if the request is refused
+        """
+
+        if nb_bytes > self.max_bytes:
+            raise ServiceError("request too large: {} bytes of memory for "
+                               "{} allowed".format(nb_bytes, self.max_bytes))
+        if self.waiting >= self.max_waiting:
+            raise ServiceError("service busy: {} requests are waiting"
+                               .format(self.waiting))
+        self.waiting += 1
+        try:
+            async with self.condition:
+                await self.condition.wait_for(
+                    lambda: self.available >= nb_bytes)
+                self.available -= nb_bytes
+        finally:
+            self.waiting -= 1
+
+    async def release(self, nb_bytes: int):
+        """ This method give back the memory of a request.
+
+        Parameter
+        ---------
+        nb_bytes : int
+            memory of the request
+        """
+
+        async with self.condition:
+            self.available += nb_bytes
+            self.condition.notify_all()
+
+
+class Batcher:
+    """ Class which regroups the small requests: they are sent to the
+    process pool together, when BATCH_SIZE requests are waiting or after
+    BATCH_DELAY seconds. """
+
+    def __init__(self, executor, batch_size: int = BATCH_SIZE,
+                 delay: float = BATCH_DELAY,
+                 instruments: NullInstruments = None):
+        self.executor = executor
+        self.batch_size = batch_size
+        self.delay = delay
+        self.instruments = instruments if instruments is not None \
+            else NullInstruments()
+        self.pending = []
+        self.timer = None
+
+    def submit(self, op: str, params: dict, payload: bytes):
+        """ This method add a request to the next batch.
+
+        Parameters
+        ----------
+        op : str
+            operation
+        params : dict
+            parameters of the operation
+        payload : bytes
+            data of the request
+
+        Return
+        ------
+        future : asyncio.Future
+            future of the result
+        """
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append(((op, params, payload), future))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.delay, self.flush)
+        return future
+
+    def flush(self):
+        """ This method send the waiting requests to the process pool. """
+
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch = self.pending
+        self.pending = []
+        if not batch:
+            return
+        self.instruments.count('service.batches', 1)
+        job = asyncio.get_running_loop().run_in_executor(
+            self.executor, run_batch, [request for request, future in batch])
+
+        def done(job):
+            futures = [future for request, future in batch]
+            if job.exception() is not None:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(job.exception())
+                return
+            for future, (ok, result) in zip(futures, job.result()):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(result)
+                else:
+                    future.set_exception(ServiceError(result))
+
+        job.add_done_callback(done)
+
+
+class CompressionService:
+    """ Class of local service of the transformations. The requests come
+    from a Unix socket or a localhost TCP port, the computations are run by
+    a pool of processes which import the transformations once, and the
+    results are sent back in chunks. """
+
+    def __init__(self, workers: int = None, max_memory: int = 1 << 30,
+                 max_waiting: int = 64,
+                 instruments: NullInstruments = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_memory = max_memory
+        self.max_waiting = max_waiting
+        self.instruments = instruments if instruments is not None \
+            else NullInstruments()
+        self.executor = None
+        self.admission = None
+        self.batcher = None
+        self.server = None
+        self.socket_path = None
+
+    async def start(self, socket_path: str = None, host: str = '127.0.0.1',
+                    port: int = None):
+        """ This method start the process pool and the server.
+
+        Parameters
+        ----------
+        socket_path : str
+            path of the Unix socket, if port is None
+        host : str
+            address of the TCP server, localhost by default
+        port : int
+            port of the TCP server, None for a Unix socket
+
+        Exception
+        ---------
+        ServiceError
+            if a service already answers on the Unix socket
+        """
+
+        if port is None:
+            socket_path = socket_path or DEFAULT_SOCKET
+            await self.remove_stale_socket(socket_path)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                            initializer=warm_up)
+        self.admission = Admission(self.max_memory, self.max_waiting)
+        self.batcher = Batcher(self.executor,
+                               instruments=self.instruments)
+        if port is None:
+            self.server = await asyncio.start_unix_server(self.handle,
+                                                          socket_path)
+            self.socket_path = socket_path
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port)
+
+    @staticmethod
+    async def remove_stale_socket(socket_path: str):
+        """ This method remove the Unix socket left by a service which was
+        killed. A socket where a service answers is not removed.
+
+        Parameter
+        ---------
+        socket_path : str
+            path of the Unix socket
+
+        Exception
+        ---------
+        ServiceError
+            if a service answers on the socket, or if the path is not a
+            socket
+        """
+
+        try:
+            mode = os.stat(socket_path).st_mode
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(mode):
+            raise ServiceError("{} exists and is not a socket".format(
+                socket_path))
+        try:
+            reader, writer = await asyncio.open_unix_connection(socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.remove(socket_path)
+            return
+        writer.close()
+        raise ServiceError("a service already runs on {}".format(
+            socket_path))
+
+    async def serve(self, socket_path: str = None, host: str = '127.0.0.1',
+                    port: int = None):
+        """ This method run the service until it is cancelled, or until the
+        process gets SIGINT or SIGTERM. The process pool is then stopped and
+        the Unix socket removed.
+
+        Parameters
+        ----------
+        socket_path : str
+            path of the Unix socket, if port is None
+        host : str
+            address of the TCP server, localhost by default
+        port : int
+            port of the TCP server, None for a Unix socket
+        """
+
+        loop = asyncio.get_running_loop()
+        signals = (signal.SIGINT, signal.SIGTERM)
+        try:
+            await self.start(socket_path, host, port)
+            serving = asyncio.ensure_future(self.server.serve_forever())
+            for signum in signals:
+                loop.add_signal_handler(signum, serving.cancel)
+            await serving
+        except asyncio.CancelledError:
+            pass
+        finally:
+            for signum in signals:
+                loop.remove_signal_handler(signum)
+            self.close()
+
+    def close(self):
+        """ This method stop the server and the process pool. """
+
+        if self.server is not None:
+            self.server.close()
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+        # Only the socket created by this service is removed
+        if self.socket_path is not None:
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            self.socket_path = None
+
+    async def handle(self, reader, writer):
+        """ This method answer the requests of a connection, one after the
+        other.
+
+        Parameters
+        ----------
+        reader : asyncio.StreamReader
+            stream of the requests
+        writer : asyncio.StreamWriter
+            stream of the responses
+        """
+
+        try:
+            while True:
+                try:
+                    data = await reader.readexactly(struct.calcsize(FRAME))
+                except asyncio.IncompleteReadError:
+                    return
+                len_header, = struct.unpack(FRAME, data)
+                if len_header > MAX_HEADER:
+                    return
+                header = json.loads(await reader.readexactly(len_header))
+                # Without the size of the payload, the next request can not
+                # be found: the connection is closed
+                size = header.get('size', 0) if isinstance(header, dict) \
+                    else None
+                if not isinstance(size, int) or isinstance(size, bool) or \
+                        size < 0:
+                    self.instruments.count('service.refused', 1)
+                    await self.send_error(writer, "the header of a request "
+                                          "must be a JSON object with a "
+                                          "size of 0 or more")
+                    return
+                await self.answer(header, reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError,
+                ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def answer(self, header: dict, reader, writer):
+        """ This method answer a request, whose header is read.
+
+        Parameters
+        ----------
+        header : dict
+            header of the request, whose size is an integer of 0 or more
+        reader : asyncio.StreamReader
+            stream of the request, at the beginning of its payload
+        writer : asyncio.StreamWriter
+            stream of the response
+        """
+
+        op = header.get('op')
+        params = header.get('params', {})
+        size = header.get('size', 0)
+        self.instruments.count('service.requests', 1)
+        try:
+            if op not in OPERATIONS:
+                raise ServiceError("unknown operation: {}".format(op))
+            if not isinstance(params, dict):
+                raise ServiceError("the parameters must be a JSON object")
+            memory = EXTRACT_MEMORY if op == 'extract' \
+                else size * MEMORY_FACTORS.get(op, 1)
+            await self.admission.acquire(memory)
+        except ServiceError as e:
+            # The payload is read, so that the next request can be read
+            self.instruments.count('service.refused', 1)
+            while size > 0:
+                size -= len(await reader.readexactly(min(size,
+                                                         RESPONSE_CHUNK)))
+            await self.send_error(writer, str(e))
+            return
+
+        try:
+            payload = await reader.readexactly(size)
+            if op == 'extract':
+                await self.stream_extract(params, writer)
+                return
+            try:
+                if size <= SMALL_REQUEST:
+                    result = await self.batcher.submit(op, params, payload)
+                else:
+                    result = await asyncio.get_running_loop(
+                    ).run_in_executor(self.executor, run_request, op,
+                                      params, payload)
+                del payload
+            except Exception as e:
+                await self.send_error(writer, "{}: {}".format(
+                    type(e).__name__, e) if not isinstance(e, ServiceError)
+                    else str(e))
+                return
+            writer.write(send_frame(b'{"status": "ok"}'))
+            await self.send_chunks(writer, result)
+            await self.end_chunks(writer)
+        finally:
+            await self.admission.release(memory)
+
+    async def stream_extract(self, params: dict, writer):
+        """ This method send a region of an archive, or reads of a file of
+        reads, part after part: each part is sent while the next one is
+        decoded.
+
+        Parameters
+        ----------
+        params : dict
+            'path' of the file, 'start' and 'end' of the region
+        writer : asyncio.StreamWriter
+            stream of the response
+        """
+
+        loop = asyncio.get_running_loop()
+        path = params.get('path')
+        try:
+            kind, length = await loop.run_in_executor(
+                self.executor, extract_length, path)
+        except Exception as e:
+            await self.send_error(writer, "{}: {}".format(
+                type(e).__name__, e) if not isinstance(e, ServiceError)
+                else str(e))
+            return
+        try:
+            start = max(int(params.get('start', 0)), 0)
+            end = length if params.get('end') is None \
+                else min(int(params['end']), length)
+        except (TypeError, ValueError):
+            await self.send_error(writer, "start and end must be integers")
+            return
+        part = EXTRACT_PART if kind == 'archive' else EXTRACT_READS
+
+        writer.write(send_frame(b'{"status": "ok"}'))
+        parts = [(first, min(first + part, end))
+                 for first in range(start, end, part)]
+        job = None
+        for i, (first, last) in enumerate(parts):
+            if job is None:
+                job = loop.run_in_executor(self.executor, extract_part,
+                                           path, kind, first, last)
+            try:
+                data = await job
+            except Exception as e:
+                writer.write(struct.pack(FRAME, ERROR_CHUNK) +
+                             send_frame(str(e).encode()))
+                await writer.drain()
+                return
+            job = loop.run_in_executor(self.executor, extract_part, path,
+                                       kind, *parts[i+1]) \
+                if i + 1 < len(parts) else None
+            await self.send_chunks(writer, data)
+        await self.end_chunks(writer)
+
+    @staticmethod
+    async def send_chunks(writer, data: bytes):
+        """ This method send a result in chunks, and waits when the client
+        does not read them, so the result is not copied in the buffers.
+
+        Parameters
+        ----------
+        writer : asyncio.StreamWriter
+            stream of the response
+        data : bytes
+            result
+        """
+
+        view = memoryview(data)
+        for start in range(0, len(view), RESPONSE_CHUNK):
+            chunk = view[start:start + RESPONSE_CHUNK]
+            writer.write(struct.pack(FRAME, len(chunk)))
+            writer.write(chunk)
+            await writer.drain()
+
+    @staticmethod
+    async def end_chunks(writer):
+        """ This method send the end of a result. """
+
+        writer.write(struct.pack(FRAME, 0))
+        await writer.drain()
+
+    @staticmethod
+    async def send_error(writer, message: str):
+        """ This method send the response of a request which fails. """
+
+        writer.write(send_frame(json.dumps({'status': 'error',
+                                            'message': message}).encode()))
+        await writer.drain()
+
+
+def create_parser():
+    """ This function create the parser of the command line.
+
+    Return
+    ------
+    parser : argparse.ArgumentParser
+        parser of the service options
+    """
+
+    parser = argparse.ArgumentParser(
+        prog="python service.py",
+        description="Local service of the BWT and of the Huffman "
+                    "compression, for the pipelines of the host.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET,
+                        help="Unix socket of the service (default {})"
+                             .format(DEFAULT_SOCKET))
+    parser.add_argument("--port", type=int, default=None,
+                        help="listen on this localhost TCP port instead of "
+                             "the Unix socket")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of processes")
+    parser.add_argument("--max-memory", type=int, default=1024,
+                        metavar="MB",
+                        help="memory of the requests run at the same time "
+                             "(default 1024)")
+    parser.add_argument("--max-waiting", type=int, default=64,
+                        help="number of requests which can wait, the next "
+                             "ones are refused")
+    parser.add_argument("--profile", action="append", default=[],
+                        metavar="SINK",
+                        help="count the requests and send the counts to "
+                             "SINK: 'log', 'json:PATH' or 'prometheus:PATH'")
+    return parser
+
+
+def main(argv=None):
+    """ This function run the service given in the command line.
+
+    Parameter
+    ---------
+    argv : list
+        arguments of the command line, sys.argv[1:] if None
+    """
+
+    args = create_parser().parse_args(argv)
+    try:
+        instruments = create_instruments(args.profile)
+    except ValueError as error:
+        sys.exit("service: {}".format(error))
+    if 'log' in args.profile:
+        import logging
+
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+    service = CompressionService(workers=args.workers,
+                                 max_memory=args.max_memory << 20,
+                                 max_waiting=args.max_waiting,
+                                 instruments=instruments)
+    try:
+        asyncio.run(service.serve(args.socket, port=args.port))
+    except ServiceError as error:
+        sys.exit("service: {}".format(error))
+    finally:
+        instruments.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+import json
+import socket
+import struct
+
+from service import DEFAULT_SOCKET, ERROR_CHUNK, FRAME, ServiceError, \
+    send_frame
+
+
+class ServiceClient:
+    """ Class of client of the local compression service (service.py). The
+    connection is kept between the requests, so a pipeline which sends many
+    small sequences does not connect each time. """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET,
+                 host: str = '127.0.0.1', port: int = None,
+                 timeout: float = None):
+        self.socket_path = socket_path
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.socket = None
+        self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def connect(self):
+        """ This method open the connection to the service, if it is not
+        opened. """
+
+        if self.socket is not None:
+            return
+        if self.port is None:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            address = self.socket_path
+        else:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            address = (self.host, self.port)
+        self.socket.settimeout(self.timeout)
+        try:
+            self.socket.connect(address)
+        except OSError:
+            self.close()
+            raise
+        self.file = self.socket.makefile('rb')
+
+    def close(self):
+        """ This method close the connection. """
+
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+
+    def read_exactly(self, size: int):
+        """ This method read size bytes of the connection. """
+
+        data = self.file.read(size)
+        if len(data) != size:
+            self.close()
+            raise ConnectionError("the service closed the connection")
+        return data
+
+    def read_frame(self):
+        """ This method read a frame: len of the data, then the data. """
+
+        size, = struct.unpack(FRAME, self.read_exactly(
+            struct.calcsize(FRAME)))
+        return self.read_exactly(size)
+
+    def stream(self, op: str, payload: bytes = b'', **params):
+        """ This method send a request and give its result in chunks, as
+        they come. The chunks must all be read before the next request,
+        else the connection is closed.
+
+        Parameters
+        ----------
+        op : str
+            'transform', 'compress', 'decompress' or 'extract'
+        payload : bytes
+            data of the request
+        params : dict
+            parameters of the operation
+
+        Return
+        ------
+        chunks : generator
+            bytes of the result
+
+        Exception
+        ---------
+        ServiceError
+            if the service refuses the request or the request fails
+        """
+
+        self.connect()
+        header = json.dumps({'op': op, 'params': params,
+                             'size': len(payload)}).encode()
+        self.socket.sendall(send_frame(header))
+        self.socket.sendall(payload)
+
+        response = json.loads(self.read_frame())
+        if response['status'] != 'ok':
+            raise ServiceError(response.get('message', 'request failed'))
+        finished = False
+        try:
+            while True:
+                size, = struct.unpack(FRAME, self.read_exactly(
+                    struct.calcsize(FRAME)))
+                if size == ERROR_CHUNK:
+                    finished = True
+                    raise ServiceError(self.read_frame().decode())
+                if size == 0:
+                    finished = True
+                    return
+                yield self.read_exactly(size)
+        finally:
+            # A result not read to the end leaves the connection in the
+            # middle of a response
+            if not finished:
+                self.close()
+
+    def request(self, op: str, payload: bytes = b'', **params):
+        """ This method send a request and give its whole result.
+
+        Parameters
+        ----------
+        op : str
+            'transform', 'compress', 'decompress' or 'extract'
+        payload : bytes
+            data of the request
+        params : dict
+            parameters of the operation
+
+        Return
+        ------
+        result : bytes
+            result of the request
+        """
+
+        return b"".join(self.stream(op, payload, **params))
+
+    def transform(self, sequence: str, inverse: bool = False):
+        """ This method give the BWT sequence of a sequence, or the sequence
+        of a BWT sequence if inverse is True. """
+
+        return self.request('transform', sequence.encode('latin-1'),
+                            inverse=inverse).decode('latin-1')
+
+    def compress(self, sequence: str, coder: str = 'huffman',
+                 mtf_rle: bool = False):
+        """ This method give the compression file of a sequence, with an
+        entropy coder of entropy_coders. """
+
+        return self.request('compress', sequence.encode('latin-1'),
+                            coder=coder, mtf_rle=mtf_rle)
+
+    def decompress(self, data: bytes):
+        """ This method give the sequence of a compression file. """
+
+        return self.request('decompress', bytes(data)).decode('latin-1')
+
+    def extract(self, path: str, start: int = 0, end: int = None):
+        """ This method give a region of an archive, or the reads of a file
+        of reads (one by line), as parts of text. The path is a path on the
+        host of the service.
+
+        Return
+        ------
+        parts : generator
+            text of the region, part after part
+        """
+
+        for chunk in self.stream('extract', path=path, start=start, end=end):
+            yield chunk.decode('latin-1')
@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+import abc
+from bisect import bisect_right
+from collections.abc import Sequence
+
+
+# Number of characters of the rows of a long text
+ROW_WIDTH = 60
+
+
+class LazyRows(Sequence):
+    """ Class of a list of rows which are computed only when they are
+    displayed. A slice gives the list of the rows of a window. Sequence is
+    an abstract class, so a subclass without row can not be created. """
+
+    def __len__(self):
+        return 0
+
+    @abc.abstractmethod
+    def row(self, i: int):
+        """ This method compute the row i.
+
+        Parameter
+        ---------
+        i : int
+            index of the row, between 0 and len(self)-1
+
+        Return
+        ------
+        row : str
+            row of the list
+        """
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.row(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("row index out of range")
+        return self.row(i)
+
+
+class TextRows(LazyRows):
+    """ Rows of a long text, cut every width characters. """
+
+    def __init__(self, text: str, width: int = ROW_WIDTH):
+        self.text = text
+        self.width = width
+
+    def __len__(self):
+        return max((len(self.text) + self.width - 1) // self.width, 1)
+
+    def row(self, i: int):
+        return self.text[i * self.width:(i + 1) * self.width]
+
+
+class WindowRows(LazyRows):
+    """ Rows between start and end of another list of rows, like a slice
+    which computes nothing. """
+
+    def __init__(self, rows, start: int, end: int):
+        self.rows = rows
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        return max(self.end - self.start, 0)
+
+    def row(self, i: int):
+        return self.rows[self.start + i]
+
+
+class JoinedRows(LazyRows):
+    """ Rows of several lists of rows, one list after the other. """
+
+    def __init__(self, parts):
+        self.parts = list(parts)
+        # Index of the first row of each list
+        self.starts = []
+        start = 0
+        for part in self.parts:
+            self.starts.append(start)
+            start += len(part)
+        self.length = start
+
+    def __len__(self):
+        return self.length
+
+    def row(self, i: int):
+        # The empty lists have the start of the next list, so the last list
+        # which begins before i is not empty
+        k = bisect_right(self.starts, i) - 1
+        return self.parts[k][i - self.starts[k]]
+
+
+class LazySteps(LazyRows):
+    """ Class of a list of matrix rows which are computed only when they are
+    asked, from the sequence and its sorted rotations. """
+
+    def __init__(self, seq: str, sa: list):
+        self.seq = seq
+        self.sa = sa
+
+    def window(self, start: int, end: int):
+        """ This method give the rows between start and end, computed only
+        when they are asked.
+
+        Parameters
+        ----------
+        start : int
+            index of the first row
+        end : int
+            index after the last row
+
+        Return
+        ------
+        rows : WindowRows
+            rows between start and end
+        """
+
+        return WindowRows(self, start, end)
+
+
+class ShiftSteps(LazySteps):
+    """ Rotations of the transformation page, in the order where they are
+    built: the step i shifts the sequence by i+1 characters to the right. """
+
+    def __len__(self):
+        return max(len(self.seq) - 1, 0)
+
+    def row(self, i: int):
+        cut = len(self.seq) - 1 - i
+        return self.seq[cut:] + self.seq[0:cut]
+
+
+class SortedRotations(LazySteps):
+    """ Rows of the sorted rotation matrix. """
+
+    def __len__(self):
+        return len(self.sa)
+
+    def row(self, i: int):
+        start = self.sa[i]
+        return self.seq[start:] + self.seq[0:start]
+
+
+class ReconstructionSteps(LazySteps):
+    """ Rows of all the matrices of the reconstruction, one matrix after the
+    other: the matrix k contains the sorted prefixes of length k+1 of the
+    rotations. """
+
+    def __len__(self):
+        return len(self.sa) * len(self.sa)
+
+    def row(self, i: int):
+        n = len(self.sa)
+        length = i // n + 1
+        start = self.sa[i % n]
+        end = start + length
+        return self.seq[start:end] + self.seq[0:max(end - n, 0)]
+
+
+class NullTrace:
+    """ Default trace of the Burrows-Weeler transformation, which keeps
+    nothing. """
+
+    enabled = False
+
+    def __init__(self):
+        self.list_step_trans_seq = ()
+        self.list_el_matrix_final_trans = ()
+        self.list_step_recons_seq = ()
+
+    def transformation(self, seq: str, sa: list):
+        """ This method is called at the end of a transformation.
+
+        Parameters
+        ----------
+        seq : str
+            DNA sequence with '$' at the end
+        sa : list
+            sorted start positions of the rotations of seq
+        """
+
+    def reconstruction(self, seq: str, sa: list):
+        """ This method is called at the end of a reconstruction.
+
+        Parameters
+        ----------
+        seq : str
+            DNA sequence with '$' at the end
+        sa : list
+            sorted start positions of the rotations of seq
+        """
+
+
+class StepTrace(NullTrace):
+    """ Trace of the Burrows-Weeler transformation for the display step by
+    step. Only the sequence and its suffix array are kept, each step is
+    computed when it is displayed. """
+
+    enabled = True
+
+    def transformation(self, seq: str, sa: list):
+        self.list_step_trans_seq = ShiftSteps(seq, sa)
+        self.list_el_matrix_final_trans = SortedRotations(seq, sa)
+
+    def reconstruction(self, seq: str, sa: list):
+        self.list_step_recons_seq = ReconstructionSteps(seq, sa)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+def cyclic_suffix_array(seq: str):
+    """ Build the sorted order of all the rotations of a sequence by prefix
+    doubling, without building the rotations themselves.
+
+    After the round k, the ranks sort the rotations on their 2^k first
+    characters, so at most log2(n) rounds are needed.
+
+    Parameter
+    ---------
+    seq : str
+        sequence whose rotations we want to sort
+
+    Return
+    ------
+    sa : list
+        list of the start positions of the rotations, in the order of the
+        sorted rotation matrix
+    """
+
+    n = len(seq)
+    if n == 0:
+        return []
+
+    # Initial ranks according to the first character of each rotation
+    alphabet = sorted(set(seq))
+    rank_of_char = {char: rank for rank, char in enumerate(alphabet)}
+    rank = [rank_of_char[char] for char in seq]
+    nb_ranks = len(alphabet)
+
+    sa = list(range(n))
+    sa.sort(key=rank.__getitem__)
+
+    k = 1
+    while nb_ranks < n and k < n:
+        # Sorting key of the rotation i on its 2k first characters
+        keys = [rank[i] * nb_ranks + rank[(i + k) % n] for i in range(n)]
+        sa.sort(key=keys.__getitem__)
+
+        # New ranks: same rank only if the 2k first characters are equal
+        new_rank = [0] * n
+        nb_ranks = 1
+        previous_key = keys[sa[0]]
+        for i in sa:
+            if keys[i] != previous_key:
+                nb_ranks += 1
+                previous_key = keys[i]
+            new_rank[i] = nb_ranks - 1
+        rank = new_rank
+        k *= 2
+
+    return sa
+
+
+def bwt_from_suffix_array(seq: str, sa: list):
+    """ Give the last column of the sorted rotation matrix.
+
+    Parameters
+    ----------
+    seq : str
+        sequence which was sorted
+    sa : list
+        sorted start positions of the rotations of seq
+
+    Return
+    ------
+    bwt : str
+        last character of each sorted rotation
+    """
+
+    # The last character of the rotation starting at i is seq[i-1]
+    return "".join([seq[i - 1] for i in sa])
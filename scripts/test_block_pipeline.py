@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+# Round trip tests of the block compression: run them with pytest from the
+# scripts directory.
+
+import io
+import random
+import struct
+
+import pytest
+
+from block_pipeline import BLOCK_HEADER, BLOCK_MAGIC, FLAG_MTF_RLE, \
+    BlockPipeline, compress_block, decompress_block
+from entropy_coders import compress, decompress
+
+
+HEADER_SIZE = struct.calcsize(BLOCK_HEADER)
+
+
+def random_sequence(length: int, alphabet: str = 'ACGTN', seed: int = 1):
+    """ This function give a random sequence, the same at each call. """
+
+    rand = random.Random(seed)
+    return "".join(rand.choice(alphabet) for i in range(0, length, 1))
+
+
+def compress_blocks(sequence: str, block_size: int, **options):
+    """ This function give the block compression file of a sequence. """
+
+    pipeline = BlockPipeline(block_size=block_size, workers=1, **options)
+    f = io.BytesIO()
+    pipeline.write_blocks([sequence[start:start + block_size] for start
+                           in range(0, len(sequence), block_size)], f)
+    return f.getvalue()
+
+
+def decompress_blocks(data: bytes):
+    """ This function give the sequence of a block compression file. """
+
+    f = io.StringIO()
+    BlockPipeline(workers=1).read_write_blocks(io.BytesIO(data), f)
+    return f.getvalue()
+
+
+def replace_header(data: bytes, **fields):
+    """ This function give a block whose header fields are replaced. """
+
+    names = ('flags', 'len_block', 'primary', 'len_huffman')
+    header = dict(zip(names, struct.unpack_from(BLOCK_HEADER, data)))
+    header.update(fields)
+    return struct.pack(BLOCK_HEADER, *[header[name] for name in names]) + \
+        data[HEADER_SIZE:]
+
+
+@pytest.mark.parametrize('coder', ['huffman', 'ans', 'multi', 'best'])
+@pytest.mark.parametrize('mtf_rle', [False, True])
+def test_round_trip(coder, mtf_rle):
+    sequence = random_sequence(2500) + 'A' * 700
+    data = compress_blocks(sequence, 1000, coder=coder, mtf_rle=mtf_rle)
+    assert data.startswith(BLOCK_MAGIC)
+    assert decompress_blocks(data) == sequence
+
+
+def test_empty_sequence():
+    assert decompress_blocks(compress_blocks('', 1000)) == ''
+
+
+@pytest.mark.parametrize('fields', [
+    {'len_block': 999}, {'len_block': 1001}, {'primary': 1001},
+    {'flags': FLAG_MTF_RLE}, {'flags': 2}, {'len_huffman': 0}])
+def test_corrupted_block(fields):
+    data = compress_block(random_sequence(1000))
+    assert decompress_block(data) == random_sequence(1000)
+    with pytest.raises(ValueError):
+        decompress_block(replace_header(data, **fields))
+
+
+def test_corrupted_coding():
+    """ A decoded BWT sequence which is shorter than the block, or which is
+    not a BWT sequence, is found even if its coding is valid. """
+
+    data = compress_block(random_sequence(1000))
+    bwt = decompress(data[HEADER_SIZE:], path=None).initial_seq
+    other = 'A' if bwt[-1] != 'A' else 'C'
+    for damaged in (bwt[0:-1], bwt[0:-1] + other):
+        compression = compress(damaged, path=None)
+        coding = compression.header() + compression.compressed_seq
+        block = replace_header(data[0:HEADER_SIZE] + coding,
+                               len_huffman=len(coding))
+        with pytest.raises(ValueError):
+            decompress_block(block)
+
+
+def test_truncated_file():
+    """ A file cut between two blocks is a file of fewer blocks, a file cut
+    elsewhere is an error. """
+
+    sequence = random_sequence(3000)
+    data = compress_blocks(sequence, 1000)
+    ends = [len(BLOCK_MAGIC) + 4]
+    while ends[-1] < len(data):
+        ends.append(ends[-1] + HEADER_SIZE + struct.unpack_from(
+            BLOCK_HEADER, data, ends[-1])[3])
+    for end in range(0, len(data), 1):
+        # The blocks are decompressed here, without a process pool
+        blocks = BlockPipeline.iter_blocks(io.BytesIO(data[0:end]))
+        if end in ends:
+            assert "".join(map(decompress_block, blocks)) == \
+                sequence[0:1000 * ends.index(end)]
+        else:
+            with pytest.raises(ValueError):
+                "".join(map(decompress_block, blocks))
+
+
+def test_block_size():
+    data = compress_blocks(random_sequence(3000), 1000)
+    for block_size in (0, 999):
+        damaged = BLOCK_MAGIC + struct.pack('<I', block_size) + data[8:]
+        with pytest.raises(ValueError):
+            decompress_blocks(damaged)
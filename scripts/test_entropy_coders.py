@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+# Round trip tests of the entropy coders: run them with pytest from the
+# scripts directory.
+
+import random
+import struct
+
+import pytest
+
+import ans_coder
+import compression_huffman
+import entropy_coders
+import multi_huffman
+import vectorized
+from read_batch import ReadBatchCompression, ReadBatchReader
+
+
+CODERS = list(entropy_coders.ENTROPY_CODERS)
+
+
+def random_sequence(length: int, alphabet: str = 'ACGTN', seed: int = 1):
+    """ This function give a random sequence, the same at each call. """
+
+    rand = random.Random(seed)
+    return "".join(rand.choice(alphabet) for i in range(0, length, 1))
+
+
+def round_trip(sequence: str, coder: str, mtf_rle: bool = False):
+    """ This function compress then decompress a sequence.
+
+    Return
+    ------
+    data : bytes
+        compression file
+    sequence : str
+        decompressed sequence
+    """
+
+    compression = entropy_coders.compress(sequence, coder, mtf_rle=mtf_rle,
+                                          path=None)
+    data = compression.header() + bytes(compression.compressed_seq)
+    return data, entropy_coders.decompress(data, path=None).initial_seq
+
+
+@pytest.fixture(params=['python', 'numpy'])
+def numpy_path(request, monkeypatch):
+    """ This fixture run a test with the pure Python paths, then with the
+    NumPy paths, whatever the length of the sequence. """
+
+    if request.param == 'python':
+        monkeypatch.setattr(vectorized, 'NUMPY_MIN_LENGTH', float('inf'))
+        monkeypatch.setattr(ans_coder, 'get_numpy', lambda: None)
+        monkeypatch.setattr(multi_huffman, 'get_numpy', lambda: None)
+    else:
+        pytest.importorskip('numpy')
+        monkeypatch.setattr(vectorized, 'NUMPY_MIN_LENGTH', 0)
+    return request.param
+
+
+@pytest.fixture
+def rans(monkeypatch):
+    """ This fixture code all the sequences with rANS, not with Huffman,
+    when the 'ans' coder is asked, even without NumPy. """
+
+    monkeypatch.setattr(ans_coder, 'use_ans', lambda len_seq: True)
+
+
+@pytest.mark.parametrize('coder', CODERS)
+@pytest.mark.parametrize('mtf_rle', [False, True])
+@pytest.mark.parametrize('sequence', [
+    '', 'A', 'AAAAAAAA', random_sequence(49), random_sequence(50),
+    random_sequence(51), 'A' * 50 + 'C' * 50 + 'GT' * 25 + 'N',
+    random_sequence(3000)])
+def test_round_trip(numpy_path, coder, mtf_rle, sequence):
+    data, decoded = round_trip(sequence, coder, mtf_rle)
+    assert decoded == sequence
+
+
+@pytest.mark.parametrize('length', [0, 1, 49, 50, 51, 1000])
+def test_rans_round_trip(numpy_path, rans, length):
+    sequence = random_sequence(length, 'ACGT')
+    data, decoded = round_trip(sequence, 'ans')
+    assert data.startswith(ans_coder.ANS_MAGIC)
+    assert decoded == sequence
+
+
+def test_rans_lanes_numpy_and_python(monkeypatch):
+    """ The NumPy path of rANS only codes 32 lanes or more, and gives the
+    same bytes as the pure Python path. """
+
+    pytest.importorskip('numpy')
+    length = ans_coder.NUMPY_MIN_LANES * ans_coder.LANE_SYMBOLS + 7
+    indexes = bytes(random_sequence(length, '\x00\x01\x02\x03'), 'latin-1')
+    table = ans_coder.ANSTable(ans_coder.normalize_frequencies(
+        {0: 5, 1: 3, 2: 2, 3: 1}))
+    numpy_data = ans_coder.rans_encode(indexes, table)
+    assert bytes(ans_coder.rans_decode(numpy_data, length, table)) == indexes
+
+    monkeypatch.setattr(ans_coder, 'get_numpy', lambda: None)
+    python_data = ans_coder.rans_encode(indexes, table)
+    assert python_data == numpy_data
+    assert bytes(ans_coder.rans_decode(python_data, length, table)) == indexes
+
+
+def test_multi_groups():
+    """ Each group of GROUP_SIZE symbols takes its best table, and the runs
+    of groups with the same table end in the middle of a lookup entry. """
+
+    group = multi_huffman.GROUP_SIZE
+    sequence = "".join(random_sequence(group * 3, alphabet, seed)
+                       for seed, alphabet in enumerate(
+                           ['AT', 'GC', 'N', 'ACGT', 'AT', 'TTTG'] * 4))
+    for length in (group - 1, group, group + 1, len(sequence) - 1,
+                   len(sequence)):
+        data, decoded = round_trip(sequence[0:length], 'multi')
+        assert decoded == sequence[0:length]
+
+
+@pytest.mark.parametrize('coder', CODERS)
+@pytest.mark.parametrize('length, step', [(3000, 1), (40000, 97)])
+def test_truncated_stream(rans, coder, length, step):
+    sequence = random_sequence(length)
+    data, decoded = round_trip(sequence, coder)
+    for end in list(range(0, 64, 1)) + list(range(64, len(data), step)):
+        with pytest.raises(ValueError):
+            entropy_coders.decompress(data[0:end], path=None)
+
+
+@pytest.mark.parametrize('coder', CODERS)
+@pytest.mark.parametrize('mtf_rle', [False, True])
+def test_damaged_header(rans, coder, mtf_rle):
+    """ A damaged header gives ValueError, or a wrong sequence when the
+    header stays valid (a character replaced by another), never another
+    exception. """
+
+    sequence = random_sequence(500)
+    compression = entropy_coders.compress(sequence, coder, mtf_rle=mtf_rle,
+                                          path=None)
+    header = compression.header()
+    data = header + bytes(compression.compressed_seq)
+    for position in range(0, len(header), 1):
+        for bit in range(0, 8, 1):
+            damaged = bytearray(data)
+            damaged[position] ^= 1 << bit
+            try:
+                entropy_coders.decompress(damaged, path=None)
+            except ValueError:
+                pass
+
+
+@pytest.mark.parametrize('lengths', [
+    {'A': 0, 'C': 1}, {'A': 1, 'C': 2}, {'A': 1, 'C': 1, 'G': 1},
+    {'A': 2}, {'A': 1, 'C': 2, 'G': 9, 'T': 9}])
+def test_invalid_code_lengths(lengths):
+    data = compression_huffman.HUFFMAN_MAGIC + struct.pack(
+        '<QBH', 10, 0, len(lengths))
+    for char, length in lengths.items():
+        data += bytes([1]) + char.encode() + bytes([length])
+    with pytest.raises(ValueError):
+        entropy_coders.decompress(data + bytes(4), path=None)
+
+
+@pytest.mark.parametrize('length', [1000, 40000])
+def test_damaged_rans_length(numpy_path, rans, length):
+    """ The rANS decoder ends at the initial state of the encoder after all
+    the words, so a wrong length in the header is found. """
+
+    sequence = random_sequence(length, 'ACGT')
+    data, decoded = round_trip(sequence, 'ans')
+    start = len(ans_coder.ANS_MAGIC)
+    for other in (length - 1, length + 1, length + ans_coder.LANE_SYMBOLS):
+        damaged = data[0:start] + struct.pack('<Q', other) + data[start+8:]
+        with pytest.raises(ValueError):
+            entropy_coders.decompress(damaged, path=None)
+
+
+@pytest.mark.parametrize('length', [1000, 40000])
+def test_damaged_rans_stream(numpy_path, rans, length):
+    """ A damaged state or word gives ValueError, or in a few cases where
+    the states of the decoder meet again, a wrong sequence. """
+
+    sequence = random_sequence(length, 'ACGT')
+    compression = entropy_coders.compress(sequence, 'ans', path=None)
+    header_size = len(compression.header())
+    data = compression.header() + bytes(compression.compressed_seq)
+    rand = random.Random(length)
+    positions = range(header_size, len(data),
+                      max((len(data) - header_size) // 100, 1))
+    found = 0
+    for position in positions:
+        damaged = bytearray(data)
+        damaged[position] ^= 1 << rand.randrange(0, 8)
+        try:
+            entropy_coders.decompress(damaged, path=None)
+        except ValueError:
+            found += 1
+    assert found >= 0.9 * len(positions)
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        entropy_coders.decompress(b'not a compression file', path=None)
+
+
+@pytest.mark.parametrize('reads', [
+    [], [''], ['A'], ['ACGT', '', 'NNNN', 'A' * 300],
+    [random_sequence(150, seed=seed) for seed in range(0, 200, 1)]])
+def test_read_batch_round_trip(tmp_path, reads):
+    path = str(tmp_path / 'reads.hufr')
+    ReadBatchCompression(lambda: iter(reads)).save_compression(path)
+    with ReadBatchReader(path) as reader:
+        assert len(reader) == len(reads)
+        assert list(reader) == reads
+        if reads:
+            assert reader[-1] == reads[-1]
+            assert reader.reads(1, 3) == reads[1:3]
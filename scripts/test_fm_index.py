@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+# Tests of the FM-index against a search with str.find: run them with
+# pytest from the scripts directory.
+
+import random
+
+import pytest
+
+from fm_index import FMIndex
+from suffix_array import bwt_from_suffix_array, cyclic_suffix_array
+
+
+def fm_index(sequence: str, **options):
+    """ This function give the FM-index of a sequence. """
+
+    seq = sequence + '$'
+    return FMIndex(bwt_from_suffix_array(seq, cyclic_suffix_array(seq)),
+                   **options)
+
+
+def find_all(sequence: str, pattern: str):
+    """ This function give the start positions of the pattern in the
+    sequence, overlapping ones included, with str.find. """
+
+    positions = []
+    position = sequence.find(pattern)
+    while position != -1:
+        positions.append(position)
+        position = sequence.find(pattern, position + 1)
+    return positions
+
+
+@pytest.mark.parametrize('seed', range(0, 20, 1))
+def test_random_patterns(seed):
+    rand = random.Random(seed)
+    alphabet = rand.choice(['A', 'AC', 'ACGT', 'ACGTN'])
+    sequence = "".join(rand.choice(alphabet)
+                       for i in range(0, rand.randrange(1, 400), 1))
+    index = fm_index(sequence, occ_step=rand.choice([1, 4, 64]),
+                     sa_step=rand.choice([1, 3, 32]))
+    patterns = [sequence[start:start + rand.randrange(1, 8)]
+                for start in rand.sample(range(0, len(sequence), 1),
+                                         min(len(sequence), 20))]
+    patterns += ["".join(rand.choice('ACGTN')
+                         for i in range(0, rand.randrange(1, 6), 1))
+                 for j in range(0, 20, 1)]
+    for pattern in patterns:
+        positions = find_all(sequence, pattern)
+        assert index.count(pattern) == len(positions)
+        assert index.locate(pattern) == positions
+    assert index.count_many(patterns) == {
+        pattern: len(find_all(sequence, pattern)) for pattern in patterns}
+
+
+def test_empty_pattern():
+    """ Like str.count, the empty pattern is found at each position and at
+    the end of the sequence. """
+
+    index = fm_index('ACGTA')
+    assert index.count('') == 'ACGTA'.count('') == 6
+    assert index.locate('') == find_all('ACGTA', '') == list(range(0, 6))
+
+
+@pytest.mark.parametrize('pattern', ['$', 'A$', '$A', 'TA$'])
+def test_end_character(pattern):
+    index = fm_index('ACGTA')
+    assert index.count(pattern) == 0
+    assert index.locate(pattern) == []
+
+
+def test_lowercase_pattern():
+    index = fm_index('ACGTACGT')
+    assert index.locate('cgt') == [1, 5]
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+# Round trip tests of the compression service over a Unix socket: run them
+# with pytest from the scripts directory.
+
+import asyncio
+import json
+import random
+import socket
+import struct
+import threading
+
+import pytest
+
+from archive import HuffmanArchive
+from entropy_coders import ENTROPY_CODERS
+from read_batch import ReadBatchCompression
+from service import EXTRACT_MEMORY, FRAME, CompressionService, \
+    ServiceError, send_frame
+from service_client import ServiceClient
+
+
+MAX_MEMORY = 2 * EXTRACT_MEMORY
+
+
+def random_sequence(length: int, alphabet: str = 'ACGTN', seed: int = 1):
+    """ This function give a random sequence, the same at each call. """
+
+    rand = random.Random(seed)
+    return "".join(rand.choice(alphabet) for i in range(0, length, 1))
+
+
+@pytest.fixture(scope='module')
+def socket_path(tmp_path_factory):
+    """ This fixture run the service in the event loop of a thread, with one
+    process, while the blocking client of the tests sends the requests. """
+
+    path = str(tmp_path_factory.mktemp('service') / 'service.sock')
+    service = CompressionService(workers=1, max_memory=MAX_MEMORY)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    try:
+        asyncio.run_coroutine_threadsafe(service.start(path), loop).result()
+        yield path
+    finally:
+        asyncio.run_coroutine_threadsafe(stop(service), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+async def stop(service: CompressionService):
+    """ This function stop the service, then the connections which are
+    still opened. """
+
+    service.close()
+    tasks = [task for task in asyncio.all_tasks()
+             if task is not asyncio.current_task()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def send_header(socket_path: str, header):
+    """ This function send a request header as is, without its payload, and
+    give the response of the service. """
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(send_frame(json.dumps(header).encode()))
+        f = client.makefile('rb')
+        size, = struct.unpack(FRAME, f.read(struct.calcsize(FRAME)))
+        response = json.loads(f.read(size))
+        # The connection is closed after a header without a valid size
+        return response, f.read()
+
+
+@pytest.mark.parametrize('sequence', ['', 'A', random_sequence(3000)])
+def test_transform(socket_path, sequence):
+    with ServiceClient(socket_path) as client:
+        bwt = client.transform(sequence)
+        assert client.transform(bwt, inverse=True) == sequence
+
+
+@pytest.mark.parametrize('coder', list(ENTROPY_CODERS))
+@pytest.mark.parametrize('mtf_rle', [False, True])
+def test_compress_decompress(socket_path, coder, mtf_rle):
+    sequence = random_sequence(3000) + 'A' * 500
+    with ServiceClient(socket_path) as client:
+        # The same connection is kept between the requests
+        for length in (0, 1, len(sequence)):
+            data = client.compress(sequence[0:length], coder, mtf_rle)
+            assert client.decompress(data) == sequence[0:length]
+
+
+def test_request_too_large(socket_path):
+    with ServiceClient(socket_path) as client:
+        with pytest.raises(ServiceError, match="too large"):
+            client.transform(random_sequence(MAX_MEMORY // 48 + 1))
+        # The refused payload is read, the connection is still usable
+        assert client.decompress(client.compress('ACGT')) == 'ACGT'
+
+
+def test_failed_request(socket_path):
+    with ServiceClient(socket_path) as client:
+        with pytest.raises(ServiceError):
+            client.decompress(b'not a compression file')
+        with pytest.raises(ServiceError):
+            client.request('unknown')
+        assert client.transform('ACGT', inverse=False)
+
+
+def test_extract_archive(socket_path, tmp_path):
+    sequence = random_sequence(5000)
+    path = str(tmp_path / 'sequence.hufa')
+    compression = HuffmanArchive(lambda: iter([sequence]), block_size=1000)
+    with open(path, 'wb') as f:
+        compression.write_compression(f)
+    with ServiceClient(socket_path) as client:
+        assert "".join(client.extract(path)) == sequence
+        assert "".join(client.extract(path, 999, 2001)) == \
+            sequence[999:2001]
+        assert "".join(client.extract(path, 4000, 9000)) == sequence[4000:]
+
+
+def test_extract_reads(socket_path, tmp_path):
+    reads = [random_sequence(150, seed=seed) for seed in range(0, 50, 1)]
+    path = str(tmp_path / 'reads.hufr')
+    ReadBatchCompression(lambda: iter(reads)).save_compression(path)
+    with ServiceClient(socket_path) as client:
+        assert "".join(client.extract(path, 10, 20)).split() == reads[10:20]
+        with pytest.raises(ServiceError):
+            list(client.extract(str(tmp_path / 'missing.hufr')))
+        with pytest.raises(ServiceError):
+            list(client.extract(path, start='first'))
+
+
+@pytest.mark.parametrize('header', [
+    [], 'transform', {'op': 'transform', 'size': -1},
+    {'op': 'transform', 'size': '10'}, {'op': 'transform', 'size': True}])
+def test_invalid_header(socket_path, header):
+    response, rest = send_header(socket_path, header)
+    assert response['status'] == 'error'
+    assert rest == b''
+
+
+@pytest.mark.parametrize('header', [
+    {'op': ['transform'], 'size': 0},
+    {'op': 'transform', 'params': [], 'size': 0}])
+def test_invalid_request(socket_path, header):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(send_frame(json.dumps(header).encode()))
+        f = client.makefile('rb')
+        size, = struct.unpack(FRAME, f.read(struct.calcsize(FRAME)))
+        assert json.loads(f.read(size))['status'] == 'error'
+    with ServiceClient(socket_path) as client:
+        assert client.transform('ACGT', inverse=False)
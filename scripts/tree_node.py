@@ -7,19 +7,195 @@ __license__ = "MIT"
 __copyright__ = "Copyright 2021, @MeganeBoujeant"
 
 
+from array import array
+import heapq
+
+
+class HuffmanTree:
+    """ Class of Huffman tree stored in parallel arrays. The node i has the
+    children left[i] and right[i] (-1 for a leaf), the symbol alphabet[
+    symbol[i]] (-1 for an internal node) and the weight weight[i]. A node is
+    always created after its children, so the root is the last node. """
+
+    __slots__ = ('left', 'right', 'symbol', 'weight', 'branch', 'alphabet')
+
+    def __init__(self):
+        self.left = array('l')
+        self.right = array('l')
+        self.symbol = array('l')
+        self.weight = array('q')
+        # 0 for a left child, 1 for a right child, -1 for the root
+        self.branch = array('b')
+        self.alphabet = []
+
+    def __len__(self):
+        return len(self.weight)
+
+    @classmethod
+    def build(cls, freq: dict):
+        """ This method create the Huffman tree of a frequency dictionary by
+        merging the 2 nodes of smaller weights until one node remains. The
+        nodes of same weight are taken in their order of creation.
+
+        Parameter
+        ---------
+        freq : dict
+            frequency dictionary of the symbols
+
+        Return
+        ------
+        tree : HuffmanTree
+            tree of the symbols
+        """
+
+        tree = cls()
+        heap = [(weight, tree.add_leaf(symbol, weight))
+                for symbol, weight in freq.items()]
+        heapq.heapify(heap)
+
+        while len(heap) > 1:
+            weight_left, left = heapq.heappop(heap)
+            weight_right, right = heapq.heappop(heap)
+            heapq.heappush(heap, (weight_left + weight_right,
+                                  tree.add_node(left, right)))
+        return tree
+
+    def add_leaf(self, symbol, weight: int):
+        """ This method add a leaf.
+
+        Parameters
+        ----------
+        symbol : str or int
+            symbol of the leaf
+        weight : int
+            frequency of the symbol
+
+        Return
+        ------
+        index : int
+            index of the new node
+        """
+
+        self.alphabet.append(symbol)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.symbol.append(len(self.alphabet) - 1)
+        self.weight.append(weight)
+        self.branch.append(-1)
+        return len(self.weight) - 1
+
+    def add_node(self, left: int, right: int):
+        """ This method add an internal node which merges 2 nodes.
+
+        Parameters
+        ----------
+        left : int
+            index of the left child
+        right : int
+            index of the right child
+
+        Return
+        ------
+        index : int
+            index of the new node
+        """
+
+        self.left.append(left)
+        self.right.append(right)
+        self.symbol.append(-1)
+        self.weight.append(self.weight[left] + self.weight[right])
+        self.branch.append(-1)
+        self.branch[left] = 0
+        self.branch[right] = 1
+        return len(self.weight) - 1
+
+    @property
+    def root(self):
+        """ Root node of the tree. """
+
+        return TreeNode(self, len(self.weight) - 1)
+
+    def code_lengths(self):
+        """ This method give the depth of each leaf, which is the length of the
+        code of its symbol. The nodes are visited from the root, each node
+        before its children.
+
+        Return
+        ------
+        code_lengths : dict
+            dictionary with key = symbol and value = length of its code
+        """
+
+        code_lengths = {}
+        depth = array('l', [0]) * len(self.weight)
+        for i in range(len(self.weight)-1, -1, -1):
+            if self.left[i] >= 0:
+                depth[self.left[i]] = depth[i] + 1
+                depth[self.right[i]] = depth[i] + 1
+            else:
+                # A tree with a single leaf still needs one bit by symbol
+                code_lengths[self.alphabet[self.symbol[i]]] = max(depth[i], 1)
+        return code_lengths
+
+
 class TreeNode:
-    """ Class to make a tree node. """
+    """ Class to make a tree node. It is a view on a node of a HuffmanTree. """
+
+    __slots__ = ('tree', 'index')
+
+    def __init__(self, tree: HuffmanTree, index: int):
+        self.tree = tree
+        self.index = index
+
+    @property
+    def char(self):
+        """ Symbol of the node, None for an internal node. """
+
+        symbol = self.tree.symbol[self.index]
+        return self.tree.alphabet[symbol] if symbol >= 0 else None
+
+    @property
+    def data(self):
+        """ Weight of the node. """
+
+        return self.tree.weight[self.index]
+
+    @property
+    def left_child(self):
+        """ Left child of the node, None for a leaf. """
+
+        left = self.tree.left[self.index]
+        return TreeNode(self.tree, left) if left >= 0 else None
+
+    @property
+    def right_child(self):
+        """ Right child of the node, None for a leaf. """
+
+        right = self.tree.right[self.index]
+        return TreeNode(self.tree, right) if right >= 0 else None
+
+    @property
+    def bin(self):
+        """ Binary character of the node: '0' for a left child, '1' for a
+        right child, '' for the root. """
 
-    def __init__(self, char, data):
-        self.char = char
-        self.data = data
-        self.left_child = None
-        self.right_child = None
-        self.bin = ''
+        branch = self.tree.branch[self.index]
+        return str(branch) if branch >= 0 else ''
 
     def __str__(self):
-        return '[' + str(self.bin) + ":" + str(self.char) + ';' + \
-               str(self.left_child) + "," + str(self.right_child) + "]"
+        # Iterative version of '[bin:char;left,right]'
+        pieces = []
+        nodes = [self]
+        while nodes:
+            node = nodes.pop()
+            if isinstance(node, str):
+                pieces.append(node)
+            elif node is None:
+                pieces.append('None')
+            else:
+                pieces.append('[' + node.bin + ":" + str(node.char) + ';')
+                nodes += [']', node.right_child, ',', node.left_child]
+        return "".join(pieces)
 
     def is_leaf(self):
         """ This method test if my node is a leaf or not.
@@ -29,7 +205,7 @@ class TreeNode:
         True or False : booleen
             return true if node is leaf, else return false
         """
-        return self.right_child is None and self.left_child is None
+        return self.tree.left[self.index] < 0
 
     def update_child(self, left, right):
         """ This method update child of a node.
@@ -41,5 +217,9 @@ class TreeNode:
         right : object
             node which is the right child of the self node
         """
-        self.left_child = left
-        self.right_child = right
+        if left.tree is not self.tree or right.tree is not self.tree:
+            raise ValueError("children must be nodes of the same tree")
+        self.tree.left[self.index] = left.index
+        self.tree.right[self.index] = right.index
+        self.tree.branch[left.index] = 0
+        self.tree.branch[right.index] = 1
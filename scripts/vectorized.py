@@ -0,0 +1,451 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = "Mégane Boujeant"
+__version__ = "1.0.0"
+__license__ = "MIT"
+__copyright__ = "Copyright 2021, @MeganeBoujeant"
+
+
+# Optional NumPy paths of the entropy coders. NumPy is imported the first
+# time a sequence is long enough to use it, so the short sequences (and the
+# start of the command line) do not pay its import, and everything falls back
+# to pure Python when it is not installed.
+
+# Minimal length of a sequence to use NumPy
+NUMPY_MIN_LENGTH = 1 << 16
+
+# Number of symbols encoded at once
+ENCODE_BLOCK = 1 << 18
+
+_numpy = None
+_numpy_checked = False
+
+
+def get_numpy():
+    """ This function import NumPy the first time it is called.
+
+    Return
+    ------
+    numpy : module
+        NumPy module, None if it is not installed
+    """
+
+    global _numpy, _numpy_checked
+    if not _numpy_checked:
+        _numpy_checked = True
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = None
+    return _numpy
+
+
+def use_numpy(sequence):
+    """ This function test if a sequence is worth the NumPy path.
+
+    Parameter
+    ---------
+    sequence : str, PackedSequence or list
+        sequence or list of symbols
+
+    Return
+    ------
+    numpy : module
+        NumPy module, None to use pure Python
+    """
+
+    if len(sequence) < NUMPY_MIN_LENGTH:
+        return None
+    return get_numpy()
+
+
+def byte_view(sequence):
+    """ This function give the characters of a sequence as an array of bytes.
+    The characters which do not fit in a byte become '?'.
+
+    Parameter
+    ---------
+    sequence : str, PackedSequence or list
+        sequence, or list of symbols lower than 256
+
+    Return
+    ------
+    view : numpy.ndarray
+        array of uint8
+    """
+
+    np = get_numpy()
+    if isinstance(sequence, str):
+        return np.frombuffer(sequence.encode('latin-1', 'replace'), np.uint8)
+    if isinstance(sequence, list):
+        return np.array(sequence, dtype=np.uint8)
+
+    # Packed sequence: 4 codes by byte, the first one in the high bits
+    data = np.frombuffer(sequence.data, np.uint8)
+    codes = (data[:, None] >> np.array([6, 4, 2, 0], np.uint8)) & 3
+    view = np.frombuffer(b"ACGT", np.uint8)[codes.ravel()[0:len(sequence)]]
+    for start, len_run, char in zip(sequence.exc_starts, sequence.exc_lengths,
+                                    sequence.exc_chars):
+        view[start:start + len_run] = ord(char) if ord(char) < 256 \
+            else ord('?')
+    return view
+
+
+def byte_counts(data):
+    """ This function count each byte value.
+
+    Parameter
+    ---------
+    data : bytes-like or numpy.ndarray
+        bytes counted
+
+    Return
+    ------
+    counts : list
+        number of occurrences of each of the 256 byte values
+    """
+
+    np = get_numpy()
+    if not isinstance(data, np.ndarray):
+        data = np.frombuffer(data, np.uint8)
+    return np.bincount(data, minlength=256).tolist()
+
+
+def encode_symbols(sequence, codes: dict, default, writer):
+    """ This function write the binary codes of a sequence by blocks: the
+    codes and lengths are given by lookup tables indexed by the bytes of the
+    sequence, then the bits of the block are packed at once.
+
+    Parameters
+    ----------
+    sequence : str, PackedSequence or list
+        sequence, or list of symbols lower than 256
+    codes : dict
+        dictionary with key = symbol and value = (code, length)
+    default : tuple
+        (code, length) of the symbols which are not in codes
+    writer : BitWriter
+        writer which packs the binary codes
+    """
+
+    np = get_numpy()
+    code_table = np.full(256, default[0], np.uint64)
+    length_table = np.full(256, default[1], np.int64)
+    for symbol, (code, length) in codes.items():
+        index = symbol if isinstance(symbol, int) else ord(symbol)
+        if index < 256:
+            code_table[index] = code
+            length_table[index] = length
+
+    view = byte_view(sequence)
+    for start in range(0, len(view), ENCODE_BLOCK):
+        block = view[start:start + ENCODE_BLOCK]
+        pack_codes(code_table[block], length_table[block], writer)
+
+
+def pack_codes(codes, lengths, writer):
+    """ This function write binary codes at once: the bits of the codes are
+    unpacked in a matrix, then the bits of each code are packed together.
+
+    Parameters
+    ----------
+    codes : numpy.ndarray
+        binary codes, as uint64
+    lengths : numpy.ndarray
+        number of bits of each code
+    writer : BitWriter
+        writer which packs the binary codes
+    """
+
+    np = get_numpy()
+    if len(lengths) == 0:
+        return
+    max_length = int(lengths.max())
+    # Position of each bit in a code of max_length bits, the first one at left
+    shifts = np.arange(max_length - 1, -1, -1, dtype=np.uint64)
+    columns = np.arange(max_length)
+    bits = ((codes[:, None] >> shifts) & 1).astype(np.uint8)
+    # Only the last length bits of each row are the code
+    bits = bits[columns >= max_length - lengths[:, None]]
+    nb_bits = len(bits)
+    if nb_bits:
+        packed = np.packbits(bits).tobytes()
+        writer.write(int.from_bytes(packed, 'big') >>
+                     (8 * len(packed) - nb_bits), nb_bits)
+
+
+def record_sums(values: bytes, lengths: list):
+    """ This function add the values of each record of a sequence of
+    records.
+
+    Parameters
+    ----------
+    values : bytes
+        values of all the records, one after the other
+    lengths : list
+        number of values of each record
+
+    Return
+    ------
+    sums : list
+        sum of the values of each record
+    """
+
+    np = get_numpy()
+    cumulated = np.zeros(len(values) + 1, np.int64)
+    np.cumsum(np.frombuffer(values, np.uint8), out=cumulated[1:])
+    lengths = np.asarray(lengths, np.int64)
+    ends = np.cumsum(lengths)
+    return (cumulated[ends] - cumulated[ends - lengths]).tolist()
+
+
+def group_counts(indexes: bytes, nb_symbols: int, group_size: int):
+    """ This function count the symbols of each group of a sequence.
+
+    Parameters
+    ----------
+    indexes : bytes
+        index of each symbol in the alphabet
+    nb_symbols : int
+        number of symbols of the alphabet
+    group_size : int
+        number of symbols by group
+
+    Return
+    ------
+    counts : numpy.ndarray
+        number of occurrences of each symbol in each group
+    """
+
+    np = get_numpy()
+    values = np.frombuffer(indexes, np.uint8).astype(np.int64)
+    groups = np.arange(len(values)) // group_size
+    nb_groups = -(-len(values) // group_size)
+    return np.bincount(groups * nb_symbols + values,
+                       minlength=nb_groups * nb_symbols).reshape(
+        nb_groups, nb_symbols)
+
+
+def farthest_groups(counts, nb: int):
+    """ This function cluster the groups by their composition: the first
+    seed is the group farthest from the mean composition, then each seed is
+    the group farthest from the previous seeds, and each group goes with its
+    nearest seed.
+
+    Parameters
+    ----------
+    counts : numpy.ndarray
+        number of occurrences of each symbol in each group
+    nb : int
+        number of clusters
+
+    Return
+    ------
+    selectors : list
+        cluster of each group
+    """
+
+    np = get_numpy()
+    proportions = counts / counts.sum(axis=1, keepdims=True)
+    distances = ((proportions - proportions.mean(axis=0)) ** 2).sum(axis=1)
+    nearest = np.zeros(len(counts), np.int64)
+    for seed in range(0, nb, 1):
+        group = int(np.argmax(distances))
+        seed_distances = ((proportions - proportions[group]) ** 2).sum(axis=1)
+        if seed == 0:
+            distances = seed_distances
+        else:
+            nearest[seed_distances < distances] = seed
+            distances = np.minimum(distances, seed_distances)
+    return nearest.tolist()
+
+
+def assign_groups(counts, costs: list):
+    """ This function choose for each group the table which codes it with
+    the fewest bits.
+
+    Parameters
+    ----------
+    counts : numpy.ndarray
+        number of occurrences of each symbol in each group
+    costs : list
+        number of bits of each symbol in each table
+
+    Return
+    ------
+    selectors : list
+        table of each group
+    """
+
+    np = get_numpy()
+    return np.argmin(counts @ np.array(costs, np.int64).T, axis=1).tolist()
+
+
+def encode_groups(indexes: bytes, selectors: list, codes: list,
+                  nb_symbols: int, group_size: int, writer):
+    """ This function write the binary codes of a sequence whose groups are
+    coded by different tables.
+
+    Parameters
+    ----------
+    indexes : bytes
+        index of each symbol in the alphabet
+    selectors : list
+        table of each group
+    codes : list
+        for each table, dictionary with key = index and value = (code,
+        length)
+    nb_symbols : int
+        number of symbols of the alphabet
+    group_size : int
+        number of symbols by group
+    writer : BitWriter
+        writer which packs the binary codes
+    """
+
+    np = get_numpy()
+    code_table = np.zeros(len(codes) * nb_symbols, np.uint64)
+    length_table = np.zeros(len(codes) * nb_symbols, np.int64)
+    for table, table_codes in enumerate(codes):
+        for index, (code, length) in table_codes.items():
+            code_table[table * nb_symbols + index] = code
+            length_table[table * nb_symbols + index] = length
+
+    values = np.frombuffer(indexes, np.uint8)
+    tables = np.repeat(np.asarray(selectors, np.int64) * nb_symbols,
+                       group_size)
+    for start in range(0, len(values), ENCODE_BLOCK):
+        block = values[start:start + ENCODE_BLOCK]
+        block = block + tables[start:start + len(block)]
+        pack_codes(code_table[block], length_table[block], writer)
+
+
+def rans_encode_lanes(indexes: bytes, freq: list, cum: list, lanes: int,
+                      scale_bits: int, state_low: int):
+    """ This function code a sequence of indexes with interleaved rANS
+    states, all the lanes at once: each step codes one symbol by lane. The
+    result is the one of the pure Python path of ans_coder.rans_encode.
+
+    Parameters
+    ----------
+    indexes : bytes
+        index of each symbol in the alphabet
+    freq : list
+        scaled frequency of each index
+    cum : list
+        sum of the scaled frequencies of the smaller indexes
+    lanes : int
+        number of lanes
+    scale_bits : int
+        the scaled frequencies sum to 2 ** scale_bits
+    state_low : int
+        lower limit of the states
+
+    Return
+    ------
+    (states, words) : tuple
+        final state of each lane (uint32) and 16 bits words, as little endian
+        bytes
+    """
+
+    np = get_numpy()
+    view = np.frombuffer(indexes, np.uint8)
+    nb_steps = (len(view) + lanes - 1) // lanes
+    freq_table = np.array(freq, np.uint64)
+    cum_table = np.array(cum, np.uint64)
+    # Limit of the state before coding a symbol of frequency 1
+    limit = np.uint64((state_low >> scale_bits) << 16)
+    bits = np.uint64(scale_bits)
+    sixteen = np.uint64(16)
+
+    states = np.full(lanes, state_low, np.uint64)
+    emitted = np.zeros((nb_steps, lanes), bool)
+    values = np.zeros((nb_steps, lanes), np.uint16)
+    for step in range(nb_steps - 1, -1, -1):
+        row = view[step * lanes:(step + 1) * lanes]
+        k = len(row)
+        x = states[0:k]
+        count = freq_table[row]
+        emit = x >= limit * count
+        emitted[step, 0:k] = emit
+        values[step, 0:k] = x & np.uint64(0xffff)
+        x = np.where(emit, x >> sixteen, x)
+        quotient = x // count
+        states[0:k] = (quotient << bits) + (x - quotient * count) + \
+            cum_table[row]
+
+    # The decoder reads the words step by step, lane by lane
+    words = values[emitted]
+    return states.astype('<u4').tobytes(), words.astype('<u2').tobytes()
+
+
+def rans_decode_lanes(data, len_seq: int, slot_index, slot_freq, slot_bias,
+                      lanes: int, scale_bits: int, state_low: int):
+    """ This function decode a sequence coded by rans_encode_lanes, all the
+    lanes at once. The words of a step are read in the order of the lanes, so
+    the lanes which need a word take the next words of the stream.
+
+    Parameters
+    ----------
+    data : bytes-like
+        final state of each lane, then the 16 bits words
+    len_seq : int
+        number of symbols
+    slot_index : bytes-like
+        index of the symbol of each slot
+    slot_freq : array
+        scaled frequency of the symbol of each slot
+    slot_bias : array
+        position of each slot among the slots of its symbol
+    lanes : int
+        number of lanes
+    scale_bits : int
+        the scaled frequencies sum to 2 ** scale_bits
+    state_low : int
+        lower limit of the states
+
+    Return
+    ------
+    indexes : bytes
+        index of each symbol in the alphabet
+    """
+
+    np = get_numpy()
+    # The states stay below 2 ** 32 at each operation
+    states = np.frombuffer(data, '<u4', lanes).astype(np.uint32)
+    words = np.frombuffer(data, '<u2', offset=4 * lanes).astype(np.uint32)
+    index_table = np.frombuffer(bytes(slot_index), np.uint8)
+    freq_table = np.array(slot_freq, np.uint32)
+    bias_table = np.array(slot_bias, np.uint32)
+    mask = np.uint32((1 << scale_bits) - 1)
+    bits = np.uint32(scale_bits)
+    sixteen = np.uint32(16)
+    low = np.uint32(state_low)
+
+    indexes = np.empty(len_seq, np.uint8)
+    position = 0
+    x = states
+    # Final states of the lanes which do not code a symbol at the last step
+    finished = x[0:0]
+    for start in range(0, len_seq, lanes):
+        # Only the first lanes code a symbol at the last step
+        if start + lanes > len_seq:
+            finished = x[len_seq - start:]
+            x = x[0:len_seq - start]
+        slot = x & mask
+        indexes[start:start + len(x)] = index_table[slot]
+        x = freq_table[slot] * (x >> bits) + bias_table[slot]
+        read = x < low
+        nb_read = int(np.count_nonzero(read))
+        if nb_read:
+            if position + nb_read > len(words):
+                raise ValueError("ANS stream is truncated")
+            x[read] = (x[read] << sixteen) | words[position:position + nb_read]
+            position += nb_read
+    # The decoder ends where the encoder started
+    if position != len(words) or np.any(x != low) or \
+            np.any(finished != low):
+        raise ValueError("ANS stream does not match its length")
+    return indexes.tobytes()
@@ -7,11 +7,178 @@ __license__ = "MIT"
 __copyright__ = "Copyright 2021, @MeganeBoujeant"
 
 
-from tkinter import Tk, Label, Entry, Button
+from tkinter import Tk, Label, Entry, Button, Frame, Canvas, Scrollbar
 from tkinter import Menu
 from tkinter import filedialog
+from tkinter import messagebox
+from tkinter.font import Font
 import os
 
+from step_trace import TextRows, JoinedRows
+
+
+def section_rows(sections):
+    """ This function give the rows of a page made of sections: a title, its
+    content, then an empty row.
+
+    Parameter
+    ---------
+    sections : list
+        (title, content) of each section, the content is a text, cut in rows
+        of ROW_WIDTH characters by TextRows, or a list of rows
+
+    Return
+    ------
+    rows : JoinedRows
+        rows of the page
+    """
+
+    parts = []
+    for title, content in sections:
+        if isinstance(content, str):
+            content = TextRows(content)
+        parts += [[title], content, ['']]
+    return JoinedRows(parts)
+
+
+class RowViewer(Frame):
+    """ Widget which displays a list of rows, like the BWT matrices, in a
+    canvas with scrollbars. Only the rows and the columns which are visible
+    are drawn, and the rows are asked to the list when they are drawn, so a
+    matrix of a long sequence is never built. """
+
+    def __init__(self, master, rows=(), font=("courier", 16),
+                 height: int = 200):
+        super().__init__(master)
+        self.font = Font(master, font=font)
+        self.line_height = self.font.metrics('linespace')
+        self.char_width = self.font.measure('0')
+        self.rows = rows
+        self.first_row = 0
+        self.first_col = 0
+        # Length of the longest row drawn, for the horizontal scrollbar
+        self.width = 0
+
+        self.canvas = Canvas(self, height=height, background="white",
+                             highlightthickness=0)
+        self.vbar = Scrollbar(self, orient='vertical', command=self.yview)
+        self.hbar = Scrollbar(self, orient='horizontal', command=self.xview)
+        self.vbar.pack(side='right', fill='y')
+        self.hbar.pack(side='bottom', fill='x')
+        self.canvas.pack(side='left', fill='both', expand=True)
+
+        self.canvas.bind("<Configure>", lambda e: self.draw())
+        self.canvas.bind("<MouseWheel>", self.wheel)
+        self.canvas.bind("<Button-4>", lambda e: self.yview('scroll', -3,
+                                                            'units'))
+        self.canvas.bind("<Button-5>", lambda e: self.yview('scroll', 3,
+                                                            'units'))
+
+    def nb_visible(self):
+        """ This method give the size of the canvas in rows and columns.
+
+        Return
+        ------
+        (nb_rows, nb_cols) : tuple
+            number of rows and of characters which can be seen
+        """
+
+        nb_rows = max(self.canvas.winfo_height() // self.line_height, 1)
+        nb_cols = max(self.canvas.winfo_width() // self.char_width, 1)
+        return nb_rows, nb_cols
+
+    def set_rows(self, rows, end: bool = False):
+        """ This method change the rows displayed.
+
+        Parameters
+        ----------
+        rows : sequence
+            rows, with len and slices, like the lists of steps of the BWT
+        end : bool
+            if True, display the last rows, else the first rows
+        """
+
+        self.rows = rows
+        self.first_row = len(rows) if end else 0
+        self.first_col = 0
+        self.width = 0
+        self.draw()
+
+    @staticmethod
+    def move(first: int, total: int, visible: int, args):
+        """ This method give the first row (or column) visible after a
+        command of a scrollbar.
+
+        Parameters
+        ----------
+        first : int
+            first row visible
+        total : int
+            number of rows
+        visible : int
+            number of rows which can be seen
+        args : tuple
+            ('moveto', fraction) or ('scroll', number, 'units' or 'pages')
+
+        Return
+        ------
+        first : int
+            new first row visible
+        """
+
+        if args[0] == 'moveto':
+            first = int(float(args[1]) * total)
+        elif args[0] == 'scroll':
+            step = visible if args[2] == 'pages' else 1
+            first += int(args[1]) * step
+        return min(max(first, 0), max(total - visible, 0))
+
+    def yview(self, *args):
+        nb_rows, nb_cols = self.nb_visible()
+        self.first_row = self.move(self.first_row, len(self.rows), nb_rows,
+                                   args)
+        self.draw()
+
+    def xview(self, *args):
+        nb_rows, nb_cols = self.nb_visible()
+        self.first_col = self.move(self.first_col, self.width, nb_cols, args)
+        self.draw()
+
+    def wheel(self, event):
+        """ This method scroll the rows with the mouse wheel. """
+
+        self.yview('scroll', -3 if event.delta > 0 else 3, 'units')
+
+    def draw(self):
+        """ This method draw the visible part of the rows. """
+
+        nb_rows, nb_cols = self.nb_visible()
+        total = len(self.rows)
+        self.first_row = min(self.first_row, max(total - nb_rows, 0))
+        self.canvas.delete('all')
+        rows = self.rows[self.first_row:self.first_row + nb_rows]
+        for k, row in enumerate(rows):
+            self.width = max(self.width, len(row))
+            self.canvas.create_text(
+                2, k * self.line_height, anchor='nw', font=self.font,
+                text=row[self.first_col:self.first_col + nb_cols])
+        self.vbar.set(*self.fractions(self.first_row, total, nb_rows))
+        self.hbar.set(*self.fractions(self.first_col, self.width, nb_cols))
+
+    @staticmethod
+    def fractions(first: int, total: int, visible: int):
+        """ This method give the visible part for a scrollbar.
+
+        Return
+        ------
+        (start, end) : tuple
+            fractions of the first and of the last visible rows
+        """
+
+        if total <= visible:
+            return 0.0, 1.0
+        return first / total, min((first + visible) / total, 1.0)
+
 
 class View(Tk):
     """ Class of the Graphical User Interface (GUI). """
@@ -20,6 +187,7 @@ class View(Tk):
         super().__init__()
         self.controller = controller
         self.fic = ""
+        self.viewer = None
 
     def main(self):
         """This method allows initializes the main window of the GUI."""
@@ -27,6 +195,7 @@ class View(Tk):
         self.geometry('600x300')
         self.title("Algo")
         self.create_menu()
+        self.create_status_bar()
         self.main_page()
         self.mainloop()
 
@@ -55,6 +224,51 @@ class View(Tk):
 
         self.config(menu=menu_bar)
 
+    def create_status_bar(self):
+        """ This method creates a status bar at the bottom of the window, which
+        displays the progress of the running jobs and a button to cancel them.
+        Its widgets are not removed by reset. """
+
+        self.status_bar = Frame(self, name="status")
+        self.status_bar.pack(side='bottom', fill='x')
+        self.status_text = Label(self.status_bar, text="",
+                                 font=("courier", 12))
+        self.status_text.pack(side='left')
+        self.cancel_button = Button(self.status_bar, text="Cancel",
+                                    font=("courier", 12), command=lambda:
+                                    self.controller.cancel_jobs())
+
+    def show_jobs(self, jobs):
+        """ This method display the progress of the jobs in the status bar.
+
+        Parameter
+        ---------
+        jobs : list
+            jobs not finished, the first one is running
+        """
+
+        if not jobs:
+            self.status_text.config(text="")
+            self.cancel_button.pack_forget()
+            return
+        job = jobs[0]
+        text = "{} : {}".format(job.name, job.message or job.state)
+        if len(jobs) > 1:
+            text += " ({} queued)".format(len(jobs) - 1)
+        self.status_text.config(text=text)
+        self.cancel_button.pack(side='right')
+
+    def show_error(self, error: Exception):
+        """ This method display the error of a job.
+
+        Parameter
+        ---------
+        error : Exception
+            exception raised by the job
+        """
+
+        messagebox.showerror("Error", str(error))
+
     def open_file(self):
         """ This method open a selected file to process it according to its
         contents. """
@@ -62,7 +276,9 @@ class View(Tk):
         self.fic = filedialog.askopenfilename(title="Select open file :",
                                               initialdir=os.getcwd()+"/data",
                                               filetypes=(("Text Files",
-                                                          "*.txt"), ))
+                                                          "*.txt"),
+                                                         ("Huffman Files",
+                                                          "*.huf")))
 
         if len(self.fic) > 0:
             self.controller.check_file(self.fic)
@@ -102,6 +318,9 @@ class View(Tk):
                 widget.destroy()
             if "entry" in str(widget):
                 widget.destroy()
+        if self.viewer is not None:
+            self.viewer.destroy()
+            self.viewer = None
 
     def reset_button(self):
         """ This method allows button widget reset. """
@@ -122,6 +341,23 @@ class View(Tk):
         add_label = Label(self, text=text_add, font=("courier", 16))
         add_label.pack()
 
+    def show_rows(self, rows, end: bool = False):
+        """ This method display a list of rows, like a matrix of the BWT, in
+        a RowViewer. Only the visible rows are computed and drawn.
+
+        Parameters
+        ----------
+        rows : sequence
+            rows that we want to display
+        end : bool
+            if True, display the last rows
+        """
+
+        if self.viewer is None:
+            self.viewer = RowViewer(self)
+            self.viewer.pack(fill='both', expand=True)
+        self.viewer.set_rows(rows, end)
+
     def bwt_page(self):
         """ This method create the BWT page. """
 
@@ -147,22 +383,14 @@ class View(Tk):
 
         self.geometry('600x500')
 
-        self.add_label("Your sequence is :")
-        self.add_label(seq)
-        self.add_label('')
-
-        self.add_label("Corresponding binary sequence :")
-        self.add_label(binary_seq)
-        self.add_label('')
-
-        self.add_label("Characters which correspond to binary byte are :")
-        for key, value in unicode_dict.items():
-            self.add_label("{} = {}".format(key, value))
-        self.add_label('')
-
-        self.add_label("Corresponding sequence with special characters :")
-        self.add_label(seq_unicode)
-        self.add_label('')
+        self.show_rows(section_rows([
+            ("Your sequence is :", seq),
+            ("Corresponding binary sequence :", binary_seq),
+            ("Characters which correspond to binary byte are :",
+             ["{} = {}".format(key, value)
+              for key, value in unicode_dict.items()]),
+            ("Corresponding sequence with special characters :",
+             seq_unicode)]))
 
         button_huffman = Button(self, text="Huffman decompression",
                                 font=("courier", 16), command=lambda:
@@ -236,22 +464,14 @@ class View(Tk):
 
         self.geometry('600x500')
 
-        self.add_label("Your bwt sequence is :")
-        self.add_label(seq)
-        self.add_label('')
-
-        self.add_label("Corresponding binary sequence :")
-        self.add_label(binary_seq)
-        self.add_label('')
-
-        self.add_label("Characters which correspond to binary byte are :")
-        for key, value in unicode_dict.items():
-            self.add_label("{} = {}".format(key, value))
-        self.add_label('')
-
-        self.add_label("Corresponding sequence with special characters :")
-        self.add_label(seq_unicode)
-        self.add_label('')
+        self.show_rows(section_rows([
+            ("Your bwt sequence is :", seq),
+            ("Corresponding binary sequence :", binary_seq),
+            ("Characters which correspond to binary byte are :",
+             ["{} = {}".format(key, value)
+              for key, value in unicode_dict.items()]),
+            ("Corresponding sequence with special characters :",
+             seq_unicode)]))
 
         button_huffman = Button(self, text="Huffman decompression",
                                 font=("courier", 16), command=lambda:
@@ -273,17 +493,10 @@ class View(Tk):
 
         self.reset()
 
-        self.add_label("Your unicode sequence is :")
-        self.add_label(unicode_seq)
-        self.add_label('')
-
-        self.add_label("The corresponding binary sequence is :")
-        self.add_label(binary_seq)
-        self.add_label('')
-
-        self.add_label("Your initial sequence is :")
-        self.add_label(initial_sequence)
-        self.add_label('')
+        self.show_rows(section_rows([
+            ("Your unicode sequence is :", unicode_seq),
+            ("The corresponding binary sequence is :", binary_seq),
+            ("Your initial sequence is :", initial_sequence)]))
 
     def decomp_bwt_huffman_page(self, unicode_seq, binary_seq, initial_seq):
         """ This method create the Huffman decompression to bwt sequence page.
@@ -300,17 +513,10 @@ class View(Tk):
 
         self.reset()
 
-        self.add_label("Your unicode sequence is :")
-        self.add_label(unicode_seq)
-        self.add_label('')
-
-        self.add_label("The corresponding binary sequence is :")
-        self.add_label(binary_seq)
-        self.add_label('')
-
-        self.add_label("Your initial bwt sequence is :")
-        self.add_label(initial_seq)
-        self.add_label('')
+        self.show_rows(section_rows([
+            ("Your unicode sequence is :", unicode_seq),
+            ("The corresponding binary sequence is :", binary_seq),
+            ("Your initial bwt sequence is :", initial_seq)]))
 
         button_bwt_to_seq = Button(self, text="BWT To Seq",
                                    font=("courier", 16), command=lambda: